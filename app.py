@@ -1,88 +1,603 @@
 # app.py (FINAL-FINAL-BEST-VERSION)
 import os
+import json
+import time
+import atexit
 import logging
 import asyncio
-import traceback
 import threading
-from flask import Flask, request, jsonify
+import traceback
+from flask import Flask, request, jsonify, Response
 import telebot
-from threading import Lock
 from services.amazon_processor import AmazonProcessor
 from services.channel_poster import ChannelPoster
 from services.error_notifier import ErrorNotifier
 from utils.config import Config
-from services.duplicate_detector import DuplicateDetector
+from services.duplicate_detector import DuplicateDetector, Reservation
+from services.dedup_store import create_dedup_store
+from services.job_engine import JobEngine
+from services.http_client import HTTPSessionManager
+from services.url_resolver import ShortURLResolver
+from services.job_queue import PersistentJobQueue, PRIORITY_LABELS
+from services.job_priority import JobPrioritizer
+from services.product_cache import ProductCache
+from services.price_history import PriceHistory
+from services.rate_limiter import AdaptiveRateLimiter, TelegramScheduler
+from services.retry_policy import RetryPolicy, RetryBudget, BLOCKED, backoff_delay
+from services.url_shortener import URLShortener
+from services.pipeline import Stage, StageError
+from services.metrics import MetricsRegistry
+from services.tracing import Tracer, span
+from services.marketplace import MarketplaceRegistry
+from services.webhook_intake import WebhookIntake, HandlerErrorLogger
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-processing_lock = Lock()
+# Har worker process ka apna ek long-lived event loop + bounded job queue
+job_engine = JobEngine(
+    concurrency=Config.WORKER_CONCURRENCY,
+    max_queue_size=Config.JOB_QUEUE_SIZE,
+    stage_limits={
+        # Per marketplace, aur sirf page request ke dauran; rate-limit wait aur retry backoff slot ke bahar
+        'fetch': Config.STAGE_LIMIT_SCRAPE,
+        'shorten': Config.STAGE_LIMIT_SHORTEN,
+        'post': Config.STAGE_LIMIT_POST,
+    },
+)
+
+# Process ke saare counters / histograms; /metrics (Prometheus) aur /api/stats yahin se padhte hain
+metrics = MetricsRegistry()
+links_received = metrics.counter('links_received_total', 'Links received by the intake endpoints, by result', ['status'])
+jobs_finished = metrics.counter('jobs_total', 'Finished job attempts by outcome', ['outcome'])
+job_latency = metrics.histogram('job_duration_seconds', 'End-to-end time of one job attempt',
+                                buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+stage_latency = metrics.histogram('stage_duration_seconds', 'Pipeline stage latency', ['stage'])
+stage_failures = metrics.counter('stage_failures_total', 'Pipeline stage failures', ['stage'])
+queue_wait = metrics.histogram('queue_wait_seconds', 'Time a ready job waited in the durable queue before a worker took it',
+                               ['priority'], buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+
+# Har job attempt ka trace (spans: stages, Amazon fetch, TinyURL, Telegram); sabse slow N yaad rehte hain
+tracer = Tracer(
+    slow_jobs=Config.TRACE_SLOW_JOBS,
+    export_path=Config.TRACE_EXPORT_PATH or None,
+    enabled=Config.TRACING_ENABLED,
+)
+atexit.register(tracer.close)
+
+def observe_stage(name, seconds, error):
+    stage_latency.observe(seconds, stage=name)
+    if error is not None:
+        stage_failures.inc(stage=name)
+
+# Sab services ek hi connection pool share karti hain (keep-alive + DNS cache)
+session_manager = HTTPSessionManager(
+    limit=Config.HTTP_POOL_LIMIT,
+    limit_per_host=Config.HTTP_POOL_LIMIT_PER_HOST,
+    keepalive_timeout=Config.HTTP_KEEPALIVE_SECONDS,
+    dns_cache_ttl=Config.HTTP_DNS_CACHE_SECONDS,
+)
+job_engine.add_shutdown_hook(session_manager.close)
+atexit.register(job_engine.stop)
+
+# Short links ek hi baar expand hote hain; DuplicateDetector aur AmazonProcessor dono yehi cache use karte hain
+url_resolver = ShortURLResolver(
+    session_manager=session_manager,
+    cache_size=Config.RESOLVER_CACHE_SIZE,
+    ttl_seconds=Config.RESOLVER_CACHE_TTL_SECONDS,
+)
+
+# Har marketplace (.in, .com, .co.uk) ka apna tag, currency, selectors aur product pages ka alag connection pool
+marketplaces = MarketplaceRegistry(
+    tags=Config.MARKETPLACE_TAGS,
+    default_domain=Config.DEFAULT_MARKETPLACE,
+    default_tag=Config.AFFILIATE_TAG,
+    rate_limits=Config.MARKETPLACE_RATE_LIMITS,
+    pool_options={
+        'limit': Config.MARKETPLACE_POOL_LIMIT,
+        'limit_per_host': Config.HTTP_POOL_LIMIT_PER_HOST,
+        'keepalive_timeout': Config.HTTP_KEEPALIVE_SECONDS,
+        'dns_cache_ttl': Config.HTTP_DNS_CACHE_SECONDS,
+    },
+)
+job_engine.add_shutdown_hook(marketplaces.close)
+
+# Saare jobs ek hi limiter share karte hain, taake Amazon par total rate control mein rahe (har marketplace alag host hai)
+rate_limiter = AdaptiveRateLimiter(
+    default_rate=Config.RATE_LIMIT_RPS,
+    burst=Config.RATE_LIMIT_BURST,
+    min_rate=Config.RATE_LIMIT_MIN_RPS,
+    max_rate=Config.RATE_LIMIT_MAX_RPS,
+    host_overrides=marketplaces.rate_limit_overrides(Config.RATE_LIMIT_MAX_RPS),
+)
+
+# Telegram ki per-chat aur global limits; saare senders yehi scheduler share karte hain
+telegram_scheduler = TelegramScheduler(
+    global_rate=Config.TELEGRAM_GLOBAL_RATE,
+    chat_rate=Config.TELEGRAM_CHAT_MESSAGES_PER_MINUTE / 60,
+)
+
+# Retry budget bhi shared hai: block ke dauran retries Amazon par load multiply na karein
+retry_policy = RetryPolicy(
+    max_attempts=Config.RETRY_MAX_ATTEMPTS,
+    base_delay=Config.RETRY_BASE_DELAY_SECONDS,
+    max_delay=Config.RETRY_MAX_DELAY_SECONDS,
+    kind_delays={BLOCKED: Config.RETRY_BLOCKED_DELAY_SECONDS},
+    budget=RetryBudget(ratio=Config.RETRY_BUDGET_RATIO, min_retries=Config.RETRY_BUDGET_MIN_PER_MINUTE),
+)
+
+# Same ASIN baar baar aata hai; title/image lambe time tak, price thodi der tak cache
+product_cache = ProductCache(
+    max_size=Config.PRODUCT_CACHE_SIZE,
+    static_ttl=Config.PRODUCT_CACHE_STATIC_TTL,
+    price_ttl=Config.PRODUCT_CACHE_PRICE_TTL,
+    stale_seconds=Config.PRODUCT_CACHE_STALE_SECONDS,
+    db_path=Config.PRODUCT_CACHE_DB_PATH or None,
+)
+
+# Har ASIN ki price history: price sach mein giri ya wahi deal dobara aa rahi hai
+price_history = PriceHistory(
+    Config.PRICE_HISTORY_DB_PATH,
+    window_days=Config.PRICE_HISTORY_WINDOW_DAYS,
+    retention_days=Config.PRICE_HISTORY_RETENTION_DAYS,
+    heartbeat_seconds=Config.PRICE_HISTORY_HEARTBEAT_SECONDS,
+) if Config.PRICE_HISTORY_DB_PATH else None
+
 # Duplicate detector ko global banayein taake sabhi threads ise istemal kar sakein
-duplicate_detector = DuplicateDetector(detection_hours=48)
+# Store SQLite/Redis par ho to state restart ke baad bhi rehti hai aur sab workers share karte hain
+DEDUP_HOURS = 48
+duplicate_detector = DuplicateDetector(
+    detection_hours=DEDUP_HOURS,
+    store=create_dedup_store(
+        Config.DEDUP_BACKEND,
+        ttl_seconds=DEDUP_HOURS * 3600,
+        db_path=Config.DEDUP_DB_PATH,
+        redis_url=Config.REDIS_URL,
+    ),
+    resolver=url_resolver,
+    default_marketplace=Config.DEFAULT_MARKETPLACE,
+)
+
+# Accepted links pehle disk par save hote hain taake restart par gum na hon
+job_queue = PersistentJobQueue(
+    Config.JOB_DB_PATH,
+    max_attempts=Config.JOB_MAX_ATTEMPTS,
+    lease_seconds=Config.JOB_LEASE_SECONDS,
+    aging_seconds=Config.QUEUE_AGING_SECONDS,
+    fairness=Config.QUEUE_FAIRNESS_WEIGHT,
+)
+# Sale ke dauran flash deals aur cached (sasti) jobs pehle; payload 'priority' sabse upar
+job_prioritizer = JobPrioritizer(
+    marketplaces,
+    product_cache=product_cache,
+    price_history=price_history,
+    resolver=url_resolver,
+    big_discount_percent=Config.PRIORITY_DISCOUNT_PERCENT,
+)
+app_ready = threading.Event()
+_queue_wakeup = threading.Event()
+_queue_worker_lock = threading.Lock()
+
+def queue_worker():
+    """Durable queue se jobs batch mein lease karke JobEngine ko deta hai (har process mein sirf ek)"""
+    if not _queue_worker_lock.acquire(blocking=False):
+        return
+    app_ready.wait()
+    job_queue.recover()
+    logger.info("📥 Queue worker started")
+
+    while not job_engine.stopping:
+        try:
+            # Jobs queued in the engine or sleeping in retry / rate-limit waits must not outlive their lease
+            job_queue.renew()
+            if not job_engine.wait_for_slot(timeout=Config.JOB_POLL_SECONDS):
+                continue
+            jobs = job_queue.lease(min(job_engine.free_slots(), Config.JOB_BATCH_SIZE))
+            if not jobs:
+                _queue_wakeup.wait(Config.JOB_POLL_SECONDS)
+                _queue_wakeup.clear()
+                continue
+            for job in jobs:
+                if not job_engine.submit(job):
+                    job_queue.release(job['id'])
+                    continue
+                queue_wait.observe(job['queue_wait'], priority=PRIORITY_LABELS.get(job['priority'], str(job['priority'])))
+        except Exception as e:
+            logger.error(f"❌ Error in queue_worker: {e}", exc_info=True)
+            time.sleep(1)
+
+def _hit_ratio(hits, total):
+    return round(hits / total, 3) if total else 0.0
+
+def duplicate_hit_rate():
+    duplicates = links_received.value(status='duplicate')
+    return _hit_ratio(duplicates, duplicates + links_received.value(status='queued'))
+
+def cache_stats():
+    """Har cache ka size aur hit rate ek hi shape mein"""
+    shortener = url_shortener.get_stats()
+    shortener_lookups = shortener['cache_hits'] + shortener['api_calls'] + shortener['coalesced']
+    product = product_cache.get_stats()
+    resolver = url_resolver.get_stats()
+    file_ids = channel_poster.get_stats()['file_id_cache']
+    return {
+        'resolver': {'size': resolver['size'], 'hit_rate': resolver['hit_rate']},
+        'product': {'size': product['size'], 'hit_rate': product['hit_rate']},
+        'shortener': {'size': shortener['cache_size'], 'hit_rate': _hit_ratio(shortener['cache_hits'], shortener_lookups)},
+        'telegram_file_id': {'size': file_ids['size'], 'hit_rate': file_ids['hit_rate']},
+    }
+
+def register_service_gauges():
+    """Services ke get_stats() se scrape time par padhe jaane wale gauges"""
+    metrics.gauge('queue_jobs', 'Durable queue rows by status',
+                  lambda: {(status,): count for status, count in job_queue.get_stats().items()}, ['status'])
+    metrics.gauge('queue_pending_jobs', 'Waiting jobs by priority class',
+                  lambda: {(priority,): count for priority, count in job_queue.pending_by_priority().items()}, ['priority'])
+    metrics.gauge('jobs_in_flight', 'Jobs currently running in this worker', lambda: job_engine.in_flight)
+    metrics.gauge('engine_pending', 'Jobs submitted to this worker and not finished yet', lambda: job_engine.pending)
+    metrics.gauge('duplicate_hit_ratio', 'Share of incoming links rejected as duplicates', duplicate_hit_rate)
+    metrics.gauge('cache_hit_ratio', 'Cache hit rate', lambda: {
+        (name,): stats['hit_rate'] for name, stats in cache_stats().items()}, ['cache'])
+    metrics.gauge('cache_entries', 'Entries held in memory by each cache', lambda: {
+        (name,): stats['size'] for name, stats in cache_stats().items()}, ['cache'])
+    metrics.gauge('rate_limit_rps', 'Current adaptive request rate per host', lambda: {
+        (host,): stats['rate'] for host, stats in rate_limiter.get_stats().items()}, ['host'])
+    metrics.gauge('rate_limit_throttle_events', 'Throttling responses seen per host', lambda: {
+        (host,): stats['throttle_events'] for host, stats in rate_limiter.get_stats().items()}, ['host'])
+    metrics.gauge('stage_retries', 'Stage retries performed by the retry policy', lambda: retry_policy.stats['retries'])
+    metrics.gauge('http_connection_reuse_ratio', 'Share of requests served on a reused connection',
+                  lambda: session_manager.get_stats()['reuse_ratio'])
+    metrics.gauge('webhook_queue_depth', 'Telegram updates waiting for the webhook worker',
+                  lambda: webhook_intake.get_stats()['queued'])
+    metrics.gauge('amazon_stream_bytes', 'Product page bytes read vs. left unread by streaming early stop '
+                  '(saved: uncompressed responses with a Content-Length only)', lambda: {
+        (kind,): amazon_processor.stream_stats[f'bytes_{kind}'] for kind in ('read', 'saved')}, ['kind'])
+    metrics.gauge('amazon_stream_pages', 'Product pages fetched in streaming mode, how many stopped early, and how many '
+                  'of those had an unknown remaining size (compressed / chunked)', lambda: {
+        ('all',): amazon_processor.stream_stats['pages'], ('early_stop',): amazon_processor.stream_stats['early_stops'],
+        ('early_stop_unmeasured',): amazon_processor.stream_stats['early_stops_unmeasured']}, ['result'])
+    metrics.gauge('notifier_outbox', 'Alerts waiting for the next error-chat digest',
+                  lambda: error_notifier.get_stats()['outbox'])
+
+def price_skip_reason(price_info):
+    """PRICE_SKIP_UNCHANGED on ho to sirf naye products, naye lows aur asli price drops post hote hain"""
+    if not Config.PRICE_SKIP_UNCHANGED or not price_info or 'movement' not in price_info:
+        return None
+    if price_info['movement'] == PriceHistory.NEW or price_info['new_low']:
+        return None
+    if price_info['movement'] == PriceHistory.DROP and -price_info['change_percent'] >= Config.PRICE_DROP_MIN_PERCENT:
+        return None
+    return f"price {price_info['movement']} ({price_info['previous']} -> {price_info['amount']})"
+
+def _histogram_summary(name):
+    return {'/'.join(key) or 'all': values for key, values in metrics.get(name).summary().items()}
+
+def collect_stats():
+    """Dashboard (/api/stats) ke liye sab services ka summary"""
+    intake = {status: links_received.value(status=status) for status in ('queued', 'duplicate', 'busy', 'error')}
+    intake['duplicate_hit_rate'] = duplicate_hit_rate()
+    return {
+        'processed_links': jobs_finished.value(outcome='success'),
+        'channels_configured': len(Config.OUTPUT_CHANNELS),
+        'affiliate_tag': Config.AFFILIATE_TAG,
+        'intake': intake,
+        'jobs': {outcome: jobs_finished.value(outcome=outcome) for outcome in ('success', 'skipped', 'retry', 'dead', 'duplicate')},
+        'queue': job_queue.get_stats(),
+        'queue_priorities': {
+            'pending': job_queue.pending_by_priority(),
+            'wait': _histogram_summary('queue_wait_seconds'),
+            'classified': job_prioritizer.get_stats(),
+        },
+        'engine': job_engine.get_stats(),
+        'stages': _histogram_summary('stage_duration_seconds'),
+        'operations': _histogram_summary('operation_duration_seconds'),
+        'channels': _histogram_summary('channel_post_duration_seconds'),
+        'caches': cache_stats(),
+        'rate_limits': rate_limiter.get_stats(),
+        'retries': retry_policy.get_stats(),
+        'telegram': telegram_scheduler.get_stats(),
+        'notifier': error_notifier.get_stats(),
+        'webhook': webhook_intake.get_stats(),
+        'http': session_manager.get_stats(),
+        'streaming': amazon_processor.get_stream_stats(),
+        'marketplaces': marketplaces.get_stats(),
+        'price_history': price_history.get_stats() if price_history else None,
+        'tracing': tracer.get_stats(),
+    }
 
 def create_app():
     app = Flask(__name__)
-    bot = telebot.TeleBot(Config.TELEGRAM_BOT_TOKEN, threaded=False)
+    bot = telebot.TeleBot(Config.TELEGRAM_BOT_TOKEN, threaded=False, exception_handler=HandlerErrorLogger())
     
     # Services ko global scope mein initialize karein
-    global amazon_processor, channel_poster, error_notifier
-    amazon_processor = AmazonProcessor(Config.AFFILIATE_TAG)
-    channel_poster = ChannelPoster(bot, Config.OUTPUT_CHANNELS)
-    error_notifier = ErrorNotifier(Config.TELEGRAM_BOT_TOKEN, Config.ERROR_CHAT_ID)
+    global amazon_processor, channel_poster, error_notifier, url_shortener, webhook_intake
+    url_shortener = URLShortener(
+        session_manager=session_manager,
+        cache_db_path=Config.SHORTENER_DB_PATH or None,
+        max_concurrency=Config.SHORTENER_CONCURRENCY,
+        requests_per_second=Config.SHORTENER_REQUESTS_PER_SECOND,
+        api_base=Config.TINYURL_API_BASE,
+        basic_base=Config.TINYURL_BASIC_BASE,
+    )
+    amazon_processor = AmazonProcessor(
+        Config.AFFILIATE_TAG,
+        session_manager=session_manager,
+        resolver=url_resolver,
+        html_parser=Config.HTML_PARSER,
+        parser_processes=Config.PARSER_PROCESSES,
+        streaming_fetch=Config.STREAMING_FETCH,
+        product_cache=product_cache,
+        url_shortener=url_shortener,
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        metrics=metrics,
+        marketplaces=marketplaces,
+        price_history=price_history,
+        fetch_limiter=job_engine.stage,
+    )
+    channel_poster = ChannelPoster(
+        Config.TELEGRAM_BOT_TOKEN, Config.OUTPUT_CHANNELS,
+        session_manager=session_manager, scheduler=telegram_scheduler,
+        file_id_cache_size=Config.TELEGRAM_FILE_ID_CACHE_SIZE,
+        metrics=metrics,
+        api_base=Config.TELEGRAM_API_BASE,
+    )
+    error_notifier = ErrorNotifier(
+        Config.TELEGRAM_BOT_TOKEN, Config.ERROR_CHAT_ID,
+        session_manager=session_manager, scheduler=telegram_scheduler,
+        flush_interval=Config.NOTIFY_FLUSH_SECONDS,
+        max_batch=Config.NOTIFY_MAX_BATCH,
+        max_outbox=Config.NOTIFY_OUTBOX_SIZE,
+        metrics=metrics,
+        api_base=Config.TELEGRAM_API_BASE,
+    )
+    # Webhook request sirf secret check karke queue mein daalti hai; handlers worker thread par batches mein
+    webhook_intake = WebhookIntake(
+        bot,
+        secret_token=Config.TELEGRAM_SECRET_TOKEN,
+        max_queue=Config.WEBHOOK_QUEUE_SIZE,
+        batch_size=Config.WEBHOOK_BATCH_SIZE,
+        batch_wait=Config.WEBHOOK_BATCH_WAIT_SECONDS,
+        metrics=metrics,
+    )
+    register_service_gauges()
     logger.info("✅ All services initialized successfully")
 
-    async def process_and_post_task(payload, url):
-        """Yeh background mein chalne wala poora process hai"""
+    async def post_stage(ctx):
+        """Scraped info + original payload ko channels par post karta hai"""
+        product_info = ctx['product']
+        skip_reason = price_skip_reason(product_info.get('price_info'))
+        if skip_reason:
+            return {'success': True, 'skipped': skip_reason}
+        product_info['original_text'] = ctx['payload'].get('original_text', '')
+        product_info['images'] = ctx['payload'].get('images', [])
+
+        # Saare channels par ek saath post hota hai
+        return await channel_poster.post_to_channels(product_info)
+
+    # resolve -> tag -> {scrape ∥ shorten} -> product -> post; har stage ki apni concurrency limit
+    pipeline = amazon_processor.build_graph(limiter=job_engine.stage, observer=observe_stage).add(
+        Stage('post', post_stage, depends_on=['product'])
+    )
+
+    async def process_and_post_task(payload):
+        """Yeh background mein chalne wala poora process hai. (error, skip_reason) return karta hai"""
+        url = payload.get('url')
         try:
-            product_info = await amazon_processor.process_link_with_retry(url)
-            if not product_info:
-                await error_notifier.notify(f"❌ Failed to extract product info for {url}")
-                return
-            product_info['original_text'] = payload.get('original_text', '')
-            product_info['images'] = payload.get('images', [])
-            
-            posting_result = channel_poster.post_to_channels(product_info)
-            
-            if not posting_result or not posting_result.get('success'):
-                await error_notifier.notify(f"❌ Failed to post to channels for {url}: {posting_result.get('errors', 'Unknown error')}")
-            else:
-                await error_notifier.notify(f"✅ Successfully posted: {url}")
+            ctx = await pipeline.run({'url': url, 'payload': payload})
+        except StageError as e:
+            if e.stage == 'post':
+                raise
+            logger.error(f"❌ Error processing link {url}: {e}")
+            return f"Failed to extract product info for {url}", None
+
+        posting_result = ctx['post']
+        if not posting_result or not posting_result.get('success'):
+            return f"Failed to post to channels for {url}: {posting_result.get('errors', 'Unknown error')}", None
+        # Price history mein tabhi likho jab post ho gaya (ya jaan-boojh kar skip hua); fail hua to retry
+        # wahi movement dekhega aur deal skip nahi hogi. Post ho chuka hai, isliye yahan ki error job fail nahi karti
+        try:
+            await amazon_processor.record_price(ctx['product'])
         except Exception as e:
-            await error_notifier.notify(f"❌ Unexpected error in task for {url}: {e}", traceback_info=traceback.format_exc())
+            logger.warning(f"⚠️ Could not record price for {url}: {e}")
+        return None, posting_result.get('skipped')
 
-    def sync_task_wrapper(payload):
-        """Async task ko lock ke saath ek alag thread mein chalata hai"""
-        url = payload.get('url')
-        
-        logger.info(f"⏳ Waiting to acquire lock for URL: {url}")
-        with processing_lock:
-            logger.info(f"✅ Lock acquired. Processing URL: {url}")
+    async def run_job(job):
+        """Durable job chalata hai aur result ke hisaab se ack / retry karta hai"""
+        url = job['payload'].get('url')
+        reservation = Reservation(url, job['payload'].get('_dedup_keys', []))
+        traceback_info = None
+        skipped = None
+        started = time.perf_counter()
+        with tracer.trace('job', job_id=job['id'], url=url, attempt=job['attempts'],
+                          priority=PRIORITY_LABELS.get(job['priority']), queue_wait_ms=round(job['queue_wait'] * 1000)) as trace:
             try:
-                asyncio.run(process_and_post_task(payload, url))
+                # Short link ka expansion ab yahan (async, cached) hota hai, request handler mein nahi.
+                # Retry attempts par check skip, kyunki pehli attempt ne hi expanded aliases insert kiye the.
+                with span('dedup'):
+                    unique = await duplicate_detector.extend_reservation(reservation, check=job['attempts'] == 1)
+                if not unique:
+                    logger.info(f"🔄 Duplicate after expansion, skipping: {url}")
+                    await asyncio.to_thread(job_queue.ack, job['id'])
+                    jobs_finished.inc(outcome='duplicate')
+                    trace.set(outcome='duplicate')
+                    return
+                error, skipped = await process_and_post_task(job['payload'])
             except Exception as e:
-                logger.error(f"❌ Error in sync_task_wrapper: {e}", exc_info=True)
-        logger.info(f"✅ Lock released for URL: {url}")
+                error = f"Unexpected error in task for {url}: {e}"
+                traceback_info = traceback.format_exc()
+            trace.set(outcome='failed' if error is not None else 'skipped' if skipped else 'success')
+            if error is not None:
+                trace.set(error=error)
+        job_latency.observe(time.perf_counter() - started)
+
+        if error is None:
+            jobs_finished.inc(outcome='skipped' if skipped else 'success')
+            await asyncio.to_thread(job_queue.ack, job['id'])
+            duplicate_detector.confirm(reservation)
+            if skipped:
+                logger.info(f"💤 Not posting {url}: {skipped}")
+                return
+            # Outbox mein jata hai; digest mein sirf count dikhta hai
+            await error_notifier.notify(f"✅ Successfully posted: {url}", success=True)
+            return
+
+        # Poora job dobara chalane mein bhi exponential backoff
+        delay = backoff_delay(job['attempts'], Config.JOB_RETRY_DELAY_SECONDS, Config.JOB_RETRY_MAX_DELAY_SECONDS)
+        requeued = await asyncio.to_thread(job_queue.retry, job['id'], error, delay)
+        jobs_finished.inc(outcome='retry' if requeued else 'dead')
+        if requeued:
+            logger.warning(f"🔁 Job {job['id']} attempt {job['attempts']} failed, requeued: {error}")
+        else:
+            # Link dobara bheja ja sake, isliye dedup reservation chhod dein
+            await asyncio.to_thread(duplicate_detector.release, reservation)
+            await error_notifier.notify(f"❌ {error} (gave up after {job['attempts']} attempts)", traceback_info=traceback_info)
+
+    async def close_extractor():
+        amazon_processor.extractor.close()
+
+    job_engine.handler = run_job
+    job_engine.add_shutdown_hook(close_extractor)
+    # Bachi hui notifications HTTP session band hone se pehle bhej do
+    job_engine.add_shutdown_hook(error_notifier.close, first=True)
+    job_engine.start()
+    app_ready.set()
+    threading.Thread(target=queue_worker, name="queue-worker", daemon=True).start()
+    webhook_intake.start()
+    atexit.register(webhook_intake.stop)
+
+    def queue_fields(payload):
+        """Lease order ke columns: priority class aur source (har monitor bot ka fair share)"""
+        priority, _ = job_prioritizer.classify(payload)
+        source = payload.get('source') or request.headers.get('X-Source') or request.remote_addr
+        return {'_priority': priority, '_source': str(source) if source else None}
+
+    def _payload_url(payload):
+        """Payload ka 'url' agar non-empty string hai, warna None (dedup aur queue sirf string URLs sambhalte hain)"""
+        if isinstance(payload, dict) and isinstance(payload.get('url'), str) and payload['url'].strip():
+            return payload['url']
+        return None
 
     @app.route('/api/process', methods=['POST'])
     def process_amazon_link_api():
         data = request.get_json()
-        url = data.get('url')
-        if not data or not url:
+        url = _payload_url(data)
+        if not url:
+            links_received.inc(status='error')
             return jsonify({'status': 'error', 'message': 'URL is required'}), 400
         
+        # Queue full ho to link reject karein (backpressure), mark na karein taake retry ho sake
+        depth = job_queue.depth()
+        if depth >= Config.JOB_QUEUE_MAX_PENDING:
+            logger.warning(f"🚦 Job queue full ({depth}). Rejecting: {url}")
+            links_received.inc(status='busy')
+            return jsonify({'status': 'busy', 'message': 'Processing queue is full. Retry later.'}), 429
+
         # === BEHTAR DUPLICATE CHECK LOGIC ===
-        # Link ko queue mein daalne se pehle check karein
-        if duplicate_detector.is_duplicate(url):
+        # Check + mark ek hi atomic step hai, taake do concurrent posts dono pass na ho sakein
+        reservation = duplicate_detector.check_and_mark(url)
+        if reservation is None:
             logger.info(f"🔄 Duplicate link received by Logic Bot. Rejecting: {url}")
+            links_received.inc(status='duplicate')
             return jsonify({'status': 'duplicate', 'message': 'URL already processed recently.'}), 200
 
-        # Agar link naya hai, to use foran "processed" mark karein
-        duplicate_detector.mark_as_processed(url)
-        
-        # Ab process karne ke liye background thread start karein
-        threading.Thread(target=sync_task_wrapper, args=(data,)).start()
+        try:
+            job_queue.enqueue(dict(data, _dedup_keys=reservation.keys, **queue_fields(data)))
+        except Exception:
+            duplicate_detector.release(reservation)
+            raise
+        _queue_wakeup.set()
+        links_received.inc(status='queued')
         return jsonify({'status': 'success', 'message': 'Request received. Processing will start shortly.'}), 202
     
+    def _parse_batch_body():
+        """JSON array, {"items": [...]} ya NDJSON (ek payload per line)"""
+        raw = request.get_data(as_text=True)
+        try:
+            data = json.loads(raw)
+            if isinstance(data, dict) and isinstance(data.get('items'), list):
+                return data['items']
+            if isinstance(data, list):
+                return data
+        except ValueError:
+            pass
+        # NDJSON; galat line bhi item ban jati hai taake uska error index ke saath wapas jaye
+        items = []
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+
+    @app.route('/api/process/batch', methods=['POST'])
+    def process_amazon_links_batch_api():
+        items = _parse_batch_body()
+        if not items:
+            return jsonify({'status': 'error', 'message': 'Expected a JSON array or NDJSON of payloads'}), 400
+        if len(items) > Config.BATCH_MAX_ITEMS:
+            return jsonify({'status': 'error', 'message': f'At most {Config.BATCH_MAX_ITEMS} items per batch'}), 413
+
+        results = [None] * len(items)
+        valid = []  # (index, payload)
+        for index, payload in enumerate(items):
+            if _payload_url(payload):
+                valid.append((index, payload))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'message': 'URL is required'}
+
+        # Queue mein jitni jagah hai utne hi lo; baaki 'busy' taake sender baad mein bheje
+        room = max(0, Config.JOB_QUEUE_MAX_PENDING - job_queue.depth())
+        for index, payload in valid[room:]:
+            results[index] = {'index': index, 'url': payload['url'], 'status': 'busy', 'message': 'Processing queue is full. Retry later.'}
+        valid = valid[:room]
+
+        # Ek hi pass mein batch ke andar aur pehle se processed, dono duplicates
+        reservations = duplicate_detector.check_and_mark_many([payload['url'] for _, payload in valid]) if valid else []
+        accepted = []
+        for (index, payload), reservation in zip(valid, reservations):
+            if reservation is None:
+                results[index] = {'index': index, 'url': payload['url'], 'status': 'duplicate', 'message': 'URL already processed recently.'}
+            else:
+                accepted.append((index, payload, reservation))
+
+        if accepted:
+            try:
+                job_ids = job_queue.enqueue_many(
+                    [dict(payload, _dedup_keys=reservation.keys, **queue_fields(payload)) for _, payload, reservation in accepted]
+                )
+            except Exception:
+                for _, _, reservation in accepted:
+                    duplicate_detector.release(reservation)
+                raise
+            for (index, payload, _), job_id in zip(accepted, job_ids):
+                results[index] = {'index': index, 'url': payload['url'], 'status': 'queued', 'job_id': job_id}
+            _queue_wakeup.set()
+
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        for status, count in summary.items():
+            links_received.inc(count, status=status)
+        logger.info(f"📦 Batch of {len(items)} received: {summary}")
+        return jsonify({'status': 'success', 'summary': summary, 'results': results}), 202 if accepted else 200
+
+    # === METRICS ===
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/api/stats')
+    def api_stats():
+        return jsonify(collect_stats())
+
+    @app.route('/api/traces/slow')
+    def slow_traces():
+        limit = request.args.get('limit', default=20, type=int)
+        return jsonify({'tracing': tracer.get_stats(), 'traces': tracer.slowest(limit)})
+
     # === WEBHOOK LOGIC ===
     @bot.message_handler(commands=['start', 'help'])
     def send_welcome(message):
@@ -90,9 +605,12 @@ def create_app():
 
     @app.route('/' + Config.TELEGRAM_BOT_TOKEN, methods=['POST'])
     def get_telegram_updates():
-        json_string = request.get_data().decode('utf-8')
-        update = telebot.types.Update.de_json(json_string)
-        bot.process_new_updates([update])
+        # Telegram ko turant 200; decode aur handlers webhook_intake ke worker par
+        if not webhook_intake.verify(request.headers.get('X-Telegram-Bot-Api-Secret-Token')):
+            return "Forbidden", 403
+        if not webhook_intake.submit(request.get_data()):
+            # Buffer full: non-2xx par Telegram update baad mein dobara bhejta hai
+            return "Busy", 503
         return "!", 200
 
     @app.route("/")
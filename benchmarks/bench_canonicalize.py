@@ -0,0 +1,90 @@
+# benchmarks/bench_canonicalize.py
+"""Offline URL canonicalization vs. the old per-link regex/urlparse path, over real-world link shapes.
+
+Run from the repo root:
+    python -m benchmarks.bench_canonicalize --links 20000 --network-latency 0.4
+--network-latency is the assumed cost of one HEAD-with-redirects lookup, used to estimate the time saved.
+"""
+import re
+import time
+import random
+import argparse
+from utils.helpers import extract_asin_from_url, clean_url_for_duplicate_check
+from utils.url_canonical import canonicalize
+
+# Shapes seen in monitor-bot posts; {asin} / {slug} / {n} are filled per link
+LINK_SHAPES = [
+    "https://www.amazon.in/{slug}/dp/{asin}/ref=sr_1_{n}?crid=2M{n}&keywords=earbuds&qid=17000{n}&sprefix=ear%2Caps%2C2{n}&sr=8-{n}",
+    "https://www.amazon.in/dp/{asin}?tag=deals{n}-21&linkCode=ogi&th=1&psc=1",
+    "https://www.amazon.in/{slug}/dp/{asin}?pd_rd_w=abc{n}&content-id=amzn1.sym.{n}&pf_rd_p=x{n}&pf_rd_r=Y{n}&pd_rd_wg=Z{n}&pd_rd_r=q{n}",
+    "https://amazon.in/gp/product/{asin}/ref=ppx_yo_dt_b_asin_title_o0{n}_s00?ie=UTF8&psc=1",
+    "https://m.amazon.in/gp/aw/d/{asin}?ref_=mw_dp_{n}&smid=A14CZOWI0VEHLG",
+    "https://www.amazon.com/{slug}/dp/{asin}/?_encoding=UTF8&pd_rd_w={n}",
+    "https://www.amazon.co.uk/dp/{asin}?ascsubtag={n}&utm_source=telegram&utm_medium=post",
+    "https://www.amazon.in/s?k=deal+{n}&ref=nb_sb_noss_{n}&crid=X{n}",
+    "https://amzn.to/{short}",
+    "https://a.co/d/{short}",
+    "https://wishlink.com/share/{short}",
+]
+# Rough share of each shape in real traffic (full links dominate, short links are the minority)
+SHAPE_WEIGHTS = [20, 18, 12, 8, 6, 6, 5, 3, 12, 6, 4]
+
+_LEGACY_ID_RE = r'/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})'
+
+def make_corpus(count, seed=7):
+    rng = random.Random(seed)
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+    corpus = []
+    for n in range(count):
+        shape = rng.choices(LINK_SHAPES, weights=SHAPE_WEIGHTS)[0]
+        corpus.append(shape.format(
+            asin='B0' + ''.join(rng.choice(alphabet) for _ in range(8)),
+            slug='-'.join(rng.choice(['boAt', 'Airdopes', 'Wireless', 'Earbuds', 'Black', 'Smart', 'Watch']) for _ in range(5)),
+            short=''.join(rng.choice(alphabet.lower()) for _ in range(7)),
+            n=n % 97,
+        ))
+    return corpus
+
+def legacy(url):
+    """What every link used to cost before a network lookup: ASIN regexes + the duplicate-check cleanup"""
+    asin = None
+    if 'amazon' in url or 'amzn.to' in url or 'a.co' in url:
+        match = re.search(_LEGACY_ID_RE, url)
+        asin = match.group(1) if match else None
+    return asin or extract_asin_from_url(url), clean_url_for_duplicate_check(url)
+
+def bench(name, func, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url in corpus:
+            func(url)
+    per_link_us = (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+    print(f"{name:<13} {per_link_us:>7.2f} µs/link")
+    return per_link_us
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--network-latency', type=float, default=0.4, help='seconds per redirect lookup')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.links)
+    print(f"{len(corpus)} links, {len(LINK_SHAPES)} shapes")
+    bench('legacy', legacy, corpus, args.repeat)
+    bench('canonicalize', canonicalize, corpus, args.repeat)
+
+    results = [canonicalize(url) for url in corpus]
+    network = sum(1 for result in results if result.needs_resolution)
+    with_asin = sum(1 for result in results if result.asin)
+    print(f"ASIN found offline: {with_asin}/{len(corpus)} ({with_asin / len(corpus):.0%})")
+    # Before: every uncached link went through a HEAD-with-redirects lookup
+    print(f"network lookups:    {len(corpus)} -> {network} ({network / len(corpus):.0%})")
+    print(f"lookup time saved:  ~{(len(corpus) - network) * args.network_latency / 60:.0f} min per {len(corpus)} links "
+          f"at {args.network_latency}s each")
+
+    for url, result in list(zip(corpus, results))[:len(LINK_SHAPES)]:
+        print(f"  {url[:70]:<70} -> {result.url}")
+
+if __name__ == '__main__':
+    main()
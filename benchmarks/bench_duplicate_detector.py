@@ -0,0 +1,69 @@
+# benchmarks/bench_duplicate_detector.py
+"""Per-call cost of DuplicateDetector.check_and_mark under thread contention.
+
+Run from the repo root:
+    python -m benchmarks.bench_duplicate_detector --threads 1 8 32 --calls 2000
+"""
+import os
+import time
+import argparse
+import tempfile
+import threading
+from services.dedup_store import MemoryDedupStore, SQLiteDedupStore
+from services.duplicate_detector import DuplicateDetector
+
+def run(detector, threads, calls_per_thread, duplicate_ratio):
+    """Every thread hammers check_and_mark; a share of the URLs is shared between threads"""
+    barrier = threading.Barrier(threads + 1)
+    reserved = [0] * threads
+    shared_every = max(1, int(1 / duplicate_ratio)) if duplicate_ratio else 0
+
+    def worker(index):
+        barrier.wait()
+        for i in range(calls_per_thread):
+            if shared_every and i % shared_every == 0:
+                url = f"https://www.amazon.in/dp/B{i:09d}?tag=shared"
+            else:
+                url = f"https://www.amazon.in/dp/T{index:03d}{i:06d}?ref=x"
+            if detector.check_and_mark(url) is not None:
+                reserved[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    total = threads * calls_per_thread
+    return {
+        'calls': total,
+        'reserved': sum(reserved),
+        'us_per_call': elapsed / total * 1e6,
+        'calls_per_sec': total / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--calls', type=int, default=2000, help='calls per thread')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1)
+    parser.add_argument('--backends', nargs='+', default=['memory', 'sqlite'])
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'threads':>7} {'calls':>8} {'reserved':>9} {'us/call':>9} {'calls/s':>10}")
+    for backend in args.backends:
+        for threads in args.threads:
+            with tempfile.TemporaryDirectory() as tmp:
+                if backend == 'sqlite':
+                    store = SQLiteDedupStore(os.path.join(tmp, 'dedup.db'), ttl_seconds=3600, max_entries=10**7)
+                else:
+                    store = MemoryDedupStore(ttl_seconds=3600, max_entries=10**7)
+                result = run(DuplicateDetector(store=store), threads, args.calls, args.duplicate_ratio)
+            print(f"{backend:<8} {threads:>7} {result['calls']:>8} {result['reserved']:>9} "
+                  f"{result['us_per_call']:>9.1f} {result['calls_per_sec']:>10.0f}")
+
+if __name__ == '__main__':
+    main()
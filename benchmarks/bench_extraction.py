@@ -0,0 +1,49 @@
+# benchmarks/bench_extraction.py
+"""Compare the lxml extraction engine with the legacy BeautifulSoup path.
+
+Run from the repo root:
+    python -m benchmarks.bench_extraction --pages "saved_pages/*.html" --repeat 5
+Without --pages (or if nothing matches) synthetic ~1 MB pages are used.
+"""
+import time
+import logging
+import argparse
+from services.amazon_processor import AmazonProcessor
+from services.product_extractor import extract_product_fields
+from benchmarks.page_fixtures import load_pages
+
+def bench(name, func, pages, repeat):
+    results = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for key, html in pages:
+            results[key] = func(html)
+    elapsed = time.perf_counter() - start
+    per_page_ms = elapsed / (repeat * len(pages)) * 1000
+    print(f"{name:<6} {per_page_ms:>9.2f} ms/page")
+    return results, per_page_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', help='glob of saved product pages')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Per-field log lines of the bs4 path would dominate the timing
+    logging.disable(logging.WARNING)
+    pages = load_pages(args.pages)
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"{len(pages)} pages, {total_kb / len(pages):.0f} KB average")
+
+    processor = AmazonProcessor('bench-21', parser_processes=0)
+    bs4_results, bs4_ms = bench('bs4', processor._parse_with_bs4, pages, args.repeat)
+    lxml_results, lxml_ms = bench('lxml', extract_product_fields, pages, args.repeat)
+    print(f"speedup: {bs4_ms / lxml_ms:.1f}x")
+
+    mismatches = [key for key in bs4_results if bs4_results[key] != lxml_results[key]]
+    for key in mismatches:
+        print(f"mismatch {key}:\n  bs4:  {bs4_results[key]}\n  lxml: {lxml_results[key]}")
+    print(f"{len(pages) - len(mismatches)}/{len(pages)} pages extracted identically")
+
+if __name__ == '__main__':
+    main()
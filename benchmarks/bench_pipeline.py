@@ -0,0 +1,153 @@
+# benchmarks/bench_pipeline.py
+"""End-to-end throughput/latency of /api/process against fake Amazon, TinyURL and Telegram servers.
+
+Run from the repo root:
+    python -m benchmarks.bench_pipeline --links 200 --rate 20 --amazon-latency 0.4 --error-rate 0.05
+Links are POSTed on an open-loop schedule (--rate per second) through Flask's test client; a link counts
+as done when the fake Telegram has received it on every channel. Nothing leaves the machine.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fake_services import FakeServices
+from benchmarks.page_fixtures import load_pages
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def fmt_seconds(value):
+    return '-' if value is None else f"{value:.3f}s"
+
+def configure_env(args, services, workdir):
+    """Point the app at the fakes; values already set in the environment win"""
+    defaults = {
+        'TELEGRAM_BOT_TOKEN': '123456:bench',
+        'WEBHOOK_URL': 'http://localhost',
+        'OUTPUT_CHANNELS': ','.join(str(-1000000000000 - i) for i in range(args.channels)),
+        'JOB_DB_PATH': os.path.join(workdir, 'jobs.db'),
+        'DEDUP_DB_PATH': os.path.join(workdir, 'dedup.db'),
+        'SHORTENER_DB_PATH': os.path.join(workdir, 'shortener.db'),
+        'PRICE_HISTORY_DB_PATH': os.path.join(workdir, 'price_history.db'),
+        'TELEGRAM_API_BASE': services.base_url('telegram'),
+        'TINYURL_API_BASE': services.base_url('tinyurl'),
+        'TINYURL_BASIC_BASE': services.base_url('tinyurl'),
+        'TINYURL_API_TOKEN': 'bench',
+        'RATE_LIMIT_RPS': str(args.amazon_rps),
+        'RATE_LIMIT_MAX_RPS': str(max(args.amazon_rps, 1)),
+        'TELEGRAM_CHAT_MESSAGES_PER_MINUTE': str(args.telegram_chat_rpm),
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+def print_summary(title, summary):
+    if not summary:
+        return
+    print(f"\n{title}")
+    for name, row in sorted(summary.items()):
+        print(f"  {name:<14} n={row['count']:<6} avg={row['avg']:.3f}s p50<={row['p50']} p95<={row['p95']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=10, help='links submitted per second (open loop)')
+    parser.add_argument('--pages', help='glob of saved product pages (synthetic pages if omitted)')
+    parser.add_argument('--amazon-latency', type=float, default=0.3, help='seconds per product page')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of page fetches answered with 503')
+    parser.add_argument('--redirects', type=int, default=2, help='hops behind each short link')
+    parser.add_argument('--short-fraction', type=float, default=0.5, help='fraction of links sent as short links')
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--tinyurl-latency', type=float, default=0.1)
+    parser.add_argument('--telegram-latency', type=float, default=0.1)
+    parser.add_argument('--amazon-rps', type=float, default=50, help='RATE_LIMIT_RPS for the fake Amazon host')
+    parser.add_argument('--telegram-chat-rpm', type=float, default=6000,
+                        help='per-channel messages/minute (real Telegram allows ~20)')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for deliveries')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    pages = load_pages(args.pages)
+    services = FakeServices(
+        pages, amazon_latency=args.amazon_latency, error_rate=args.error_rate,
+        tinyurl_latency=args.tinyurl_latency, telegram_latency=args.telegram_latency,
+    ).start()
+    workdir = tempfile.mkdtemp(prefix='bench-pipeline-')
+    configure_env(args, services, workdir)
+
+    # Config env padhta hai import par, isliye app fakes ke baad hi import ho
+    import app
+    flask_app = app.create_app()
+    client = flask_app.test_client()
+
+    short_every = round(1 / args.short_fraction) if args.short_fraction > 0 else 0
+    links = []
+    for n in range(args.links):
+        asin = f"B{n:09d}"
+        url = services.short_url(asin, args.redirects) if short_every and n % short_every == 0 else services.product_url(asin)
+        links.append((asin, url))
+
+    print(f"{args.links} links at {args.rate}/s, {len(pages)} pages, {args.channels} channels, "
+          f"amazon {args.amazon_latency}s, error rate {args.error_rate:.0%}")
+
+    submitted = {}  # {asin: monotonic submit time}
+    statuses = {}
+
+    def submit(index, asin, url, t0):
+        delay = t0 + index / args.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        submitted[asin] = time.monotonic()
+        response = client.post('/api/process', json={'url': url, 'text': f"Deal {url}"})
+        status = response.get_json().get('status', response.status_code)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        for index, (asin, url) in enumerate(links):
+            pool.submit(submit, index, asin, url, t0)
+
+        # Sab links har channel tak pahunch jayein ya timeout
+        deadline = t0 + args.links / args.rate + args.timeout
+        while time.monotonic() < deadline:
+            done = sum(1 for asin, _ in links if len(services.deliveries.get(asin, ())) >= args.channels)
+            if done == args.links:
+                break
+            time.sleep(0.05)
+
+    latencies = []
+    finished_at = t0
+    for asin, _ in links:
+        deliveries = services.deliveries.get(asin, ())
+        if len(deliveries) >= args.channels and asin in submitted:
+            last = max(ts for _, ts in deliveries)
+            latencies.append(last - submitted[asin])
+            finished_at = max(finished_at, last)
+    elapsed = finished_at - t0
+
+    print(f"\nsubmitted: {statuses}")
+    print(f"delivered: {len(latencies)}/{args.links} links to all channels in {elapsed:.2f}s")
+    if latencies:
+        print(f"throughput: {len(latencies) / elapsed:.2f} links/s")
+        print(f"latency: p50={fmt_seconds(percentile(latencies, 0.5))} p95={fmt_seconds(percentile(latencies, 0.95))} "
+              f"p99={fmt_seconds(percentile(latencies, 0.99))} max={fmt_seconds(max(latencies))}")
+
+    stats = app.collect_stats()
+    print_summary('stages (bucket upper bounds):', stats['stages'])
+    print_summary('operations:', stats['operations'])
+    print_summary('channels:', stats['channels'])
+    print(f"\njobs: {stats['jobs']}")
+    print(f"retries: {stats['retries']}")
+    print(f"fakes: {services.get_stats()}")
+
+    app.job_engine.stop()
+    services.stop()
+    sys.exit(0 if len(latencies) == args.links else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/check_redis_dedup.py
+"""RedisDedupStore against the in-process RESP stand-in: all-or-nothing inserts, TTLs, crash safety, races.
+
+Run from the repo root:
+    python -m benchmarks.check_redis_dedup
+Exits non-zero on the first failed check.
+"""
+import sys
+import threading
+from benchmarks.fake_redis import FakeRedis
+from services.dedup_store import RedisDedupStore
+
+TTL = 3600
+
+def check(name, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {name}")
+    if not condition:
+        sys.exit(1)
+
+def main():
+    fake = FakeRedis().start()
+    store = RedisDedupStore(fake.url, TTL)
+    try:
+        check("insert into empty store", store.add_if_absent(['url:a', 'asin:A']))
+        check("overlapping group is rejected", not store.add_if_absent(['asin:A', 'url:b']))
+        check("rejected group wrote nothing", not store.contains_any(['url:b']))
+        check("every key got its TTL", all(0 < fake.ttl(f'dedup:{key}') <= TTL for key in ('url:a', 'asin:A')))
+
+        results = store.add_if_absent_many([['url:c'], ['url:c', 'asin:C'], ['url:d'], ['asin:A']])
+        check("batch: later groups see earlier ones", results == [True, False, True, False])
+        check("batch: rejected group wrote nothing", not store.contains_any(['asin:C']))
+        check("len() via SCAN", len(store) == 4)
+
+        fake.advance(TTL + 1)
+        check("keys expire server-side", not store.contains_any(['url:a', 'asin:A', 'url:c', 'url:d']))
+        check("expired keys can be reserved again", store.add_if_absent(['url:a']))
+
+        # Connection dies right before EXEC: nothing may be left behind, least of all a key without a TTL
+        fake.kill_before('EXEC')
+        try:
+            store.add_if_absent(['url:crash', 'asin:CRASH'])
+            raised = False
+        except (OSError, ConnectionError):
+            raised = True
+        check("lost EXEC is reported, not retried", raised)
+        check("lost EXEC wrote nothing", not store.contains_any(['url:crash', 'asin:CRASH']))
+
+        # Connection dies before anything was written: retried transparently
+        fake.kill_before('WATCH')
+        check("dropped connection before WATCH is retried", store.add_if_absent(['url:retry']))
+        check("no key without a TTL", all(fake.ttl(key) > 0 for key in ('dedup:url:a', 'dedup:url:retry')))
+
+        # Separate clients racing for the same keys: exactly one wins
+        winners = []
+        stores = [RedisDedupStore(fake.url, TTL) for _ in range(16)]
+        barrier = threading.Barrier(len(stores))
+
+        def race(client):
+            barrier.wait()
+            if client.add_if_absent(['url:race', 'asin:RACE']):
+                winners.append(client)
+
+        threads = [threading.Thread(target=race, args=(client,)) for client in stores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        check(f"one winner out of {len(stores)} racing clients", len(winners) == 1)
+        print(f"{fake.commands.count('EXEC')} EXECs, {fake.commands.count('WATCH')} WATCHes sent")
+    finally:
+        fake.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/check_streaming_scanner.py
+"""StreamingProductScanner against a full-page parse, for every built-in marketplace's selectors.
+
+An early stop must give exactly what extract_product_fields returns for the whole page, and
+pages that have all fields near the top must actually stop early.
+
+Run from the repo root:
+    python -m benchmarks.check_streaming_scanner
+Exits non-zero on the first failed check.
+"""
+import sys
+from benchmarks.page_fixtures import make_product_page
+from services.marketplace import MARKETPLACE_DEFAULTS, MarketplaceRegistry
+from services.product_extractor import StreamingProductScanner, extract_product_fields
+
+CHUNK_SIZES = (4096, 65536)
+
+def check(name, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {name}")
+    if not condition:
+        sys.exit(1)
+
+def page_variants(symbol):
+    """(name, html, should stop early)"""
+    page = make_product_page('B0CHECK001', 'Check Product Wireless Earbuds (Black)', '1,299', mrp='2,999')
+    page = page.replace('₹', symbol)
+    yield 'with MRP', page, True
+    yield 'without MRP', make_product_page('B0CHECK002', 'Check Product Wireless Earbuds (Black)', '1,299').replace('₹', symbol), True
+    yield 'empty offscreen price', page.replace(f'<span class="a-offscreen">{symbol}1,299</span>', '<span class="a-offscreen"></span>'), True
+    yield 'no image', page.replace('id="landingImage"', 'id="otherImage"'), False
+    yield 'no price', page.replace('a-price', 'x-price').replace('a-offscreen', 'x-offscreen'), False
+
+def scan(html, options, chunk_size):
+    scanner = StreamingProductScanner(encoding='utf-8', **options)
+    stopped = False
+    for start in range(0, len(html), chunk_size):
+        if scanner.feed(html[start:start + chunk_size]):
+            stopped = True
+            break
+    return scanner.result(), stopped, scanner.bytes_fed
+
+def main():
+    registry = MarketplaceRegistry(default_tag='check-21')
+    for domain in MARKETPLACE_DEFAULTS:
+        options = registry.get(domain).extraction_options()
+        for name, html, stops in page_variants(options['currency_symbols'][0]):
+            html = html.encode('utf-8')
+            expected = extract_product_fields(html, **options)
+            for chunk_size in CHUNK_SIZES:
+                result, stopped, read = scan(html, options, chunk_size)
+                label = f"{domain} {name} ({chunk_size // 1024} KB chunks, read {read // 1024}/{len(html) // 1024} KB)"
+                check(f"{label}: same fields as the full page", result == expected)
+                check(f"{label}: {'stops early' if stops else 'reads the whole page'}", stopped == stops)
+
+if __name__ == '__main__':
+    main()
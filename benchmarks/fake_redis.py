@@ -0,0 +1,187 @@
+# benchmarks/fake_redis.py
+"""In-process Redis stand-in speaking RESP2 over TCP, for exercising RedisDedupStore without a server.
+
+Supports the commands the dedup store uses (SET NX/EX, GET, MGET, EXISTS, DEL, EXPIRE, TTL, SCAN,
+WATCH/UNWATCH/MULTI/EXEC/DISCARD) plus PING/AUTH/SELECT. TTLs follow a clock that tests can move
+with advance(), and kill_before(command) drops the connection instead of running that command.
+"""
+import time
+import fnmatch
+import threading
+import socketserver
+
+
+class FakeRedis:
+    def __init__(self, host='127.0.0.1', port=0):
+        self._data = {}      # {key: (value bytes, expires_at or None)}
+        self._versions = {}  # {key: write counter}, for WATCH
+        self._lock = threading.Lock()
+        self._offset = 0.0
+        self._kill_on = None
+        self.commands = []   # every command name received, in order
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fake._serve(self.rfile, self.wfile)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-redis", daemon=True)
+
+    # ---------- Control ----------
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"redis://{host}:{port}/0"
+
+    def advance(self, seconds):
+        """Move the TTL clock forward"""
+        self._offset += seconds
+
+    def kill_before(self, command):
+        """Drop the client connection the next time `command` arrives (it is not executed)"""
+        self._kill_on = command.upper()
+
+    def ttl(self, key):
+        with self._lock:
+            return self._ttl(key.encode() if isinstance(key, str) else key)
+
+    # ---------- Protocol ----------
+    def _now(self):
+        return time.time() + self._offset
+
+    def _serve(self, rfile, wfile):
+        watched = None   # {key: version} after WATCH
+        queued = None    # [args] after MULTI
+        while True:
+            args = self._read_command(rfile)
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            self.commands.append(name)
+            if self._kill_on == name:
+                self._kill_on = None
+                return
+            try:
+                if name == 'MULTI':
+                    queued = []
+                    reply = 'OK'
+                elif name == 'EXEC':
+                    with self._lock:
+                        intact = all(self._versions.get(key, 0) == version for key, version in (watched or {}).items())
+                        reply = [self._run(cmd) for cmd in queued] if intact else None
+                    watched = queued = None
+                elif name == 'DISCARD':
+                    watched = queued = None
+                    reply = 'OK'
+                elif queued is not None:
+                    queued.append(args)
+                    reply = 'QUEUED'
+                elif name == 'WATCH':
+                    with self._lock:
+                        watched = dict(watched or {}, **{key.decode(): self._versions.get(key.decode(), 0) for key in args[1:]})
+                    reply = 'OK'
+                elif name == 'UNWATCH':
+                    watched = None
+                    reply = 'OK'
+                else:
+                    with self._lock:
+                        reply = self._run(args)
+            except Exception as e:
+                reply = e
+            wfile.write(self._encode(reply))
+            wfile.flush()
+
+    @staticmethod
+    def _read_command(rfile):
+        line = rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(rfile.readline()[1:-2])
+            args.append(rfile.read(length + 2)[:-2])
+        return args
+
+    def _encode(self, reply):
+        if isinstance(reply, Exception):
+            return f"-ERR {reply}\r\n".encode()
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if isinstance(reply, bytes):
+            return f"${len(reply)}\r\n".encode() + reply + b"\r\n"
+        return f"*{len(reply)}\r\n".encode() + b''.join(self._encode(item) for item in reply)
+
+    # ---------- Commands (called with the lock held) ----------
+    def _alive(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self._now():
+            del self._data[key]
+            return None
+        return entry
+
+    def _write(self, key, entry):
+        if entry is None:
+            self._data.pop(key, None)
+        else:
+            self._data[key] = entry
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def _ttl(self, key):
+        entry = self._alive(key.decode() if isinstance(key, bytes) else key)
+        if entry is None:
+            return -2
+        return -1 if entry[1] is None else int(entry[1] - self._now())
+
+    def _run(self, args):
+        name, rest = args[0].decode().upper(), [arg.decode() for arg in args[1:]]
+        if name in ('PING',):
+            return 'PONG'
+        if name in ('AUTH', 'SELECT'):
+            return 'OK'
+        if name == 'GET':
+            entry = self._alive(rest[0])
+            return entry[0] if entry else None
+        if name == 'MGET':
+            return [entry[0] if entry else None for entry in map(self._alive, rest)]
+        if name == 'EXISTS':
+            return sum(1 for key in rest if self._alive(key))
+        if name == 'SET':
+            key, value, options = rest[0], args[2], [option.upper() for option in rest[2:]]
+            if 'NX' in options and self._alive(key):
+                return None
+            expires_at = self._now() + int(rest[2 + options.index('EX') + 1]) if 'EX' in options else None
+            self._write(key, (value, expires_at))
+            return 'OK'
+        if name == 'DEL':
+            removed = sum(1 for key in rest if self._alive(key))
+            for key in rest:
+                self._write(key, None)
+            return removed
+        if name == 'EXPIRE':
+            entry = self._alive(rest[0])
+            if entry is None:
+                return 0
+            self._write(rest[0], (entry[0], self._now() + int(rest[1])))
+            return 1
+        if name == 'TTL':
+            return self._ttl(rest[0])
+        if name == 'SCAN':
+            pattern = rest[rest.index('MATCH') + 1] if 'MATCH' in rest else '*'
+            keys = [key.encode() for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+            return [b'0', keys]
+        raise ValueError(f"unknown command '{name}'")
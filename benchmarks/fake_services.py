@@ -0,0 +1,169 @@
+# benchmarks/fake_services.py
+"""Local stand-ins for Amazon, TinyURL and the Telegram Bot API, for offline benchmarks.
+
+All three run as aiohttp apps on one event loop in a background thread:
+    services = FakeServices(pages, amazon_latency=0.3, error_rate=0.05).start()
+    ...
+    services.stop()
+"""
+import re
+import time
+import random
+import asyncio
+import threading
+from aiohttp import web
+
+_ASIN_RE = re.compile(r'(?:/dp/|tinyurl\.com/b-)([A-Z0-9]{10})')
+
+
+class FakeServices:
+    def __init__(self, pages, amazon_latency=0.3, latency_jitter=0.3, error_rate=0.0,
+                 tinyurl_latency=0.1, telegram_latency=0.1, seed=1):
+        self.pages = pages  # [(name, html bytes)], served round-robin by ASIN
+        self.amazon_latency = amazon_latency
+        self.latency_jitter = latency_jitter  # +/- fraction of the base latency
+        self.error_rate = error_rate
+        self.tinyurl_latency = tinyurl_latency
+        self.telegram_latency = telegram_latency
+        self.rng = random.Random(seed)
+
+        self.loop = None
+        self._thread = None
+        self._runners = []
+        self._ready = threading.Event()
+        self.ports = {}
+
+        self.page_requests = 0
+        self.blocked_requests = 0
+        self.redirects = 0
+        self.shortened = 0
+        self.deliveries = {}  # {asin: [(chat_id, monotonic time)]}
+        self._delivery_lock = threading.Lock()
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fake-services", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start_apps())
+        self._ready.set()
+        self.loop.run_forever()
+
+    async def _start_apps(self):
+        for name, app in (('amazon', self._amazon_app()), ('tinyurl', self._tinyurl_app()), ('telegram', self._telegram_app())):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            self.ports[name] = runner.addresses[0][1]
+            self._runners.append(runner)
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        async def _cleanup():
+            for runner in self._runners:
+                await runner.cleanup()
+
+        asyncio.run_coroutine_threadsafe(_cleanup(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(10)
+
+    def base_url(self, name):
+        return f"http://127.0.0.1:{self.ports[name]}"
+
+    # ---------- Links ----------
+    def product_url(self, asin):
+        return f"{self.base_url('amazon')}/dp/{asin}?ref_=bench"
+
+    def short_url(self, asin, hops):
+        """Short link that reaches the product page after `hops` redirects"""
+        return f"{self.base_url('amazon')}/r/{hops}/{asin}"
+
+    async def _sleep(self, base):
+        if base > 0:
+            await asyncio.sleep(base * (1 + self.rng.uniform(-self.latency_jitter, self.latency_jitter)))
+
+    # ---------- Amazon ----------
+    def _amazon_app(self):
+        app = web.Application()
+        app.router.add_get('/dp/{asin}', self._product_page)
+        app.router.add_get('/r/{hops}/{asin}', self._redirect)
+        return app
+
+    async def _redirect(self, request):
+        self.redirects += 1
+        hops = int(request.match_info['hops'])
+        asin = request.match_info['asin']
+        await self._sleep(self.amazon_latency / 4)
+        target = f"/r/{hops - 1}/{asin}" if hops > 1 else f"/dp/{asin}?ref_=bench_short"
+        raise web.HTTPFound(target)
+
+    async def _product_page(self, request):
+        asin = request.match_info['asin']
+        if request.method == 'HEAD':
+            return web.Response(status=200)
+        self.page_requests += 1
+        await self._sleep(self.amazon_latency)
+        if self.rng.random() < self.error_rate:
+            self.blocked_requests += 1
+            return web.Response(status=503, text='Service Unavailable')
+        _, html = self.pages[int(asin[1:]) % len(self.pages)]
+        return web.Response(body=html, content_type='text/html', charset='utf-8')
+
+    # ---------- TinyURL ----------
+    def _tinyurl_app(self):
+        app = web.Application()
+        app.router.add_post('/create', self._tinyurl_create)
+        app.router.add_get('/api-create.php', self._tinyurl_basic)
+        return app
+
+    def _short_for(self, long_url):
+        self.shortened += 1
+        match = _ASIN_RE.search(long_url)
+        return f"https://tinyurl.com/b-{match.group(1) if match else self.shortened}"
+
+    async def _tinyurl_create(self, request):
+        data = await request.json()
+        await self._sleep(self.tinyurl_latency)
+        return web.json_response({'data': {'tiny_url': self._short_for(data['url'])}, 'code': 0})
+
+    async def _tinyurl_basic(self, request):
+        await self._sleep(self.tinyurl_latency)
+        return web.Response(text=self._short_for(request.query['url']))
+
+    # ---------- Telegram ----------
+    def _telegram_app(self):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._telegram_method)
+        return app
+
+    async def _telegram_method(self, request):
+        data = await request.json()
+        await self._sleep(self.telegram_latency)
+        text = data.get('caption') or data.get('text') or ''
+        match = _ASIN_RE.search(text)
+        if match:
+            with self._delivery_lock:
+                self.deliveries.setdefault(match.group(1), []).append((data.get('chat_id'), time.monotonic()))
+        result = {'message_id': self.rng.randint(1, 10 ** 9), 'chat': {'id': data.get('chat_id')}}
+        if request.match_info['method'] == 'sendPhoto':
+            photo = data.get('photo', '')
+            file_id = photo if not str(photo).startswith('http') else f"file-{abs(hash(photo))}"
+            result['photo'] = [{'file_id': f"{file_id}-small"}, {'file_id': file_id}]
+        return web.json_response({'ok': True, 'result': result})
+
+    def get_stats(self):
+        return {
+            'page_requests': self.page_requests,
+            'blocked_requests': self.blocked_requests,
+            'redirects': self.redirects,
+            'shortened': self.shortened,
+            'delivered_links': len(self.deliveries),
+        }
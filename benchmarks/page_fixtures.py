@@ -0,0 +1,65 @@
+# benchmarks/page_fixtures.py
+"""Synthetic Amazon-like product pages for benchmarks when no recorded pages are available"""
+import glob
+import random
+
+_FILLER_BLOCK = (
+    '<div class="a-section a-spacing-small"><ul class="a-unordered-list a-vertical">'
+    '<li><span class="a-list-item">Lorem ipsum dolor sit amet, consectetur adipiscing elit {n}</span></li>'
+    '<li><span class="a-list-item">Sed do eiusmod tempor incididunt ut labore et dolore {n}</span></li>'
+    '</ul><script>var x{n} = {{"k": "{pad}"}};</script></div>\n'
+)
+
+def make_product_page(asin, title, price, mrp=None, image_url=None, head_kb=150, tail_kb=900, seed=None):
+    """Build a page shaped like a real product page: big head, product block, long tail of widgets"""
+    rng = random.Random(seed if seed is not None else asin)
+    image_url = image_url or f"https://m.media-amazon.com/images/I/{asin}._SL1500_.jpg"
+
+    def filler(kb):
+        blocks = []
+        size = 0
+        n = 0
+        while size < kb * 1024:
+            block = _FILLER_BLOCK.format(n=n, pad='x' * rng.randint(200, 600))
+            blocks.append(block)
+            size += len(block)
+            n += 1
+        return ''.join(blocks)
+
+    mrp_html = ''
+    if mrp:
+        mrp_html = (
+            '<span class="a-price a-text-price" data-a-strike="true">'
+            f'<span class="a-offscreen">₹{mrp}</span></span>'
+        )
+    return (
+        '<!DOCTYPE html><html lang="en-in"><head><meta charset="utf-8">'
+        f'<title>Amazon.in: {title}</title>'
+        f'<script>{filler(head_kb)}</script></head><body>'
+        '<div id="dp-container"><div id="centerCol">'
+        f'<h1 id="title" class="a-size-large a-spacing-none"><span id="productTitle" class="a-size-large product-title-word-break">  {title}  </span></h1>'
+        '<div id="corePrice_feature_div"><div class="a-section">'
+        f'<span class="a-price aok-align-center"><span class="a-offscreen">₹{price}</span>'
+        f'<span aria-hidden="true"><span class="a-price-symbol">₹</span><span class="a-price-whole">{price}</span></span></span>'
+        f'{mrp_html}'
+        '</div></div></div>'
+        '<div id="leftCol"><div id="imgTagWrapperId" class="imgTagWrapper">'
+        f'<img alt="{title}" src="{image_url}" data-old-hires="{image_url}" id="landingImage" class="a-dynamic-image">'
+        '</div></div>'
+        f'{filler(tail_kb)}'
+        '</div></body></html>'
+    )
+
+def load_pages(pattern=None, count=10):
+    """Recorded pages matching pattern, or synthetic ones if none match"""
+    pages = []
+    if pattern:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'rb') as f:
+                pages.append((path, f.read()))
+    if not pages:
+        for i in range(count):
+            asin = f"B0SYNTH{i:03d}"
+            html = make_product_page(asin, f"Synthetic Product {i} Wireless Earbuds (Black)", f"{1299 + i * 100:,}", mrp=f"{2999 + i * 100:,}")
+            pages.append((asin, html.encode('utf-8')))
+    return pages
@@ -1,13 +1,18 @@
 # main.py (Final Simple Version)
-from app import create_app
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-logger.info("🔧 Creating Flask app instance for Gunicorn...")
-app = create_app()
-logger.info("✅ Flask app instance created.")
+# NOTE: parser process pool 'spawn' use karta hai, jo har child mein yeh file '__mp_main__' naam se dobara
+# import karta hai. Guard na ho to har parser child apna create_app() chala deta (JobEngine, queue_worker,
+# webhook worker) aur shared SQLite queue se jobs lease karne lagta. Gunicorn ise 'main' naam se import karta hai.
+if __name__ != '__mp_main__':
+    from app import create_app
+
+    logger.info("🔧 Creating Flask app instance for Gunicorn...")
+    app = create_app()
+    logger.info("✅ Flask app instance created.")
 
 # Local testing ke liye
 if __name__ == '__main__':
@@ -1,87 +1,232 @@
-import aiohttp
+import time
 import logging
-import re
 import asyncio
 import random
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 from bs4 import BeautifulSoup
 from services.url_shortener import URLShortener
-from functools import wraps
+from services.http_client import HTTPSessionManager
+from services.url_resolver import ShortURLResolver
+from services.product_cache import ProductCache
+from services.pipeline import Stage, StageGraph, no_limit
+from services.rate_limiter import AdaptiveRateLimiter
+from services.retry_policy import RetryPolicy, FetchError, PARSE_MISS
+from services.metrics import MetricsRegistry
+from services.marketplace import MarketplaceRegistry
+from services.tracing import span, annotate, annotate_trace
+from utils.helpers import extract_asin_from_url
+from utils.url_canonical import canonicalize
+from services.product_extractor import (
+    ProductExtractor, StreamingProductScanner, TITLE_SELECTORS, PRICE_SELECTORS, MRP_SELECTORS, IMAGE_SELECTORS,
+    clean_title, clean_price, normalize_image_src,
+)
+from utils.price_parser import ParsedPrice, parse_price
 
 logger = logging.getLogger(__name__)
 
-# Retry decorator for async functions
-def retry_on_failure(max_retries=3, delay=5):
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            for attempt in range(max_retries):
-                try:
-                    return await func(*args, **kwargs)
-                except (aiohttp.ClientError, asyncio.TimeoutError, Exception) as e:
-                    logger.warning(f"❌ Attempt {attempt + 1} failed with error: {e}. Retrying in {delay}s...")
-                    if attempt == max_retries - 1:
-                        raise e
-                    await asyncio.sleep(delay)
-            return None
-        return wrapper
-    return decorator
-
 class AmazonProcessor:
-    def __init__(self, affiliate_tag):
+    def __init__(self, affiliate_tag, session_manager=None, resolver=None, html_parser='lxml', parser_processes=2,
+                 streaming_fetch=True, stream_chunk_size=65536, product_cache=None, url_shortener=None,
+                 rate_limiter=None, retry_policy=None, metrics=None, marketplaces=None, price_history=None,
+                 fetch_limiter=None):
         self.affiliate_tag = affiliate_tag
-        self.url_shortener = URLShortener()
+        self.session_manager = session_manager or HTTPSessionManager()
+        # Per-storefront tag / currency / selectors and product-page connection pools (affiliate_tag is the fallback)
+        self.marketplaces = marketplaces or MarketplaceRegistry(default_tag=affiliate_tag)
+        # Per-host adaptive pacing shared by all jobs (replaces the fixed random sleeps)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        # Failed page fetches are retried here, inside the scrape stage, not by rerunning the pipeline
+        self.retry_policy = retry_policy or RetryPolicy()
+        # fetch_limiter(name, key) -> async context manager around each page request, keyed by marketplace
+        # (e.g. JobEngine.stage); the scrape stage itself is not slot-limited, so waits don't hold a slot
+        self.fetch_limiter = fetch_limiter or no_limit
+        self.resolver = resolver or ShortURLResolver(session_manager=self.session_manager)
+        # 'lxml' = compiled XPath engine in a process pool, 'bs4' = old BeautifulSoup path
+        self.html_parser = html_parser
+        self.extractor = ProductExtractor(processes=parser_processes)
+        # Streaming mode stops reading the page once title, price and image are parsed
+        self.streaming_fetch = streaming_fetch and html_parser == 'lxml'
+        self.stream_chunk_size = stream_chunk_size
+        # bytes_saved is only known for uncompressed responses with a Content-Length; other early stops
+        # (gzip/br or chunked, i.e. nearly all real Amazon pages) are counted in early_stops_unmeasured
+        self.stream_stats = {'pages': 0, 'early_stops': 0, 'early_stops_unmeasured': 0, 'bytes_read': 0, 'bytes_saved': 0}
+        self.url_shortener = url_shortener or URLShortener(session_manager=self.session_manager)
+        # ASIN-keyed cache; hot deals skip the scrape entirely
+        self.product_cache = product_cache if product_cache is not None else ProductCache()
+        self._refreshing = {}  # {asin: Task} background stale-while-revalidate refreshes
+        # Optional PriceHistory: the price each job sees is compared with (and appended to) the ASIN's history
+        self.price_history = price_history
+        self.metrics = metrics or MetricsRegistry()
+        self._operation_latency = self.metrics.histogram(
+            'operation_duration_seconds', 'Latency of individual operations inside stages', ['operation'])
+        self._amazon_responses = self.metrics.counter(
+            'amazon_responses_total', 'Product page responses by HTTP status', ['status'])
+        self._resolutions = self.metrics.counter(
+            'url_resolutions_total', 'Incoming links resolved to a product URL, by how', ['mode'])
+        self._price_movements = self.metrics.counter(
+            'price_movements_total', 'Scraped prices compared with the ASIN price history', ['movement'])
         logger.info(f"🏷️ Amazon Processor initialized with tag: {affiliate_tag}")
 
-    @retry_on_failure(max_retries=3, delay=5)
-    async def process_link_with_retry(self, url):
-        """Process Amazon link and return product info with affiliate tag with retries"""
+    def build_graph(self, limiter=None, observer=None):
+        """Processing stages: resolve -> tag -> {scrape -> price ∥ shorten} -> product.
+
+        Shortening only needs the tagged URL, so it runs while the page is being scraped.
+        """
+        return StageGraph([
+            Stage('resolve', self._stage_resolve),
+            Stage('tag', self._stage_tag, depends_on=['resolve']),
+            Stage('scrape', self._stage_scrape, depends_on=['tag']),
+            Stage('price', self._stage_price, depends_on=['scrape']),
+            Stage('shorten', self._stage_shorten, depends_on=['tag']),
+            Stage('product', self._stage_product, depends_on=['price', 'shorten']),
+        ], limiter=limiter, observer=observer)
+
+    async def process_link_with_retry(self, url, graph=None):
+        """Process Amazon link and return product info with affiliate tag (failed fetches retry per stage)"""
         try:
             logger.info(f"🔄 Processing Amazon link: {url}")
-            
-            # Resolve redirects and get final URL
-            final_url = await self._resolve_redirects(url)
-            
-            # Add affiliate tag
-            affiliate_url = self._add_affiliate_tag(final_url)
-            
-            # Extract product info
-            product_info = await self._extract_product_info_async(affiliate_url)
-            
-            # Get short URL
-            short_url = await self.url_shortener.shorten_url(affiliate_url)
-            
-            # Combine all data
-            result = {
-                'title': product_info.get('title', ''),
-                'price': product_info.get('price', 'Price not available'),
-                'affiliate_link': affiliate_url,
-                'short_link': short_url,
-                'original_url': url,
-                'image_url': product_info.get('image_url')
-            }
-            
-            logger.info(f"✅ Successfully processed: {result.get('title')}")
-            return result
-            
+            ctx = await (graph or self.build_graph()).run({'url': url})
+            return ctx['product']
+
         except Exception as e:
             logger.error(f"❌ Error processing link {url}: {e}")
             return None
 
+    # ---------- Stages ----------
+    async def _stage_resolve(self, ctx):
+        # Resolve redirects and get final URL
+        return await self._resolve_redirects(ctx['url'])
+
+    async def _stage_tag(self, ctx):
+        # Add affiliate tag
+        return self._add_affiliate_tag(ctx['resolve'])
+
+    async def _stage_scrape(self, ctx):
+        # Extract product info (ASIN cache first)
+        asin = extract_asin_from_url(ctx['resolve'])
+        marketplace = self.marketplaces.for_url(ctx['resolve'])
+        annotate_trace(asin=asin, marketplace=marketplace.domain)
+        product_info = await self._get_product_info(self.marketplaces.product_key(asin, marketplace), ctx['tag'])
+        return dict(product_info, asin=asin, marketplace=marketplace.domain, currency=marketplace.currency)
+
+    async def _stage_price(self, ctx):
+        # Numeric price / MRP, plus how it moved since this ASIN was last seen (recorded later, by record_price)
+        product_info = ctx['scrape']
+        parsed = parse_price(product_info.get('price'), product_info.get('currency'), product_info.get('mrp'))
+        if parsed is None:
+            return None
+        key = self.marketplaces.product_key(product_info.get('asin'), self.marketplaces.get(product_info['marketplace']))
+        if self.price_history is None or not key:
+            return parsed.to_dict()
+        movement = await asyncio.to_thread(self.price_history.compare, key, parsed)
+        self._price_movements.inc(movement=movement['movement'])
+        annotate(movement=movement['movement'])
+        return dict(parsed.to_dict(), **movement)
+
+    async def record_price(self, product):
+        """Append a finished job's price to the history (after posting, so a retried attempt sees the same movement)"""
+        price_info = product.get('price_info')
+        if self.price_history is None or not price_info:
+            return
+        key = self.marketplaces.product_key(product.get('asin'), self.marketplaces.get(product['marketplace']))
+        if not key:
+            return
+        parsed = ParsedPrice(price_info['amount'], price_info['currency'], price_info['mrp'])
+        await asyncio.to_thread(self.price_history.record, key, parsed)
+
+    async def _stage_shorten(self, ctx):
+        # Get short URL
+        return await self.url_shortener.shorten_url(ctx['tag'])
+
+    async def _stage_product(self, ctx):
+        # Combine all data
+        product_info = ctx['scrape']
+        result = {
+            'title': product_info.get('title', ''),
+            'price': product_info.get('price', 'Price not available'),
+            'affiliate_link': ctx['tag'],
+            'short_link': ctx['shorten'],
+            'original_url': ctx['url'],
+            'image_url': product_info.get('image_url'),
+            'asin': product_info.get('asin'),
+            'marketplace': product_info.get('marketplace'),
+            'currency': product_info.get('currency'),
+            # {'amount', 'currency', 'mrp', 'discount_percent'} + movement vs. history; None if the price didn't parse
+            'price_info': ctx['price'],
+            # Same dict the graph keeps filling, so later stages (e.g. post) show up too
+            'stage_timings': ctx['stage_timings']
+        }
+        timings = ', '.join(f"{name}={seconds:.2f}s" for name, seconds in ctx['stage_timings'].items())
+        logger.info(f"✅ Successfully processed: {result.get('title')} ({timings})")
+        return result
+
+    async def _get_product_info(self, cache_key, url):
+        """Product info from the ASIN cache, scraping only on a miss (stale entries refresh in the background)"""
+        if not cache_key:
+            return await self._extract_product_info_async(url)
+
+        cached, state = await self._product_cache_call('lookup', cache_key)
+        annotate(product_cache=state)
+        if state == ProductCache.FRESH:
+            logger.info(f"📦 Product cache hit for {cache_key}")
+            return cached
+        if state == ProductCache.STALE:
+            logger.info(f"📦 Serving stale price for {cache_key}, refreshing in background")
+            self._schedule_refresh(cache_key, url)
+            return cached
+
+        product_info = await self._extract_product_info_async(url)
+        await self._product_cache_call('store', cache_key, product_info)
+        return product_info
+
+    async def _product_cache_call(self, method, *args):
+        """ProductCache method; on a worker thread when the cache is backed by SQLite, so disk I/O stays off the loop"""
+        func = getattr(self.product_cache, method)
+        if getattr(self.product_cache, 'db', None) is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    def _schedule_refresh(self, cache_key, url):
+        if cache_key in self._refreshing:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh_product(cache_key, url))
+        self._refreshing[cache_key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(cache_key, None))
+
+    async def _refresh_product(self, cache_key, url):
+        try:
+            product_info = await self._extract_product_info_async(url)
+            # Only the cache is updated: the price history is fed by jobs (price stage), so a drop
+            # found here is reported by the next job that reads this entry instead of being used up
+            await self._product_cache_call('store', cache_key, product_info)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {cache_key}: {e}")
+
     async def _resolve_redirects(self, url, max_redirects=5):
-        """Follow redirects to get final URL with anti-detection"""
+        """Canonical product URL. Full Amazon links are parsed offline; only short/unknown links follow redirects"""
+        canonical = canonicalize(url)
+        if not canonical.needs_resolution:
+            self._resolutions.inc(mode='offline')
+            annotate(resolved='offline')
+            return canonical.url
+
         try:
-            headers = self._get_random_headers()
-            
-            # Add async delay
-            await asyncio.sleep(random.uniform(0.5, 1.5))
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.head(url, headers=headers, allow_redirects=True, timeout=15) as response:
-                    final_url = str(response.url)
-                    logger.info(f"URL resolved: {url} -> {final_url}")
-                    return final_url
-            
+            final_url = self.resolver.peek(url)
+            if final_url:
+                self._resolutions.inc(mode='cache')
+                annotate(resolver_cache='hit')
+            else:
+                headers = self._get_random_headers()
+
+                # Wait for this host's next slot
+                await self.rate_limiter.acquire(url)
+
+                self._resolutions.inc(mode='network')
+                with span('resolve.redirects'):
+                    final_url = await self.resolver.resolve(url, headers=headers)
+            # Expanded short links still carry tracking params
+            return canonicalize(final_url).url
+
         except Exception as e:
             logger.warning(f"Could not resolve redirects for {url}: {e}")
             return url
@@ -93,7 +238,7 @@ class AmazonProcessor:
             query_params = parse_qs(parsed.query)
             
             # Add or replace affiliate tag
-            query_params['tag'] = [self.affiliate_tag]
+            query_params['tag'] = [self.marketplaces.for_url(url).affiliate_tag]
             
             # Rebuild URL
             new_query = urlencode(query_params, doseq=True)
@@ -137,129 +282,176 @@ class AmazonProcessor:
         }
 
     async def _extract_product_info_async(self, url):
-        """ENHANCED product information extraction with anti-detection (async)"""
+        """ENHANCED product information extraction with anti-detection (async), retried per failure class.
+
+        Re-raises once retries (or the retry budget) run out, so the scrape stage fails and the job is
+        requeued or dead-lettered instead of posting a blank product card.
+        """
         try:
-            headers = self._get_random_headers()
-            
-            # Add random async delay
-            await asyncio.sleep(random.uniform(2, 4))
-            
-            async with aiohttp.ClientSession() as session:
+            return await self.retry_policy.run('scrape', self._fetch_product_info, url)
+        except Exception as e:
+            logger.warning(f"Could not extract product info from {url}: {e}")
+            raise
+
+    async def _fetch_product_info(self, url):
+        """One fetch + parse attempt. Raises FetchError (or the network error) so the retry policy can classify it"""
+        headers = self._get_random_headers()
+        
+        # Wait for this host's next slot (before taking a fetch slot, so a throttled host holds none)
+        await self.rate_limiter.acquire(url)
+        
+        marketplace = self.marketplaces.for_url(url)
+        # Marketplace ke apne fetch slots, sirf request ke dauran; retry backoff RetryPolicy mein slot ke bahar hota hai
+        waiting = time.perf_counter()
+        async with self.fetch_limiter('fetch', marketplace.domain):
+            fetch_started = time.perf_counter()
+            # Har marketplace ka apna pool, taake ek slow/blocked storefront baaki sab ke connections na rok le
+            session = await self.marketplaces.session_manager(marketplace).get_session()
+            with span('amazon.fetch', url=url, slot_wait_ms=round((fetch_started - waiting) * 1000, 1)) as fetch_span:
                 async with session.get(url, headers=headers, timeout=25) as response:
+                    fetch_span.set(status=response.status)
+                    self._amazon_responses.inc(status=response.status)
+                    retry_after = self._retry_after(response)
+                    # 503/429 slow this host down, anything else lets it speed back up
+                    self.rate_limiter.report(url, response.status, retry_after)
                     if response.status == 503:
                         logger.warning(f"Amazon blocked request (503) for {url}")
-                        return self._default_product_info()
+                        raise FetchError.from_status(response.status, url, retry_after)
                     elif response.status != 200:
                         logger.warning(f"HTTP {response.status} for {url}")
-                        return self._default_product_info()
-                        
-                    html_content = await response.text()
-                    soup = BeautifulSoup(html_content, 'html.parser')
-            
-            title = self._extract_title_enhanced(soup)
-            price = self._extract_price_enhanced(soup)
-            image_url = self._extract_image_enhanced(soup)
-            
-            result = {
-                'title': title,
-                'price': price,
-                'image_url': image_url
-            }
-            
-            logger.info(f"📋 Extracted - Title: {title}, Price: {price}, Image: {bool(image_url)}")
-            return result
-            
-        except Exception as e:
-            logger.warning(f"Could not extract product info from {url}: {e}")
-            return self._default_product_info()
-
-    def _extract_title_enhanced(self, soup):
-        title_selectors = [
-            '#productTitle',
-            'h1 span#productTitle',
-            'h1.a-size-large.a-spacing-none.a-color-base',
-            '.product-title',
-            '[data-automation-id="product-title"]',
-            'h1.a-size-large',
-            'h1 span',
-            '.a-size-large.product-title-word-break',
-            '#feature-bullets ul li span',
-            '.a-unordered-list .a-list-item',
-            'h1[data-automation-id="product-title"]',
-            '.a-size-large.a-spacing-none.a-color-base.a-text-normal'
-        ]
-        
-        for selector in title_selectors:
+                        raise FetchError.from_status(response.status, url, retry_after)
+
+                    if self.streaming_fetch:
+                        result = await self._stream_product_page(response, url, marketplace)
+                    else:
+                        html_content = await response.read()
+                        fetch_span.set(bytes=len(html_content))
+            self._operation_latency.observe(time.perf_counter() - fetch_started, operation='fetch')
+
+        if not self.streaming_fetch:
+            with self._operation_latency.time(operation='parse'), span('amazon.parse'):
+                result = await self._parse_product_page(html_content, marketplace)
+        title, price, image_url = result['title'], result['price'], result['image_url']
+
+        if not title:
+            # Usually a captcha / robot-check page served with 200
+            raise FetchError(PARSE_MISS, f"No product title found on {url}")
+
+        logger.info(f"📋 Extracted - Title: {title}, Price: {price}, Image: {bool(image_url)}")
+        return result
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get('Retry-After', '')
+        return float(value) if value.isdigit() else None
+
+    async def _stream_product_page(self, response, url, marketplace=None):
+        """Feed the body chunk by chunk to an incremental parser and close the connection once all fields are found"""
+        marketplace = marketplace or self.marketplaces.default
+        # Incremental parse is CPU work; it runs on the extractor's scan thread so other jobs keep moving meanwhile
+        scanner = await self.extractor.scan(
+            StreamingProductScanner, encoding=response.charset or 'utf-8', **marketplace.extraction_options()
+        )
+        stopped_early = False
+        async for chunk in response.content.iter_chunked(self.stream_chunk_size):
+            if await self.extractor.scan(scanner.feed, chunk):
+                stopped_early = True
+                break
+
+        self.stream_stats['pages'] += 1
+        self.stream_stats['bytes_read'] += scanner.bytes_fed
+        annotate(bytes=scanner.bytes_fed, stopped_early=stopped_early)
+        if stopped_early:
+            # Unread body is discarded with the connection instead of being downloaded
+            response.close()
+            self.stream_stats['early_stops'] += 1
+            if response.content_length and not response.headers.get('Content-Encoding'):
+                saved = max(0, response.content_length - scanner.bytes_fed)
+                self.stream_stats['bytes_saved'] += saved
+                logger.info(f"✂️ Stopped reading {url} after {scanner.bytes_fed // 1024} KB (saved {saved // 1024} KB)")
+            else:
+                # Compressed / chunked body: the unread remainder's size is never sent, so it can't be counted
+                self.stream_stats['early_stops_unmeasured'] += 1
+                logger.info(f"✂️ Stopped reading {url} after {scanner.bytes_fed // 1024} KB")
+
+        # Streaming parses while reading; only the final extraction (all compiled XPaths) is timed separately
+        with self._operation_latency.time(operation='parse'):
+            return await self.extractor.scan(scanner.result)
+
+    def get_stream_stats(self):
+        """Streaming fetch counters (bytes_saved covers only the early stops whose remaining size was known)"""
+        return dict(self.stream_stats, enabled=self.streaming_fetch)
+
+    async def _parse_product_page(self, html_content, marketplace=None):
+        """Extract title/price/image using the configured parser engine"""
+        marketplace = marketplace or self.marketplaces.default
+        if self.html_parser == 'bs4':
+            return await asyncio.to_thread(self._parse_with_bs4, html_content, marketplace)
+        return await self.extractor.extract(html_content, **marketplace.extraction_options())
+
+    def _parse_with_bs4(self, html_content, marketplace=None):
+        """Legacy BeautifulSoup path (kept as a fallback and as the benchmark baseline)"""
+        marketplace = marketplace or self.marketplaces.default
+        soup = BeautifulSoup(html_content, 'html.parser')
+        return {
+            'title': self._extract_title_enhanced(soup, marketplace),
+            'price': self._extract_price_enhanced(soup, marketplace),
+            'mrp': self._extract_mrp_enhanced(soup, marketplace),
+            'image_url': self._extract_image_enhanced(soup, marketplace)
+        }
+
+    def _extract_title_enhanced(self, soup, marketplace):
+        for selector in marketplace.selectors.get('title', ()) + tuple(TITLE_SELECTORS):
             try:
                 element = soup.select_one(selector)
                 if element:
-                    title = element.get_text().strip()
-                    if title and len(title) > 5:
-                        clean_title = re.sub(r'\s+', ' ', title)
-                        clean_title = clean_title.replace('\n', ' ').strip()
-                        clean_title = re.sub(r'\(.*?\)', '', clean_title).strip()
-                        if len(clean_title) > 80:
-                            clean_title = clean_title[:77] + "..."
-                        logger.info(f"✅ Title found with selector {selector}: {clean_title}")
-                        return clean_title
+                    clean = clean_title(element.get_text())
+                    if clean:
+                        logger.info(f"✅ Title found with selector {selector}: {clean}")
+                        return clean
             except Exception:
                 continue
         
         logger.warning("❌ No title found")
         return ""
 
-    def _extract_price_enhanced(self, soup):
-        price_selectors = [
-            '.a-price-whole',
-            '.a-price .a-offscreen',
-            '.a-price-current .a-price-whole',
-            '[data-automation-id="product-price"]',
-            '.a-price-range',
-            '.a-price.a-text-price.a-size-medium.apexPriceToPay .a-offscreen',
-            '.a-price .a-price-symbol',
-            'span.a-price.a-text-price.a-size-medium.apexPriceToPay',
-            '.a-price-current',
-            '#corePrice_feature_div .a-price .a-offscreen'
-        ]
-        
-        for selector in price_selectors:
+    def _extract_price_enhanced(self, soup, marketplace):
+        for selector in marketplace.selectors.get('price', ()) + tuple(PRICE_SELECTORS):
             try:
                 element = soup.select_one(selector)
                 if element:
-                    price_text = element.get_text().strip()
-                    if price_text and ('₹' in price_text or 'Rs' in price_text or any(char.isdigit() for char in price_text)):
-                        clean_price = re.sub(r'[^\d₹Rs.,\-\s]', '', price_text).strip()
-                        if clean_price:
-                            logger.info(f"✅ Price found: {clean_price}")
-                            return clean_price
+                    clean = clean_price(element.get_text(), marketplace.currency_symbols)
+                    if clean:
+                        logger.info(f"✅ Price found: {clean}")
+                        return clean
             except Exception:
                 continue
         
         logger.warning("❌ No price found")
         return "Price not available"
 
-    def _extract_image_enhanced(self, soup):
-        image_selectors = [
-            '#landingImage',
-            '[data-automation-id="product-image"] img',
-            '.a-dynamic-image',
-            '#imgTagWrapperId img',
-            '.a-carousel-col .a-carousel-card img',
-            '[data-a-dynamic-image]',
-            '#main-image-container img',
-            '.imageThumb img'
-        ]
-        
-        for selector in image_selectors:
+    def _extract_mrp_enhanced(self, soup, marketplace):
+        for selector in marketplace.selectors.get('mrp', ()) + tuple(MRP_SELECTORS):
             try:
                 element = soup.select_one(selector)
                 if element:
-                    src = element.get('src') or element.get('data-src') or element.get('data-a-dynamic-image')
-                    if src and ('amazon' in src or src.startswith('http')):
-                        if src.startswith('//'):
-                            src = 'https:' + src
-                        elif src.startswith('/'):
-                            src = 'https://images-na.ssl-images-amazon.com' + src
+                    clean = clean_price(element.get_text(), marketplace.currency_symbols)
+                    if clean:
+                        return clean
+            except Exception:
+                continue
+        return None
+
+    def _extract_image_enhanced(self, soup, marketplace):
+        for selector in marketplace.selectors.get('image', ()) + tuple(IMAGE_SELECTORS):
+            try:
+                element = soup.select_one(selector)
+                if element:
+                    src = normalize_image_src(
+                        element.get('src') or element.get('data-src') or element.get('data-a-dynamic-image'),
+                        marketplace.image_host,
+                    )
+                    if src:
                         logger.info(f"✅ Image found: {src[:50]}...")
                         return src
             except Exception:
@@ -267,10 +459,3 @@ class AmazonProcessor:
         
         logger.warning("❌ No image found")
         return None
-
-    def _default_product_info(self):
-        return {
-            'title': '',
-            'price': 'Price not available',
-            'image_url': None
-        }
@@ -1,30 +1,67 @@
 # services/channel_poster.py (FINAL-FINAL VERSION)
-import logging
 import time
+import logging
+import asyncio
+from services.http_client import HTTPSessionManager
+from services.rate_limiter import TelegramScheduler
+from utils.cache import TTLCache
+from services.metrics import MetricsRegistry
+from services.tracing import span, annotate
 
 logger = logging.getLogger(__name__)
 
+class TelegramAPIError(Exception):
+    """Bot API returned ok=false"""
+
+    def __init__(self, error_code, description, retry_after=None):
+        super().__init__(f"Error code: {error_code}. Description: {description}")
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+
+
 class ChannelPoster:
-    def __init__(self, bot, channel_ids):
-        self.bot = bot
+    def __init__(self, bot_token, channel_ids, session_manager=None, scheduler=None, max_retries=3,
+                 file_id_cache_size=5000, file_id_ttl_seconds=30 * 86400, metrics=None,
+                 api_base='https://api.telegram.org'):
+        self.session_manager = session_manager or HTTPSessionManager()
+        self.telegram_api_url = f"{api_base.rstrip('/')}/bot{bot_token}"
         self.channel_ids = channel_ids if isinstance(channel_ids, list) else [channel_ids]
+        # Shared per-chat + global Telegram limits (replaces the fixed 1s sleep between channels)
+        self.scheduler = scheduler or TelegramScheduler()
+        self.max_retries = max_retries
+        # Image URL / ASIN -> Telegram file_id, so each image is downloaded by Telegram only once
+        self.file_ids = TTLCache(max_size=file_id_cache_size, ttl_seconds=file_id_ttl_seconds)
+        self.photo_stats = {'uploads': 0, 'file_id_reuses': 0, 'stale_file_ids': 0}
+        self.metrics = metrics or MetricsRegistry()
+        self._post_latency = self.metrics.histogram(
+            'channel_post_duration_seconds', 'Time to post one deal to one channel (including rate-limit waits)', ['channel'])
+        self._posts = self.metrics.counter('channel_posts_total', 'Channel posts by outcome', ['channel', 'outcome'])
         logger.info(f"📢 ChannelPoster initialized with {len(self.channel_ids)} channels")
 
-    def post_to_channels(self, product_info):
-        """Post product info to all configured channels"""
+    async def post_to_channels(self, product_info):
+        """Post product info to all configured channels concurrently"""
         posted_channels = []
         errors = []
-        
-        for channel_id in self.channel_ids:
-            try:
-                self._post_to_single_channel(channel_id, product_info)
-                posted_channels.append(channel_id)
-                logger.info(f"✅ Posted to channel: {channel_id}")
-                time.sleep(1)
-            except Exception as e:
-                error_msg = f"Failed to post to {channel_id}: {str(e)}"
+
+        channels = list(self.channel_ids)
+        results = []
+        if channels and product_info.get('image_url') and self._cached_file_id(product_info) is None:
+            # Pehla channel image upload karta hai; baaki channels uska file_id reuse karte hain
+            results += await self._post_concurrently(channels[:1], product_info)
+            channels = channels[1:]
+        results += await self._post_concurrently(channels, product_info)
+
+        for channel_id, result in zip(self.channel_ids, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                error_msg = f"Failed to post to {channel_id}: {str(result)}"
                 logger.error(f"❌ {error_msg}")
                 errors.append(error_msg)
+            else:
+                posted_channels.append(channel_id)
+                logger.info(f"✅ Posted to channel: {channel_id}")
         
         return {
             'success': len(posted_channels) > 0,
@@ -32,7 +69,52 @@ class ChannelPoster:
             'errors': errors
         }
 
-    def _post_to_single_channel(self, channel_id, product_info):
+    async def _post_concurrently(self, channel_ids, product_info):
+        return await asyncio.gather(
+            *(self._timed_post(channel_id, product_info) for channel_id in channel_ids),
+            return_exceptions=True,
+        )
+
+    async def _timed_post(self, channel_id, product_info):
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            with span('telegram.post', channel=channel_id):
+                await self._post_to_single_channel(channel_id, product_info)
+            outcome = 'ok'
+        finally:
+            self._post_latency.observe(time.perf_counter() - start, channel=channel_id)
+            self._posts.inc(channel=channel_id, outcome=outcome)
+
+    # ---------- Telegram file_id cache ----------
+    @staticmethod
+    def _file_id_keys(product_info):
+        keys = [product_info.get('image_url')]
+        if product_info.get('asin'):
+            keys.append(f"asin:{product_info['asin']}")
+        return [key for key in keys if key]
+
+    def _cached_file_id(self, product_info):
+        if not product_info.get('image_url'):
+            return None
+        for key in self._file_id_keys(product_info):
+            file_id = self.file_ids.get(key)
+            if file_id:
+                return file_id
+        return None
+
+    def _remember_file_id(self, product_info, message):
+        photos = (message or {}).get('photo') or []
+        if photos:
+            # Sizes are ordered small -> large; any of them can be resent, the largest keeps quality
+            for key in self._file_id_keys(product_info):
+                self.file_ids.set(key, photos[-1]['file_id'])
+
+    def _forget_file_id(self, product_info):
+        for key in self._file_id_keys(product_info):
+            self.file_ids.pop(key)
+
+    async def _post_to_single_channel(self, channel_id, product_info):
         """Post to a single channel with smart image and clean format"""
         scraped_title = product_info.get('title', '').strip()
         price = product_info.get('price', 'Price not available')
@@ -43,6 +125,8 @@ class ChannelPoster:
         # Hum ab monitor-bot se aane wali file_id ko ignore karenge
         # aur hamesha scraped URL hi istemal karenge.
         final_image = product_info.get('image_url')
+        # Scraped image pehle upload ho chuki ho to uska apna file_id use karein
+        file_id = self._cached_file_id(product_info)
         # =================================
 
         final_title = scraped_title
@@ -63,19 +147,66 @@ class ChannelPoster:
         
         try:
             if final_image:
-                self.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=final_image,  # Yeh ab hamesha ek URL hoga
-                    caption=message_text,
-                    parse_mode='Markdown'
-                )
+                if file_id:
+                    try:
+                        await self._send_photo(channel_id, file_id, message_text)
+                        self.photo_stats['file_id_reuses'] += 1
+                        annotate(photo='file_id')
+                        return
+                    except TelegramAPIError as e:
+                        if e.error_code != 400:
+                            raise
+                        # file_id no longer valid for this bot: drop it and upload from the URL again
+                        logger.warning(f"⚠️ Cached file_id rejected for {channel_id}: {e}")
+                        self.photo_stats['stale_file_ids'] += 1
+                        self._forget_file_id(product_info)
+
+                message = await self._send_photo(channel_id, final_image, message_text)  # URL upload
+                self.photo_stats['uploads'] += 1
+                annotate(photo='upload')
+                self._remember_file_id(product_info, message)
             else:
-                self.bot.send_message(
-                    chat_id=channel_id,
-                    text=message_text,
-                    parse_mode='Markdown',
-                    disable_web_page_preview=True
-                )
+                await self._call(channel_id, 'sendMessage', {
+                    'chat_id': channel_id,
+                    'text': message_text,
+                    'parse_mode': 'Markdown',
+                    'disable_web_page_preview': True
+                })
         except Exception as e:
             logger.error(f"❌ Telegram error posting to {channel_id}: {e}")
             raise
+
+    async def _send_photo(self, channel_id, photo, caption):
+        return await self._call(channel_id, 'sendPhoto', {
+            'chat_id': channel_id,
+            'photo': photo,  # Image URL ya pehle upload ka file_id
+            'caption': caption,
+            'parse_mode': 'Markdown'
+        })
+
+    async def _call(self, chat_id, method, data):
+        """Bot API call through the scheduler; 429s wait retry_after and try again.
+
+        Other failures (including timeouts) are not retried here: the message may already have been delivered.
+        """
+        for attempt in range(1, self.max_retries + 1):
+            await self.scheduler.acquire(chat_id)
+            session = await self.session_manager.get_session()
+            with span(f"telegram.{method}", attempt=attempt) as call_span:
+                async with session.post(f"{self.telegram_api_url}/{method}", json=data, timeout=30) as response:
+                    body = await response.json(content_type=None)
+                call_span.set(status=response.status)
+
+            if body.get('ok'):
+                return body.get('result')
+            retry_after = (body.get('parameters') or {}).get('retry_after')
+            error = TelegramAPIError(body.get('error_code', response.status), body.get('description'), retry_after)
+            if response.status != 429 or attempt == self.max_retries:
+                raise error
+            logger.warning(f"🚦 Telegram 429 for {chat_id}, retrying after {retry_after}s")
+            self.scheduler.on_retry_after(chat_id, retry_after or 1)
+
+    def get_stats(self):
+        stats = dict(self.photo_stats)
+        stats['file_id_cache'] = self.file_ids.get_stats()
+        return stats
@@ -0,0 +1,418 @@
+# services/dedup_store.py
+import time
+import socket
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from utils.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+class MemoryDedupStore:
+    """In-process store. Insertion-ordered dict, so expiry/eviction pop from the front in amortized O(1)"""
+
+    def __init__(self, ttl_seconds, max_entries=50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # {key: timestamp}, oldest first
+        self._lock = threading.Lock()
+
+    def contains_any(self, keys):
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            self._expire_locked(cutoff)
+            return any(key in self._entries for key in keys)
+
+    def add_if_absent(self, keys, timestamp=None):
+        """Atomically insert all keys, or none of them if any is already present"""
+        timestamp = timestamp or time.time()
+        with self._lock:
+            self._expire_locked(timestamp - self.ttl_seconds)
+            if any(key in self._entries for key in keys):
+                return False
+            self._add_locked(keys, timestamp)
+            return True
+
+    def add_if_absent_many(self, key_groups, timestamp=None):
+        """add_if_absent for each group under one lock; later groups see earlier inserts. Returns a list of bools"""
+        timestamp = timestamp or time.time()
+        results = []
+        with self._lock:
+            self._expire_locked(timestamp - self.ttl_seconds)
+            for keys in key_groups:
+                if any(key in self._entries for key in keys):
+                    results.append(False)
+                else:
+                    self._add_locked(keys, timestamp)
+                    results.append(True)
+        return results
+
+    def add_many(self, keys, timestamp=None):
+        timestamp = timestamp or time.time()
+        with self._lock:
+            self._add_locked(keys, timestamp)
+
+    def _add_locked(self, keys, timestamp):
+        for key in keys:
+            # Re-adding moves the key to the back so the dict stays ordered by timestamp
+            self._entries.pop(key, None)
+            self._entries[key] = timestamp
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def expire(self):
+        with self._lock:
+            return self._expire_locked(time.time() - self.ttl_seconds)
+
+    def _expire_locked(self, cutoff):
+        removed = 0
+        while self._entries:
+            key, ts = next(iter(self._entries.items()))
+            if ts >= cutoff:
+                break
+            del self._entries[key]
+            removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_SQLITE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS processed_links (key TEXT PRIMARY KEY, ts REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_processed_links_ts ON processed_links (ts)",
+]
+
+class SQLiteDedupStore:
+    """On-disk store shared by every worker on the instance. ts index keeps expiry a range delete"""
+
+    def __init__(self, db_path, ttl_seconds, max_entries=50000, expire_interval=60):
+        self.db = SQLiteDatabase(db_path, schema=_SQLITE_SCHEMA)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.expire_interval = expire_interval
+        self._last_expire = 0
+
+    def contains_any(self, keys):
+        keys = list(keys)
+        if not keys:
+            return False
+        self._maybe_expire()
+        placeholders = ','.join('?' * len(keys))
+        row = self.db.execute(
+            f"SELECT 1 FROM processed_links WHERE key IN ({placeholders}) AND ts >= ? LIMIT 1",
+            (*keys, time.time() - self.ttl_seconds),
+        ).fetchone()
+        return row is not None
+
+    def add_if_absent(self, keys, timestamp=None):
+        """Atomically insert all keys, or none of them if any is already present (BEGIN IMMEDIATE spans processes)"""
+        keys = list(keys)
+        timestamp = timestamp or time.time()
+        self._maybe_expire()
+        placeholders = ','.join('?' * len(keys))
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM processed_links WHERE key IN ({placeholders}) AND ts >= ? LIMIT 1",
+                (*keys, timestamp - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                return False
+            conn.executemany(
+                "INSERT OR REPLACE INTO processed_links (key, ts) VALUES (?, ?)",
+                [(key, timestamp) for key in keys],
+            )
+        return True
+
+    def add_if_absent_many(self, key_groups, timestamp=None):
+        """add_if_absent for each group inside one transaction. Returns a list of bools"""
+        timestamp = timestamp or time.time()
+        self._maybe_expire()
+        results = []
+        with self.db.transaction() as conn:
+            for keys in key_groups:
+                keys = list(keys)
+                placeholders = ','.join('?' * len(keys))
+                row = conn.execute(
+                    f"SELECT 1 FROM processed_links WHERE key IN ({placeholders}) AND ts >= ? LIMIT 1",
+                    (*keys, timestamp - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    results.append(False)
+                    continue
+                conn.executemany(
+                    "INSERT OR REPLACE INTO processed_links (key, ts) VALUES (?, ?)",
+                    [(key, timestamp) for key in keys],
+                )
+                results.append(True)
+        return results
+
+    def add_many(self, keys, timestamp=None):
+        timestamp = timestamp or time.time()
+        self._maybe_expire()
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO processed_links (key, ts) VALUES (?, ?)",
+                [(key, timestamp) for key in keys],
+            )
+
+    def discard_many(self, keys):
+        with self.db.transaction() as conn:
+            conn.executemany("DELETE FROM processed_links WHERE key = ?", [(key,) for key in keys])
+
+    def _maybe_expire(self):
+        # Called from the read and the write paths; production only reserves (add_*), never just reads
+        if time.time() - self._last_expire > self.expire_interval:
+            self.expire()
+
+    def expire(self):
+        """Delete expired rows, then trim the oldest rows above max_entries (both walk the ts index)"""
+        self._last_expire = time.time()
+        with self.db.transaction() as conn:
+            removed = conn.execute(
+                "DELETE FROM processed_links WHERE ts < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                removed += conn.execute(
+                    "DELETE FROM processed_links WHERE key IN (SELECT key FROM processed_links ORDER BY ts LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        if removed:
+            logger.info(f"🧹 Cleaned {removed} old dedup entries.")
+        return removed
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM processed_links").fetchone()[0]
+
+
+class _RESPConnection:
+    """Minimal RESP2 client, enough for SET/MGET/EXISTS/DEL/SCAN and WATCH/MULTI/EXEC on any Redis-compatible server"""
+
+    def __init__(self, url, timeout=5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._file = self._sock.makefile('rb')
+        if self.password:
+            self._command_locked('AUTH', self.password)
+        if self.db:
+            self._command_locked('SELECT', self.db)
+
+    def execute(self, *args):
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._command_locked(*args)
+            except (OSError, ConnectionError):
+                # One reconnect attempt on a dropped connection
+                self.close()
+                self._connect()
+                return self._command_locked(*args)
+
+    def pipeline(self, commands):
+        """Send all commands in one write; returns the replies, with error replies as RuntimeError instances"""
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                return self._pipeline_locked(commands)
+            except (OSError, ConnectionError):
+                self.close()
+                raise
+
+    @contextmanager
+    def session(self):
+        """Exclusive use of the connection for a multi-command exchange (WATCH ... EXEC).
+
+        Yields (command, pipeline) callables. On any error the connection is dropped, so a
+        half-finished WATCH / MULTI can't leak into the next caller's commands.
+        """
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                yield self._command_locked, self._pipeline_locked
+            except BaseException:
+                self.close()
+                raise
+
+    def _command_locked(self, *args):
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def _pipeline_locked(self, commands):
+        self._sock.sendall(b''.join(self._encode(cmd) for cmd in commands))
+        replies = []
+        for _ in commands:
+            # Drain every reply even if one is an error, so the connection stays in sync
+            try:
+                replies.append(self._read_reply())
+            except RuntimeError as e:
+                replies.append(e)
+        return replies
+
+    @staticmethod
+    def _encode(args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b'+':
+            return body.decode()
+        if prefix == b'-':
+            raise RuntimeError(f"Redis error: {body.decode()}")
+        if prefix == b':':
+            return int(body)
+        if prefix == b'$':
+            length = int(body)
+            if length == -1:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            count = int(body)
+            if count == -1:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    def close(self):
+        try:
+            if self._sock is not None:
+                self._sock.close()
+        finally:
+            self._sock = None
+            self._file = None
+
+
+class RedisDedupStore:
+    """Store on a Redis-protocol server; keys carry a TTL so the server expires them in O(1).
+
+    Inserts are optimistic transactions: WATCH the keys, read them, then MULTI / SET EX / EXEC.
+    Keys and their TTLs are written in one atomic EXEC, so a crash can never leave a key without
+    a TTL, and EXEC aborts (and we retry) if another client touched a watched key in between.
+    """
+
+    def __init__(self, redis_url, ttl_seconds, prefix='dedup:', max_retries=5):
+        self.conn = _RESPConnection(redis_url)
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self.max_retries = max_retries
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def contains_any(self, keys):
+        keys = [self._key(key) for key in keys]
+        if not keys:
+            return False
+        return self.conn.execute('EXISTS', *keys) > 0
+
+    def add_if_absent(self, keys, timestamp=None):
+        """Insert all keys (with their TTL), or none of them if any is already present"""
+        return self.add_if_absent_many([keys], timestamp)[0]
+
+    def add_if_absent_many(self, key_groups, timestamp=None):
+        """add_if_absent for each group in one transaction; later groups see earlier ones. Returns a list of bools"""
+        timestamp = timestamp or time.time()
+        groups = [[self._key(key) for key in keys] for keys in key_groups]
+        watched = list(dict.fromkeys(key for keys in groups for key in keys))
+        if not watched:
+            return [True] * len(groups)
+
+        for attempt in range(self.max_retries):
+            exec_sent = False
+            try:
+                with self.conn.session() as (command, pipeline):
+                    command('WATCH', *watched)
+                    present = {key for key, value in zip(watched, command('MGET', *watched)) if value is not None}
+                    results = []
+                    for keys in groups:
+                        ok = not any(key in present for key in keys)
+                        results.append(ok)
+                        if ok:
+                            present.update(keys)
+                    inserts = [key for keys, ok in zip(groups, results) if ok for key in keys]
+                    if not inserts:
+                        command('UNWATCH')
+                        return results
+                    exec_sent = True
+                    replies = pipeline(
+                        [('MULTI',)] + [('SET', key, timestamp, 'EX', self.ttl_seconds) for key in inserts] + [('EXEC',)]
+                    )
+            except (OSError, ConnectionError):
+                # Before EXEC nothing was written, so redo it on a fresh connection; after EXEC we can't know
+                if exec_sent or attempt == self.max_retries - 1:
+                    raise
+                continue
+            for reply in replies:
+                if isinstance(reply, Exception):
+                    raise reply
+            if replies[-1] is not None:
+                return results
+            # EXEC returned nil: a watched key changed under us, read again
+        raise RuntimeError(f"Dedup keys kept changing, gave up after {self.max_retries} attempts")
+
+    def add_many(self, keys, timestamp=None):
+        timestamp = timestamp or time.time()
+        replies = self.conn.pipeline([('SET', self._key(key), timestamp, 'EX', self.ttl_seconds) for key in keys])
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+
+    def discard_many(self, keys):
+        keys = [self._key(key) for key in keys]
+        if keys:
+            self.conn.execute('DEL', *keys)
+
+    def expire(self):
+        # Server-side TTLs handle expiry; size bounds come from the server's maxmemory policy
+        return 0
+
+    def __len__(self):
+        # SCAN in pages instead of KEYS, which blocks the server for the whole keyspace
+        count, cursor = 0, b'0'
+        while True:
+            cursor, keys = self.conn.execute('SCAN', cursor, 'MATCH', f"{self.prefix}*", 'COUNT', 1000)
+            count += len(keys)
+            if cursor in (b'0', '0', 0):
+                return count
+
+
+def create_dedup_store(backend, ttl_seconds, max_entries=50000, db_path=None, redis_url=None):
+    """Build the configured storage backend for DuplicateDetector"""
+    backend = (backend or 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteDedupStore(db_path, ttl_seconds, max_entries=max_entries)
+    if backend == 'redis':
+        if not redis_url:
+            raise ValueError("REDIS_URL is required for the redis dedup backend")
+        return RedisDedupStore(redis_url, ttl_seconds)
+    if backend != 'memory':
+        logger.warning(f"⚠️ Unknown dedup backend '{backend}', falling back to memory")
+    return MemoryDedupStore(ttl_seconds, max_entries=max_entries)
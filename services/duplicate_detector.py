@@ -1,104 +1,143 @@
 # file: services/duplicate_detector.py (Optimized Hybrid Version)
 
 import time
+import asyncio
 import logging
-import re
-from threading import Lock
-import requests
+from services.dedup_store import MemoryDedupStore
+from utils.url_canonical import canonicalize
 
 logger = logging.getLogger(__name__)
 
+class Reservation:
+    """Aliases jo ek link ke liye atomically insert hue the. Fail hone par release kiye ja sakte hain."""
+
+    def __init__(self, url, keys):
+        self.url = url
+        self.keys = list(keys)
+        self.state = 'reserved'  # reserved -> confirmed / released
+
+    def __repr__(self):
+        return f"Reservation({self.url!r}, keys={self.keys}, state={self.state})"
+
+
 class DuplicateDetector:
-    def __init__(self, detection_hours=48, max_entries=50000):
+    def __init__(self, detection_hours=48, max_entries=50000, store=None, resolver=None, default_marketplace='amazon.in'):
         self.detection_seconds = detection_hours * 3600
+        # Doosre marketplace ka same ASIN alag deal hai, isliye uske id mein domain bhi hota hai
+        self.default_marketplace = default_marketplace
+        # Shared async ShortURLResolver; request path par sirf iska cache padha jata hai
+        self.resolver = resolver
         self.max_entries = max_entries
-        self.processed_links = {}  # {unique_id: timestamp}
-        self.lock = Lock()
-        self.last_cleanup = time.time()
+        # Store backend (memory / sqlite / redis) apna locking aur expiry khud handle karta hai
+        self.store = store or MemoryDedupStore(self.detection_seconds, max_entries=max_entries)
 
     # ---------- Short URL Expansion ----------
-    def _expand_short_url(self, url):
-        """Short URLs ko expand karke final URL nikalta hai (HEAD → GET fallback)."""
-        try:
-            resp = requests.head(url, allow_redirects=True, timeout=5)
-            return resp.url
-        except requests.RequestException:
-            try:
-                resp = requests.get(url, allow_redirects=True, timeout=5, stream=True)
-                return resp.url
-            except requests.RequestException as e:
-                logger.warning(f"⚠️ Could not expand short URL {url}: {e}")
-                return url
+    def _cached_final_url(self, url):
+        """Resolver cache se expanded URL (network call nahi hota)."""
+        if self.resolver is None:
+            return None
+        return self.resolver.peek(url)
 
     # ---------- ASIN & Unique ID ----------
-    def _get_unique_id(self, url, expand=True):
+    def _get_unique_id(self, url, final_url=None):
         """URL ka ek unique identifier banata hai."""
         try:
-            final_url = url
-            if expand:
-                final_url = self._expand_short_url(url)
+            final_url = final_url or url
 
-            # Amazon links ke multiple patterns
-            if 'amazon' in final_url or 'amzn.to' in final_url or 'a.co' in final_url:
-                match = re.search(r'/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})', final_url)
-                if match:
-                    return f"asin_{match.group(1)}"
+            # Amazon links ke multiple patterns (offline parse, precompiled regexes)
+            canonical = canonicalize(final_url)
+            if canonical.asin:
+                if canonical.marketplace == self.default_marketplace:
+                    return f"asin_{canonical.asin}"
+                return f"asin_{canonical.asin}@{canonical.marketplace}"
 
             return final_url.split('?')[0].rstrip('/')
         except Exception:
             return url
 
+    def get_aliases(self, url, final_url=None):
+        """Ek link ke saare ids: base, ASIN (URL mein ho to) aur expanded id (expansion maloom ho to)."""
+        final_url = final_url or self._cached_final_url(url)
+        aliases = [url.split('?')[0].rstrip('/'), self._get_unique_id(url)]
+        if final_url:
+            aliases.append(self._get_unique_id(url, final_url))
+        # Order preserve karte hue duplicates hatao
+        return list(dict.fromkeys(aliases))
+
+    # ---------- Atomic Check + Mark ----------
+    def check_and_mark(self, url, final_url=None):
+        """Normalize once, check + insert all aliases atomically. Duplicate par None, warna Reservation."""
+        aliases = self.get_aliases(url, final_url)
+        if not self.store.add_if_absent(aliases, time.time()):
+            logger.debug(f"🔁 Duplicate found: {aliases}")
+            return None
+        logger.info(f"✅ Reserved: {aliases}")
+        return Reservation(url, aliases)
+
+    def check_and_mark_many(self, urls):
+        """Batch version of check_and_mark: ek hi store call, batch ke andar ke duplicates bhi pakde jaate hain.
+
+        Returns a list aligned with urls: Reservation, ya duplicate ke liye None.
+        """
+        alias_groups = [self.get_aliases(url) for url in urls]
+        added = self.store.add_if_absent_many(alias_groups, time.time())
+        reservations = [Reservation(url, aliases) if ok else None for url, aliases, ok in zip(urls, alias_groups, added)]
+        logger.info(f"✅ Reserved {sum(added)}/{len(urls)} links from batch")
+        return reservations
+
+    async def extend_reservation(self, reservation, check=True):
+        """Link ko async expand karke naye aliases reservation mein jodta hai.
+
+        Returns False agar expanded link (e.g. same ASIN, doosra short link) pehle se processed hai.
+        check=False retry attempts ke liye hai, jab aliases pehli attempt mein hi insert ho chuke the.
+        """
+        final_url = reservation.url
+        # Poora Amazon link offline hi parse ho jata hai; network sirf short links (amzn.to, a.co, wishlink) ke liye
+        if self.resolver is not None and canonicalize(reservation.url).needs_resolution:
+            final_url = await self.resolver.resolve(reservation.url)
+
+        new_aliases = [alias for alias in self.get_aliases(reservation.url, final_url) if alias not in reservation.keys]
+        if not new_aliases:
+            return True
+
+        # Store calls block (SQLite write lock, Redis round trip), isliye event loop se hata kar thread mein
+        if not check:
+            await asyncio.to_thread(self.store.add_many, new_aliases, time.time())
+        elif not await asyncio.to_thread(self.store.add_if_absent, new_aliases, time.time()):
+            logger.info(f"🔁 Duplicate found after expansion: {new_aliases}")
+            return False
+        reservation.keys.extend(new_aliases)
+        return True
+
+    def confirm(self, reservation):
+        """Processing successful; aliases detection window tak rehte hain."""
+        reservation.state = 'confirmed'
+
+    def release(self, reservation):
+        """Processing fail hui; aliases hata do taake link dobara submit ho sake."""
+        if reservation.state == 'released':
+            return
+        self.store.discard_many(reservation.keys)
+        reservation.state = 'released'
+        logger.info(f"↩️ Released reservation: {reservation.keys}")
+
     # ---------- Duplicate Check ----------
     def is_duplicate(self, url):
-        """Check if URL has been processed. Pehle fast check, phir expand."""
-        base_id = url.split('?')[0].rstrip('/')
-
-        with self.lock:
-            self._cleanup_old_entries()
-            if base_id in self.processed_links:
-                logger.debug(f"🔁 Duplicate found (base): {base_id}")
-                return True
-
-        # Agar base id nahi mila, tab expansion karke check karo
-        expanded_id = self._get_unique_id(url, expand=True)
-
-        with self.lock:
-            if expanded_id in self.processed_links:
-                logger.debug(f"🔁 Duplicate found (expanded): {expanded_id}")
-                return True
-
+        """Check if URL has been processed. Sirf offline / cached ids check hoti hain."""
+        aliases = self.get_aliases(url)
+        if self.store.contains_any(aliases):
+            logger.debug(f"🔁 Duplicate found: {aliases}")
+            return True
         return False
 
     # ---------- Mark Processed ----------
-    def mark_as_processed(self, url):
-        """Mark URL as processed (base + expanded)."""
-        base_id = url.split('?')[0].rstrip('/')
-        expanded_id = self._get_unique_id(url, expand=True)
-
-        with self.lock:
-            self.processed_links[base_id] = time.time()
-            self.processed_links[expanded_id] = time.time()
-            logger.info(f"✅ Marked as processed: {expanded_id}")
+    def mark_as_processed(self, url, final_url=None):
+        """Mark URL as processed (base + ASIN + expanded, agar expansion maloom ho)."""
+        aliases = self.get_aliases(url, final_url)
+        self.store.add_many(aliases, time.time())
+        logger.info(f"✅ Marked as processed: {aliases}")
 
     # ---------- Cleanup ----------
-    def _cleanup_old_entries(self):
-        """Memory cleanup for old & excess entries."""
-        current_time = time.time()
-
-        # Time-based cleanup (once per hour)
-        if current_time - self.last_cleanup > 3600:
-            cutoff = current_time - self.detection_seconds
-            old_links = [uid for uid, ts in self.processed_links.items() if ts < cutoff]
-            for uid in old_links:
-                del self.processed_links[uid]
-            if old_links:
-                logger.info(f"🧹 Cleaned {len(old_links)} old entries.")
-            self.last_cleanup = current_time
-
-        # Size-based cleanup
-        if len(self.processed_links) > self.max_entries:
-            sorted_links = sorted(self.processed_links.items(), key=lambda x: x[1])
-            excess = len(sorted_links) - self.max_entries
-            for uid, _ in sorted_links[:excess]:
-                del self.processed_links[uid]
-            logger.info(f"🗑️ Removed {excess} excess entries.")
+    def cleanup(self):
+        """Expire old entries; the store does this incrementally, so this is only a manual trigger."""
+        return self.store.expire()
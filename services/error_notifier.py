@@ -1,34 +1,184 @@
 import aiohttp
+import re
+import time
 import logging
 import asyncio
+from collections import deque, OrderedDict
 from datetime import datetime
 import traceback
+from services.http_client import HTTPSessionManager
+from services.metrics import MetricsRegistry
 
 logger = logging.getLogger(__name__)
 
+_URL_RE = re.compile(r'https?://\S+')
+TELEGRAM_MESSAGE_LIMIT = 4096
+
 class ErrorNotifier:
-    def __init__(self, bot_token, error_chat_id):
+    def __init__(self, bot_token, error_chat_id, session_manager=None, scheduler=None,
+                 flush_interval=30, max_batch=20, max_outbox=500, metrics=None,
+                 api_base='https://api.telegram.org'):
+        self.session_manager = session_manager or HTTPSessionManager()
         self.bot_token = bot_token
         self.error_chat_id = error_chat_id
-        self.telegram_api_url = f"https://api.telegram.org/bot{bot_token}"
+        self.telegram_api_url = f"{api_base.rstrip('/')}/bot{bot_token}"
         self.enabled = bool(bot_token and error_chat_id)
+        self.scheduler = scheduler  # optional shared TelegramScheduler
+
+        # Outbox: notify() sirf yahan daalta hai, flusher digest bana kar bhejta hai
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._outbox = deque(maxlen=max_outbox)  # (message, traceback_info); oldest dropped when full
+        self._successes = 0
+        self._dropped = 0
+        self._window_started = time.time()
+        self._flush_now = None
+        self._flusher = None
+        self.stats = {'queued': 0, 'dropped': 0, 'digests_sent': 0, 'send_failures': 0}
+        self.metrics = metrics or MetricsRegistry()
+        self._operation_latency = self.metrics.histogram(
+            'operation_duration_seconds', 'Latency of individual operations inside stages', ['operation'])
         
         if not self.enabled:
             logger.warning("⚠️ Error notifications disabled - missing bot token or error chat ID")
             
-    async def notify(self, message, traceback_info=None):
-        """Send a general notification to the configured chat"""
+    async def notify(self, message, traceback_info=None, success=False):
+        """Queue a notification for the next digest. Never waits on Telegram.
+
+        success=True messages are only counted ("47 links posted"); everything else is listed, grouped by text.
+        """
         if not self.enabled:
             return False
-            
-        full_message = f"{message}"
+
+        if success:
+            self._successes += 1
+        else:
+            if len(self._outbox) == self._outbox.maxlen:
+                self._dropped += 1
+                self.stats['dropped'] += 1
+            self._outbox.append((message, traceback_info))
+        self.stats['queued'] += 1
+
+        self._ensure_flusher()
+        if len(self._outbox) >= self.max_batch:
+            self._flush_now.set()
+        return True
+
+    # ---------- Outbox ----------
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flush_now = asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Send everything queued so far as one digest (split if it exceeds Telegram's length limit)"""
+        if not self._outbox and not self._successes and not self._dropped:
+            return True
+        entries = list(self._outbox)
+        self._outbox.clear()
+        successes, dropped, started = self._successes, self._dropped, self._window_started
+        self._successes = self._dropped = 0
+        self._window_started = time.time()
+
+        ok = True
+        delivered = 0
+        for chunk in self._split(self._build_digest(entries, successes, dropped, started)):
+            with self._operation_latency.time(operation='notify'):
+                sent = await self._send_notification(chunk)
+            if sent:
+                self.stats['digests_sent'] += 1
+                delivered += 1
+            else:
+                self.stats['send_failures'] += 1
+                ok = False
+        if not delivered and (entries or successes or dropped):
+            # Kuch bhi nahi gaya (Telegram down / timeout): agle flush ke liye wapas outbox mein
+            self._restore(entries, successes, dropped, started)
+        return ok
+
+    def _restore(self, entries, successes, dropped, started):
+        """Put an undelivered digest's entries back in front of anything queued since (oldest still dropped first)"""
+        queued = entries + list(self._outbox)
+        overflow = max(0, len(queued) - self._outbox.maxlen)
+        self._outbox.clear()
+        self._outbox.extend(queued[overflow:])
+        self._successes += successes
+        self._dropped += dropped + overflow
+        self.stats['dropped'] += overflow
+        self._window_started = min(self._window_started, started)
+
+    def _build_digest(self, entries, successes, dropped, started):
+        # Sirf ek message ho to use waise hi bhejo, digest ki zaroorat nahi
+        if len(entries) == 1 and not successes and not dropped:
+            message, traceback_info = entries[0]
+            return self._with_traceback(message, traceback_info)
+
+        # Same text (URL alag) wale messages ek line mein
+        groups = OrderedDict()
+        for message, traceback_info in entries:
+            key = _URL_RE.sub('<url>', message)
+            group = groups.setdefault(key, {'count': 0, 'urls': [], 'traceback': traceback_info})
+            group['count'] += 1
+            group['urls'].extend(_URL_RE.findall(message))
+
+        minutes = max(1, round((time.time() - started) / 60))
+        summary = f"📊 **Last {minutes} min:** {successes} links posted, {len(entries)} alerts"
+        if dropped:
+            summary += f" ({dropped} dropped, outbox full)"
+        lines = [summary]
+        for key, group in groups.items():
+            line = f"\n{key}" + (f" ×{group['count']}" if group['count'] > 1 else '')
+            if '<url>' in key:
+                shown = group['urls'][:3]
+                line += '\n' + '\n'.join(f"  • `{url}`" for url in shown)
+                if len(group['urls']) > len(shown):
+                    line += f"\n  • ...and {len(group['urls']) - len(shown)} more"
+            lines.append(line)
+
+        # Pehle group ka traceback hi kaafi hai
+        first_traceback = next((g['traceback'] for g in groups.values() if g['traceback']), None)
+        return self._with_traceback('\n'.join(lines), first_traceback)
+
+    @staticmethod
+    def _with_traceback(message, traceback_info):
         if traceback_info:
-            full_message += f"\n\n```python\n{traceback_info}\n```"
-        try:
-            return await self._send_notification(full_message)
-        except Exception as e:
-            logger.error(f"Error sending general notification: {e}")
-            return False
+            message += f"\n\n```python\n{traceback_info[-1500:]}\n```"
+        return message
+
+    @staticmethod
+    def _split(text):
+        if len(text) <= TELEGRAM_MESSAGE_LIMIT:
+            return [text]
+        chunks, current = [], ''
+        for line in text.split('\n'):
+            if current and len(current) + len(line) + 1 > TELEGRAM_MESSAGE_LIMIT:
+                chunks.append(current)
+                current = ''
+            current = f"{current}\n{line}" if current else line[:TELEGRAM_MESSAGE_LIMIT]
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def close(self):
+        """Stop the flusher and send whatever is left (shutdown hook)"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        if self.enabled:
+            await self.flush()
+
+    def get_stats(self):
+        return dict(self.stats, outbox=len(self._outbox), pending_successes=self._successes)
 
     async def notify_error(self, url, error_message, original_text="", traceback_info=None):
         """Send error notification to configured chat"""
@@ -46,10 +196,7 @@ class ErrorNotifier:
 ❌ **Error:** {error_message}
 📝 **Original Text:**
 {formatted_text}"""
-            if traceback_info:
-                notification_message += f"\n\n```python\n{traceback_info}\n```"
-                
-            return await self._send_notification(notification_message)
+            return await self.notify(notification_message, traceback_info=traceback_info)
             
         except Exception as e:
             logger.error(f"Error sending specific error notification: {e}")
@@ -71,26 +218,34 @@ class ErrorNotifier:
             logger.error(f"Error sending startup notification: {e}")
             return False
             
-    async def _send_notification(self, message):
-        """Send notification message to Telegram"""
+    async def _send_notification(self, message, parse_mode='Markdown'):
+        """Send notification message to Telegram (as plain text if Telegram can't parse the Markdown)"""
         try:
             url = f"{self.telegram_api_url}/sendMessage"
+            if self.scheduler is not None:
+                await self.scheduler.acquire(self.error_chat_id)
             data = {
                 'chat_id': self.error_chat_id,
                 'text': message,
-                'parse_mode': 'Markdown'
             }
+            if parse_mode:
+                data['parse_mode'] = parse_mode
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data, timeout=15) as response:
+            session = await self.session_manager.get_session()
+            async with session.post(url, json=data, timeout=15) as response:
+                if response.status == 400 and parse_mode:
+                    # "can't parse entities": error texts like MEDIA_EMPTY have an unbalanced _ or *
+                    logger.warning(f"⚠️ Telegram rejected notification Markdown, resending as plain text: {await response.text()}")
+                else:
                     response.raise_for_status()
-                    
+
                     if response.status == 200:
                         logger.info("✅ Error notification sent successfully")
                         return True
                     else:
                         logger.error(f"Failed to send notification: {response.status}")
                         return False
+            return await self._send_notification(message, parse_mode=None)
             
         except (aiohttp.ClientError, asyncio.TimeoutError, Exception) as e:
             logger.error(f"Error sending notification: {e}")
@@ -0,0 +1,183 @@
+# services/job_engine.py
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+class JobEngine:
+    """Long-lived asyncio loop (one per worker process) with a bounded job queue"""
+
+    def __init__(self, handler=None, concurrency=4, max_queue_size=500, stage_limits=None):
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.max_queue_size = max(1, max_queue_size)
+        self.stage_limits = dict(stage_limits or {})
+        self.shutdown_hooks = []  # async callables run on the loop before it stops
+
+        self.loop = None
+        self._queue = None
+        self._stage_semaphores = {}
+        self._thread = None
+        self._ready = threading.Event()
+        self._slot_freed = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+        # Pending = queued + running; guarded by a thread lock because submit() is called from Flask threads
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        """Start the event loop thread (idempotent)"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="job-engine", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        logger.info(f"⚙️ JobEngine started with {self.concurrency} workers, queue size {self.max_queue_size}")
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._queue = asyncio.Queue()
+        self._stage_semaphores = {}
+        for i in range(self.concurrency):
+            self.loop.create_task(self._worker(i))
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def stop(self, timeout=10):
+        """Stop the loop after cancelling all workers"""
+        self._stopping.set()
+        self._slot_freed.set()
+        if not self.loop or not self._thread or not self._thread.is_alive():
+            return
+
+        async def _shutdown():
+            for hook in self.shutdown_hooks:
+                try:
+                    await hook()
+                except Exception as e:
+                    logger.warning(f"⚠️ Shutdown hook failed: {e}")
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ JobEngine shutdown did not finish cleanly: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        logger.info("🛑 JobEngine stopped")
+
+    def add_shutdown_hook(self, hook, first=False):
+        """Register an async callable to run on the loop during stop(); first=True runs it before the others"""
+        if first:
+            self.shutdown_hooks.insert(0, hook)
+        else:
+            self.shutdown_hooks.append(hook)
+
+    # ---------- Submission ----------
+    def submit(self, payload):
+        """Queue a job from any thread. Returns False when the queue is full (backpressure)"""
+        if self._stopping.is_set():
+            return False
+        if not self._ready.is_set():
+            self.start()
+
+        with self._pending_lock:
+            if self._pending >= self.max_queue_size:
+                self.rejected += 1
+                return False
+            self._pending += 1
+
+        try:
+            self.loop.call_soon_threadsafe(self._queue.put_nowait, payload)
+        except RuntimeError:
+            # Loop closed between the stopping check and here
+            with self._pending_lock:
+                self._pending -= 1
+            return False
+        return True
+
+    @property
+    def stopping(self):
+        return self._stopping.is_set()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def free_slots(self):
+        """How many more jobs submit() would currently accept"""
+        return max(0, self.max_queue_size - self._pending)
+
+    def wait_for_slot(self, timeout=None):
+        """Block the calling thread until a job finishes or timeout expires"""
+        if self.free_slots() > 0:
+            return True
+        self._slot_freed.clear()
+        return self._slot_freed.wait(timeout) or self.free_slots() > 0
+
+    # ---------- Stage limits ----------
+    @asynccontextmanager
+    async def stage(self, name, key=None):
+        """Limit how many jobs may be inside a given stage at once.
+
+        With a key (e.g. a marketplace domain) every key gets its own stage_limits[name] slots,
+        so one slow key can't take the slots the others need.
+        """
+        limit = self.stage_limits.get(name)
+        if limit is None:
+            yield
+            return
+        semaphore = self._stage_semaphores.get((name, key))
+        if semaphore is None:
+            semaphore = self._stage_semaphores[(name, key)] = asyncio.Semaphore(max(1, limit))
+        async with semaphore:
+            yield
+
+    # ---------- Workers ----------
+    async def _worker(self, worker_id):
+        while True:
+            payload = await self._queue.get()
+            self.in_flight += 1
+            try:
+                await self.handler(payload)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ Worker {worker_id} job failed: {e}", exc_info=True)
+            finally:
+                self.in_flight -= 1
+                with self._pending_lock:
+                    self._pending -= 1
+                self._slot_freed.set()
+                self._queue.task_done()
+
+    def get_stats(self):
+        return {
+            'concurrency': self.concurrency,
+            'max_queue_size': self.max_queue_size,
+            'pending': self._pending,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,85 @@
+# services/job_priority.py
+import re
+import logging
+from services.job_queue import PRIORITY_HIGH, PRIORITY_CACHED, PRIORITY_NORMAL, PRIORITY_LABELS
+from services.product_cache import ProductCache
+from utils.url_canonical import canonicalize
+
+logger = logging.getLogger(__name__)
+
+# "60% off", "Flat 60% discount", "-60%" in the monitor bot's message text
+_DISCOUNT_RE = re.compile(r'-\s?(\d{1,2})\s?%|(\d{1,2})\s?%\s*(?:off|discount)', re.IGNORECASE)
+_PRIORITY_NAMES = dict({label: priority for priority, label in PRIORITY_LABELS.items()}, urgent=PRIORITY_HIGH)
+
+
+class JobPrioritizer:
+    """Priority class for a new link, from signals that need no scraping.
+
+    An explicit payload 'priority' ('high' / 'normal' / 'low' or 0-3) wins. Otherwise a big
+    discount (advertised in original_text or recorded in the price history) is high, and a
+    product whose info is already cached is next, because its job finishes without a page fetch.
+    """
+
+    def __init__(self, marketplaces, product_cache=None, price_history=None, resolver=None, big_discount_percent=50):
+        self.marketplaces = marketplaces
+        self.product_cache = product_cache
+        self.price_history = price_history
+        self.resolver = resolver
+        self.big_discount_percent = big_discount_percent
+        self.stats = {'payload': 0, 'discount': 0, 'cache': 0, 'default': 0}
+
+    def classify(self, payload):
+        """(priority, reason) where reason is payload / discount / cache / default"""
+        priority = self._payload_priority(payload.get('priority'))
+        if priority is not None:
+            return self._count(priority, 'payload')
+
+        key = self._product_key(payload.get('url') or '')
+        discount = self._advertised_discount(payload.get('original_text'))
+        if key and self.price_history is not None:
+            try:
+                last = self.price_history.last(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Price history lookup failed for {key}: {e}")
+                last = None
+            if last and last['mrp']:
+                discount = max(discount or 0, (last['mrp'] - last['amount']) / last['mrp'] * 100)
+        if discount is not None and discount >= self.big_discount_percent:
+            return self._count(PRIORITY_HIGH, 'discount')
+
+        if key and self.product_cache is not None and self.product_cache.peek(key) != ProductCache.MISS:
+            return self._count(PRIORITY_CACHED, 'cache')
+        return self._count(PRIORITY_NORMAL, 'default')
+
+    def _count(self, priority, reason):
+        self.stats[reason] += 1
+        return priority, reason
+
+    @staticmethod
+    def _payload_priority(value):
+        if isinstance(value, str):
+            return _PRIORITY_NAMES.get(value.strip().lower())
+        if isinstance(value, int) and not isinstance(value, bool) and value in PRIORITY_LABELS:
+            return value
+        return None
+
+    @staticmethod
+    def _advertised_discount(text):
+        # original_text comes straight from the request body; anything but a string carries no signal
+        if not text or not isinstance(text, str):
+            return None
+        discounts = [int(a or b) for a, b in _DISCOUNT_RE.findall(text)]
+        return max(discounts) if discounts else None
+
+    def _product_key(self, url):
+        """Product cache / price history key, using only offline parsing and already expanded short links"""
+        canonical = canonicalize(url)
+        if canonical.needs_resolution and self.resolver is not None:
+            final_url = self.resolver.peek(url)
+            canonical = canonicalize(final_url) if final_url else canonical
+        if not canonical.asin:
+            return None
+        return self.marketplaces.product_key(canonical.asin, self.marketplaces.get(canonical.marketplace))
+
+    def get_stats(self):
+        return dict(self.stats)
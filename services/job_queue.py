@@ -0,0 +1,245 @@
+# services/job_queue.py
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from utils.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL,
+        lease_until REAL,
+        owner TEXT,
+        created_at REAL NOT NULL,
+        last_error TEXT,
+        priority INTEGER NOT NULL DEFAULT 2,
+        source TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at)",
+]
+# Queues created before priorities existed
+_MIGRATIONS = [
+    "ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 2",
+    "ALTER TABLE jobs ADD COLUMN source TEXT",
+]
+
+# Priority classes, most urgent first
+PRIORITY_HIGH = 0     # asked for by the sender, or a big discount
+PRIORITY_CACHED = 1   # product info already cached: no scrape, finishes fast
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+PRIORITY_LABELS = {PRIORITY_HIGH: 'high', PRIORITY_CACHED: 'cached', PRIORITY_NORMAL: 'normal', PRIORITY_LOW: 'low'}
+
+# Lease order: priority class, minus one class per aging_seconds already waited (no starvation), plus a
+# fairness penalty per job of the same source that is running or ranked ahead (no source hogs the workers)
+_LEASE_SQL = """
+WITH ready AS (
+    SELECT id, priority, source, available_at, priority - (:now - available_at) / :aging AS score
+    FROM jobs
+    WHERE (status = 'pending' AND available_at <= :now) OR (status = 'leased' AND lease_until < :now)
+),
+running AS (
+    SELECT source, COUNT(*) AS jobs FROM jobs WHERE status = 'leased' AND lease_until >= :now GROUP BY source
+),
+ranked AS (
+    SELECT ready.id, ready.priority, ready.available_at,
+           ready.score + :fairness * (COALESCE(running.jobs, 0)
+               + ROW_NUMBER() OVER (PARTITION BY ready.source ORDER BY ready.score, ready.id) - 1) AS rank
+    FROM ready LEFT JOIN running ON running.source IS ready.source
+)
+SELECT jobs.id, jobs.payload, jobs.attempts, ranked.priority, ranked.available_at
+FROM ranked JOIN jobs ON jobs.id = ranked.id
+ORDER BY ranked.rank, ranked.id
+LIMIT :limit
+"""
+
+class PersistentJobQueue:
+    """SQLite (WAL) backed job queue with enqueue / lease / ack / retry semantics.
+
+    Jobs are leased by priority class with aging and per-source fairness (see _LEASE_SQL).
+    """
+
+    def __init__(self, db_path, max_attempts=3, lease_seconds=600, aging_seconds=60, fairness=0.25):
+        self.db = SQLiteDatabase(db_path, schema=_SCHEMA, migrations=_MIGRATIONS)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        # Waiting this long moves a job up one priority class
+        self.aging_seconds = aging_seconds
+        # Priority classes a source's job drops per job of that source already running / ahead of it
+        self.fairness = fairness
+        # Jobs this instance leased and hasn't acked / retried / released yet; renew() keeps their leases alive
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._last_renewal = 0.0
+        logger.info(f"🗃️ PersistentJobQueue using {db_path}")
+
+    @property
+    def owner(self):
+        # pid is read per call because the queue object is created before gunicorn forks
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    # ---------- Producer side ----------
+    def enqueue(self, payload):
+        """Persist one job and return its id"""
+        return self.enqueue_many([payload])[0]
+
+    def enqueue_many(self, payloads):
+        """Persist several jobs in a single transaction (payload '_priority' / '_source' set the lease order)"""
+        now = time.time()
+        ids = []
+        with self.db.transaction() as conn:
+            for payload in payloads:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (payload, available_at, created_at, priority, source) VALUES (?, ?, ?, ?, ?)",
+                    (json.dumps(payload), now, now, payload.get('_priority', PRIORITY_NORMAL), payload.get('_source')),
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    # ---------- Consumer side ----------
+    def lease(self, max_items=10, lease_seconds=None):
+        """Claim up to max_items ready jobs (including expired leases) for this worker, most urgent first.
+
+        Each job carries its priority and queue_wait (seconds since it became ready).
+        """
+        if max_items <= 0:
+            return []
+        now = time.time()
+        lease_until = now + (lease_seconds or self.lease_seconds)
+        with self.db.transaction() as conn:
+            rows = conn.execute(
+                _LEASE_SQL,
+                {'now': now, 'aging': self.aging_seconds, 'fairness': self.fairness, 'limit': max_items},
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE jobs SET status = 'leased', lease_until = ?, owner = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(lease_until, self.owner, row[0]) for row in rows],
+                )
+        with self._held_lock:
+            self._held.update(row[0] for row in rows)
+        return [
+            {'id': row[0], 'payload': json.loads(row[1]), 'attempts': row[2] + 1,
+             'priority': row[3], 'queue_wait': max(0.0, now - row[4])}
+            for row in rows
+        ]
+
+    def ack(self, job_id):
+        """Job finished; remove it from the queue"""
+        self.db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._forget(job_id)
+
+    def release(self, job_id):
+        """Give a leased job back without counting the attempt"""
+        self.db.execute(
+            "UPDATE jobs SET status = 'pending', lease_until = NULL, owner = NULL, attempts = MAX(attempts - 1, 0) WHERE id = ?",
+            (job_id,),
+        )
+        self._forget(job_id)
+
+    def retry(self, job_id, error=None, delay=30):
+        """Schedule the job again after delay, or dead-letter it after max_attempts. Returns True if requeued"""
+        self._forget(job_id)
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return False
+            if row[0] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'dead', lease_until = NULL, last_error = ? WHERE id = ?",
+                    (str(error) if error else None, job_id),
+                )
+                logger.error(f"💀 Job {job_id} dead-lettered after {row[0]} attempts: {error}")
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', available_at = ?, lease_until = NULL, owner = NULL, last_error = ? WHERE id = ?",
+                (time.time() + delay, str(error) if error else None, job_id),
+            )
+        return True
+
+    def renew(self):
+        """Extend the lease of every job still held by this instance, at most every lease_seconds / 3.
+
+        Jobs wait in the engine's in-memory queue and in retry / rate-limit sleeps, so a single lease
+        can run out before the job is acked and let another worker post it again. Returns rows renewed.
+        """
+        now = time.time()
+        if now - self._last_renewal < self.lease_seconds / 3:
+            return 0
+        self._last_renewal = now
+        with self._held_lock:
+            held = list(self._held)
+        if not held:
+            return 0
+        cursor = self.db.execute(
+            f"UPDATE jobs SET lease_until = ? WHERE status = 'leased' AND owner = ? AND id IN ({','.join('?' * len(held))})",
+            (now + self.lease_seconds, self.owner, *held),
+        )
+        return cursor.rowcount
+
+    def _forget(self, job_id):
+        with self._held_lock:
+            self._held.discard(job_id)
+
+    # ---------- Crash recovery ----------
+    def recover(self):
+        """Return jobs leased by dead processes on this host to the pending state (call before leasing)"""
+        host = socket.gethostname()
+        rows = self.db.execute("SELECT id, owner FROM jobs WHERE status = 'leased'").fetchall()
+        orphaned = [job_id for job_id, owner in rows if self._owner_is_dead(owner, host)]
+        if orphaned:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = 'pending', lease_until = NULL, owner = NULL, available_at = ? WHERE id = ?",
+                    [(time.time(), job_id) for job_id in orphaned],
+                )
+            logger.info(f"♻️ Recovered {len(orphaned)} jobs from crashed workers")
+        return len(orphaned)
+
+    @staticmethod
+    def _owner_is_dead(owner, host):
+        if not owner:
+            return True
+        owner_host, _, pid = owner.rpartition(':')
+        if owner_host != host:
+            # Another machine's lease; leave it to lease expiry
+            return False
+        try:
+            pid = int(pid)
+            if pid == os.getpid():
+                # Same pid as ours before we leased anything: left over from a previous container
+                return True
+            os.kill(pid, 0)
+        except (ValueError, ProcessLookupError):
+            return True
+        except PermissionError:
+            return False
+        return False
+
+    # ---------- Introspection ----------
+    def depth(self):
+        """Number of jobs waiting or in progress"""
+        row = self.db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()
+        return row[0]
+
+    def pending_by_priority(self):
+        """Waiting jobs per priority label"""
+        rows = self.db.execute("SELECT priority, COUNT(*) FROM jobs WHERE status = 'pending' GROUP BY priority").fetchall()
+        counts = dict.fromkeys(PRIORITY_LABELS.values(), 0)
+        for priority, count in rows:
+            counts[PRIORITY_LABELS.get(priority, str(priority))] = count
+        return counts
+
+    def get_stats(self):
+        rows = self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        stats = {'pending': 0, 'leased': 0, 'dead': 0}
+        stats.update(dict(rows))
+        return stats
@@ -0,0 +1,117 @@
+# services/marketplace.py
+import logging
+from services.http_client import HTTPSessionManager
+from utils.url_canonical import canonicalize
+
+logger = logging.getLogger(__name__)
+
+# .com / .co.uk pages render the full price (symbol + decimals) in the offscreen span; .a-price-whole drops both
+_OFFSCREEN_PRICE_SELECTORS = ('#corePrice_feature_div .a-price .a-offscreen', '.a-price .a-offscreen')
+
+# Built-in storefront settings; anything not listed here falls back to GENERIC_MARKETPLACE
+MARKETPLACE_DEFAULTS = {
+    'amazon.in': {
+        'currency': 'INR', 'currency_symbols': ('₹', 'Rs'),
+        'image_host': 'https://images-eu.ssl-images-amazon.com',
+    },
+    'amazon.com': {
+        'currency': 'USD', 'currency_symbols': ('$',),
+        'image_host': 'https://images-na.ssl-images-amazon.com',
+        'selectors': {'price': _OFFSCREEN_PRICE_SELECTORS},
+    },
+    'amazon.co.uk': {
+        'currency': 'GBP', 'currency_symbols': ('£',),
+        'image_host': 'https://images-eu.ssl-images-amazon.com',
+        'selectors': {'price': _OFFSCREEN_PRICE_SELECTORS},
+    },
+}
+GENERIC_MARKETPLACE = {
+    'currency': None, 'currency_symbols': ('₹', 'Rs', '$', '£', '€'),
+    'image_host': 'https://images-na.ssl-images-amazon.com',
+}
+
+
+class Marketplace:
+    """One Amazon storefront: affiliate tag, currency, image host and selector overrides"""
+
+    def __init__(self, domain, affiliate_tag, currency=None, currency_symbols=('₹', 'Rs'),
+                 image_host='https://images-na.ssl-images-amazon.com', selectors=None):
+        self.domain = domain
+        self.affiliate_tag = affiliate_tag
+        self.currency = currency
+        self.currency_symbols = tuple(currency_symbols)
+        self.image_host = image_host
+        # {'title'|'price'|'image': (css, ...)} tried before the default selectors
+        self.selectors = {field: tuple(values) for field, values in (selectors or {}).items() if values}
+
+    def extraction_options(self):
+        """Keyword arguments for the product extractor (all picklable for the parser process pool)"""
+        return {
+            'image_host': self.image_host,
+            'selectors': self.selectors or None,
+            'currency_symbols': self.currency_symbols,
+        }
+
+    def __repr__(self):
+        return f"Marketplace({self.domain!r}, tag={self.affiliate_tag!r}, currency={self.currency!r})"
+
+
+class MarketplaceRegistry:
+    """Domain -> Marketplace, with a separate HTTP pool per marketplace so one slow or blocked storefront
+    can't use up the connections the others need"""
+
+    def __init__(self, tags=None, default_domain='amazon.in', default_tag=None, rate_limits=None, pool_options=None):
+        self.tags = dict(tags or {})
+        self.default_tag = default_tag
+        self.rate_limits = dict(rate_limits or {})  # {domain: requests/second}
+        self.pool_options = pool_options or {}
+        self._marketplaces = {}
+        self._sessions = {}
+        for domain in MARKETPLACE_DEFAULTS:
+            self.get(domain)
+        self.default = self.get(default_domain)
+
+    def get(self, domain):
+        """Marketplace for a domain like 'amazon.co.uk' (created on first use for unlisted storefronts)"""
+        marketplace = self._marketplaces.get(domain)
+        if marketplace is None:
+            options = MARKETPLACE_DEFAULTS.get(domain, GENERIC_MARKETPLACE)
+            marketplace = self._marketplaces[domain] = Marketplace(domain, self.tags.get(domain, self.default_tag), **options)
+        return marketplace
+
+    def for_url(self, url):
+        """Marketplace of a (canonical or raw) Amazon URL; the default one for anything else"""
+        domain = canonicalize(url).marketplace
+        return self.get(domain) if domain else self.default
+
+    def product_key(self, asin, marketplace):
+        """Product cache / price history key: the bare ASIN on the default marketplace, 'domain/ASIN' elsewhere"""
+        # Same ASIN ki price har marketplace mein alag hoti hai; default marketplace purane keys hi rakhta hai
+        if not asin or marketplace is self.default:
+            return asin
+        return f"{marketplace.domain}/{asin}"
+
+    def session_manager(self, marketplace):
+        """Dedicated pooled session manager for this marketplace"""
+        manager = self._sessions.get(marketplace.domain)
+        if manager is None:
+            manager = self._sessions[marketplace.domain] = HTTPSessionManager(**self.pool_options)
+        return manager
+
+    def rate_limit_overrides(self, max_rate):
+        """host_overrides for AdaptiveRateLimiter (its host key is the domain without www.)"""
+        return {domain: {'rate': rate, 'max_rate': max(rate, max_rate)} for domain, rate in self.rate_limits.items()}
+
+    async def close(self):
+        for manager in self._sessions.values():
+            await manager.close()
+
+    def get_stats(self):
+        return {
+            domain: {
+                'affiliate_tag': marketplace.affiliate_tag,
+                'currency': marketplace.currency,
+                'http': self._sessions[domain].get_stats() if domain in self._sessions else None,
+            }
+            for domain, marketplace in self._marketplaces.items()
+        }
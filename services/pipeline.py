@@ -0,0 +1,102 @@
+# services/pipeline.py
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+class StageError(Exception):
+    """A pipeline stage failed; carries the stage name and the original exception"""
+
+    def __init__(self, stage, error):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    """One node of the pipeline: async func(ctx) whose return value is stored as ctx[name]"""
+
+    def __init__(self, name, func, depends_on=()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, depends_on={self.depends_on})"
+
+
+@asynccontextmanager
+async def no_limit(name, key=None):
+    """Limiter that never waits"""
+    yield
+
+
+class StageGraph:
+    """Runs stages as soon as their dependencies finish, so independent stages overlap"""
+
+    def __init__(self, stages, limiter=None, observer=None):
+        self.stages = {stage.name: stage for stage in stages}
+        # limiter(name) -> async context manager, e.g. JobEngine.stage for per-stage concurrency caps
+        self.limiter = limiter or no_limit
+        # observer(name, seconds, error) is called after every stage, e.g. to feed latency metrics
+        self.observer = observer
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+    def add(self, stage):
+        """Append a stage (e.g. app-level 'post' after the processor's stages)"""
+        return StageGraph(list(self.stages.values()) + [stage], limiter=self.limiter, observer=self.observer)
+
+    def _observe(self, name, seconds, error):
+        if self.observer is None:
+            return
+        try:
+            self.observer(name, seconds, error)
+        except Exception as e:
+            logger.warning(f"⚠️ Stage observer failed for {name}: {e}")
+
+    async def run(self, ctx=None):
+        """Execute the graph. Returns ctx with every stage's output and ctx['stage_timings'] in seconds"""
+        ctx = dict(ctx or {})
+        timings = {}
+        ctx['stage_timings'] = timings
+        tasks = {}
+
+        async def run_stage(stage):
+            if stage.depends_on:
+                await asyncio.gather(*(tasks[dep] for dep in stage.depends_on))
+            with span(f"stage.{stage.name}") as stage_span:
+                waiting = time.perf_counter()
+                async with self.limiter(stage.name):
+                    start = time.perf_counter()
+                    # Time spent waiting for a free slot of this stage's concurrency limit
+                    stage_span.set(slot_wait_ms=round((start - waiting) * 1000, 1))
+                    try:
+                        ctx[stage.name] = await stage.func(ctx)
+                    except asyncio.CancelledError:
+                        timings[stage.name] = time.perf_counter() - start
+                        raise
+                    except Exception as e:
+                        timings[stage.name] = time.perf_counter() - start
+                        self._observe(stage.name, timings[stage.name], e)
+                        if isinstance(e, StageError):
+                            raise
+                        raise StageError(stage.name, e) from e
+                    timings[stage.name] = time.perf_counter() - start
+                    self._observe(stage.name, timings[stage.name], None)
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return ctx
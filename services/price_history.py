@@ -0,0 +1,147 @@
+# services/price_history.py
+import time
+import logging
+import threading
+from utils.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+# Append-only; amounts in minor units (paise / cents), one clustered b-tree ordered by (asin, time)
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS price_history (
+        asin TEXT NOT NULL,
+        observed_at INTEGER NOT NULL,
+        amount INTEGER NOT NULL,
+        mrp INTEGER,
+        currency TEXT,
+        PRIMARY KEY (asin, observed_at)
+    ) WITHOUT ROWID""",
+]
+
+# Lowest price in the window, counting the price that was already in effect when the window opened
+_MIN_SQL = """SELECT MIN(amount) FROM (
+    SELECT amount FROM price_history WHERE asin = ? AND observed_at >= ?
+    UNION ALL
+    SELECT amount FROM (SELECT amount FROM price_history WHERE asin = ? AND observed_at < ? ORDER BY observed_at DESC LIMIT 1)
+)"""
+
+
+def _to_minor(value):
+    return None if value is None else int(round(value * 100))
+
+def _to_major(value):
+    return None if value is None else value / 100
+
+
+class PriceHistory:
+    """Per-ASIN price history in SQLite, for "did the price really drop?" decisions without extra scraping.
+
+    A point is appended only when the price changed, or when the last point is older than
+    heartbeat_seconds, so a deal that is reposted all day costs a few rows, not one per job.
+    """
+
+    NEW = 'new'
+    DROP = 'drop'
+    RISE = 'rise'
+    SAME = 'same'
+
+    def __init__(self, db_path, window_days=30, retention_days=180, heartbeat_seconds=6 * 3600):
+        self.window_days = window_days
+        self.retention_days = retention_days
+        self.heartbeat_seconds = heartbeat_seconds
+        self.db = SQLiteDatabase(db_path, schema=_SCHEMA)
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'observed': 0, 'recorded': 0, 'pruned': 0,
+                      self.NEW: 0, self.DROP: 0, self.RISE: 0, self.SAME: 0}
+
+    def last(self, asin):
+        """Most recent point: {'amount', 'mrp', 'currency', 'observed_at'} or None"""
+        row = self.db.execute(
+            "SELECT amount, mrp, currency, observed_at FROM price_history WHERE asin = ? ORDER BY observed_at DESC LIMIT 1",
+            (asin,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {'amount': _to_major(row[0]), 'mrp': _to_major(row[1]), 'currency': row[2], 'observed_at': row[3]}
+
+    def min_price(self, asin, days=None, now=None):
+        """Lowest price over the last N days (default window_days), or None if the ASIN was never seen"""
+        since = int((now or time.time()) - (days or self.window_days) * 86400)
+        return _to_major(self.db.execute(_MIN_SQL, (asin, since, asin, since)).fetchone()[0])
+
+    def compare(self, asin, price, now=None):
+        """Compare a freshly scraped ParsedPrice with the history, without writing anything.
+
+        Returns {'movement', 'previous', 'lowest', 'change_percent', 'new_low'}. A missing MRP is
+        taken from the last point when the price hasn't changed. Nothing is recorded until
+        record() is called, so a job attempt that fails after this sees the same movement on retry.
+        """
+        now = int(now or time.time())
+        amount = _to_minor(price.amount)
+        since = now - int(self.window_days * 86400)
+        with self.db.transaction() as conn:
+            previous = conn.execute(
+                "SELECT amount, mrp FROM price_history WHERE asin = ? ORDER BY observed_at DESC LIMIT 1", (asin,)
+            ).fetchone()
+            lowest = conn.execute(_MIN_SQL, (asin, since, asin, since)).fetchone()[0]
+        if previous is not None and previous[0] == amount and price.mrp is None and previous[1]:
+            price.mrp = _to_major(previous[1])
+
+        if previous is None:
+            movement = self.NEW
+        elif amount < previous[0]:
+            movement = self.DROP
+        elif amount > previous[0]:
+            movement = self.RISE
+        else:
+            movement = self.SAME
+        self.stats['observed'] += 1
+        self.stats[movement] += 1
+        return {
+            'movement': movement,
+            'previous': _to_major(previous[0]) if previous else None,
+            'lowest': _to_major(lowest),
+            'change_percent': round((amount - previous[0]) / previous[0] * 100, 1) if previous else None,
+            'new_low': lowest is None or amount < lowest,
+        }
+
+    def record(self, asin, price, now=None):
+        """Append the price once the job that saw it has finished; True if a point was written"""
+        now = int(now or time.time())
+        amount = _to_minor(price.amount)
+        with self.db.transaction() as conn:
+            previous = conn.execute(
+                "SELECT amount, observed_at FROM price_history WHERE asin = ? ORDER BY observed_at DESC LIMIT 1", (asin,)
+            ).fetchone()
+            written = previous is None or previous[0] != amount or now - previous[1] >= self.heartbeat_seconds
+            if written:
+                conn.execute(
+                    "INSERT OR REPLACE INTO price_history (asin, observed_at, amount, mrp, currency) VALUES (?, ?, ?, ?, ?)",
+                    (asin, now, amount, _to_minor(price.mrp), price.currency),
+                )
+                self.stats['recorded'] += 1
+        self._maybe_prune(now)
+        return written
+
+    def _maybe_prune(self, now):
+        # At most once an hour per process; old points only matter for windows longer than the retention
+        with self._lock:
+            if now - self._last_prune < 3600:
+                return
+            self._last_prune = now
+        try:
+            cursor = self.db.execute(
+                "DELETE FROM price_history WHERE observed_at < ?", (now - int(self.retention_days * 86400),)
+            )
+            self.stats['pruned'] += cursor.rowcount
+        except Exception as e:
+            logger.warning(f"⚠️ Could not prune price history: {e}")
+
+    def close(self):
+        self.db.close()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['window_days'] = self.window_days
+        return stats
@@ -0,0 +1,139 @@
+# services/product_cache.py
+import time
+import logging
+import threading
+from collections import OrderedDict
+from utils.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS product_cache (
+        asin TEXT PRIMARY KEY,
+        title TEXT,
+        image_url TEXT,
+        price TEXT,
+        mrp TEXT,
+        static_at REAL NOT NULL,
+        price_at REAL NOT NULL
+    )""",
+]
+# Caches created before the MRP was scraped
+_MIGRATIONS = [
+    "ALTER TABLE product_cache ADD COLUMN mrp TEXT",
+]
+
+class ProductCache:
+    """ASIN-keyed product info LRU cache.
+
+    Title/image live for static_ttl, price for price_ttl. A price that is older than price_ttl
+    but younger than price_ttl + stale_seconds is still served ('stale') while the caller
+    refreshes it in the background.
+    """
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+    MISS = 'miss'
+
+    def __init__(self, max_size=5000, static_ttl=7 * 86400, price_ttl=1800, stale_seconds=6 * 3600, db_path=None):
+        self.max_size = max_size
+        self.static_ttl = static_ttl
+        self.price_ttl = price_ttl
+        self.stale_seconds = stale_seconds
+        self.db = SQLiteDatabase(db_path, schema=_SCHEMA, migrations=_MIGRATIONS) if db_path else None
+        self._entries = OrderedDict()  # {asin: entry dict}
+        self._lock = threading.Lock()
+        self.stats = {'fresh': 0, 'stale': 0, 'miss': 0, 'stores': 0}
+
+    def lookup(self, asin):
+        """Return (product_info, state) where state is fresh / stale / miss"""
+        entry = self._get_entry(asin)
+        state = self._state(entry)
+        with self._lock:  # called from worker threads when SQLite-backed
+            self.stats[state] += 1
+        if state == self.MISS:
+            return None, state
+        return {'title': entry['title'], 'image_url': entry['image_url'], 'price': entry['price'], 'mrp': entry['mrp']}, state
+
+    def peek(self, asin):
+        """Cache state without counting it as a lookup (e.g. to prioritize a job at intake)"""
+        return self._state(self._get_entry(asin))
+
+    def _state(self, entry):
+        if entry is None:
+            return self.MISS
+        now = time.time()
+        if now - entry['static_at'] > self.static_ttl:
+            return self.MISS
+        price_age = now - entry['price_at']
+        if price_age <= self.price_ttl:
+            return self.FRESH
+        if price_age <= self.price_ttl + self.stale_seconds:
+            return self.STALE
+        return self.MISS
+
+    def store(self, asin, product_info):
+        """Cache a successful scrape; results without a title are not cached"""
+        if not asin or not product_info or not product_info.get('title'):
+            return
+        now = time.time()
+        entry = {
+            'title': product_info.get('title'),
+            'image_url': product_info.get('image_url'),
+            'price': product_info.get('price'),
+            'mrp': product_info.get('mrp'),
+            'static_at': now,
+            'price_at': now,
+        }
+        self._put_entry(asin, entry)
+        with self._lock:
+            self.stats['stores'] += 1
+        if self.db is not None:
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO product_cache (asin, title, image_url, price, mrp, static_at, price_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (asin, entry['title'], entry['image_url'], entry['price'], entry['mrp'], entry['static_at'], entry['price_at']),
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Could not persist product cache entry {asin}: {e}")
+
+    def _get_entry(self, asin):
+        with self._lock:
+            entry = self._entries.get(asin)
+            if entry is not None:
+                self._entries.move_to_end(asin)
+                return entry
+        if self.db is None:
+            return None
+
+        # Memory miss: fall back to disk (survives restarts, shared by workers)
+        try:
+            row = self.db.execute(
+                "SELECT title, image_url, price, mrp, static_at, price_at FROM product_cache WHERE asin = ?", (asin,)
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read product cache entry {asin}: {e}")
+            return None
+        if row is None:
+            return None
+        entry = dict(zip(('title', 'image_url', 'price', 'mrp', 'static_at', 'price_at'), row))
+        self._put_entry(asin, entry)
+        return entry
+
+    def _put_entry(self, asin, entry):
+        with self._lock:
+            self._entries[asin] = entry
+            self._entries.move_to_end(asin)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        lookups = stats['fresh'] + stats['stale'] + stats['miss']
+        stats['size'] = len(self._entries)
+        stats['hit_rate'] = round((stats['fresh'] + stats['stale']) / lookups, 3) if lookups else 0.0
+        return stats
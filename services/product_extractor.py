@@ -0,0 +1,425 @@
+# services/product_extractor.py
+import re
+import asyncio
+import logging
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from lxml import etree, html as lxml_html
+
+logger = logging.getLogger(__name__)
+
+# Selectors in priority order (shared by the lxml engine and the BeautifulSoup fallback)
+TITLE_SELECTORS = [
+    '#productTitle',
+    'h1 span#productTitle',
+    'h1.a-size-large.a-spacing-none.a-color-base',
+    '.product-title',
+    '[data-automation-id="product-title"]',
+    'h1.a-size-large',
+    'h1 span',
+    '.a-size-large.product-title-word-break',
+    '#feature-bullets ul li span',
+    '.a-unordered-list .a-list-item',
+    'h1[data-automation-id="product-title"]',
+    '.a-size-large.a-spacing-none.a-color-base.a-text-normal'
+]
+
+PRICE_SELECTORS = [
+    '.a-price-whole',
+    '.a-price .a-offscreen',
+    '.a-price-current .a-price-whole',
+    '[data-automation-id="product-price"]',
+    '.a-price-range',
+    '.a-price.a-text-price.a-size-medium.apexPriceToPay .a-offscreen',
+    '.a-price .a-price-symbol',
+    'span.a-price.a-text-price.a-size-medium.apexPriceToPay',
+    '.a-price-current',
+    '#corePrice_feature_div .a-price .a-offscreen'
+]
+
+# Struck-through list price ("M.R.P."), shown next to the selling price when there is a discount
+MRP_SELECTORS = [
+    '.a-price.a-text-price[data-a-strike="true"] .a-offscreen',
+    '.basisPrice .a-price .a-offscreen',
+    '#listPrice',
+    '.priceBlockStrikePriceString',
+]
+
+IMAGE_SELECTORS = [
+    '#landingImage',
+    '[data-automation-id="product-image"] img',
+    '.a-dynamic-image',
+    '#imgTagWrapperId img',
+    '.a-carousel-col .a-carousel-card img',
+    '[data-a-dynamic-image]',
+    '#main-image-container img',
+    '.imageThumb img'
+]
+
+DEFAULT_IMAGE_HOST = 'https://images-na.ssl-images-amazon.com'
+DEFAULT_CURRENCY_SYMBOLS = ('₹', 'Rs')
+
+# ---------- Field cleaning (same rules for every engine) ----------
+_WHITESPACE_RE = re.compile(r'\s+')
+_PARENS_RE = re.compile(r'\(.*?\)')
+
+@functools.lru_cache(maxsize=32)
+def _price_junk_re(currency_symbols):
+    # Everything except digits, separators and this marketplace's currency markers
+    return re.compile(r'[^\d.,\-\s' + ''.join(re.escape(symbol) for symbol in currency_symbols) + ']')
+
+def clean_title(text):
+    """Normalized title, or None if the text doesn't look like one"""
+    title = (text or '').strip()
+    if not title or len(title) <= 5:
+        return None
+    clean = _WHITESPACE_RE.sub(' ', title).replace('\n', ' ').strip()
+    clean = _PARENS_RE.sub('', clean).strip()
+    if len(clean) > 80:
+        clean = clean[:77] + "..."
+    return clean
+
+def clean_price(text, currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+    """Price string with currency markers kept, or None"""
+    price_text = (text or '').strip()
+    if price_text and (any(symbol in price_text for symbol in currency_symbols) or any(char.isdigit() for char in price_text)):
+        clean = _price_junk_re(tuple(currency_symbols)).sub('', price_text).strip()
+        return clean or None
+    return None
+
+def normalize_image_src(src, image_host=DEFAULT_IMAGE_HOST):
+    """Absolute image URL, or None if src isn't usable"""
+    if not src or not ('amazon' in src or src.startswith('http')):
+        return None
+    if src.startswith('//'):
+        return 'https:' + src
+    if src.startswith('/'):
+        return image_host + src
+    return src
+
+# ---------- Selector compilation ----------
+_SIMPLE_SELECTOR_RE = re.compile(
+    r'(?P<tag>[a-zA-Z][\w-]*)?'
+    r'(?P<parts>(?:#[\w-]+|\.[\w-]+|\[[\w-]+(?:="[^"]*")?\])*)$'
+)
+_PART_RE = re.compile(r'#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:="([^"]*)")?\]')
+
+def css_to_xpath(selector):
+    """Translate the CSS subset used above (tag, #id, .class, [attr], [attr="v"], descendant) to XPath"""
+    steps = []
+    for simple in selector.split():
+        match = _SIMPLE_SELECTOR_RE.match(simple)
+        if not match:
+            raise ValueError(f"Unsupported selector: {selector}")
+        conditions = []
+        for id_, cls, attr, value in _PART_RE.findall(match.group('parts')):
+            if id_:
+                conditions.append(f'@id="{id_}"')
+            elif cls:
+                conditions.append(f'contains(concat(" ", normalize-space(@class), " "), " {cls} ")')
+            elif value:
+                conditions.append(f'@{attr}="{value}"')
+            else:
+                conditions.append(f'@{attr}')
+        step = match.group('tag') or '*'
+        if conditions:
+            step += '[' + ' and '.join(conditions) + ']'
+        steps.append(step)
+    return '(//' + '//'.join(steps) + ')[1]'
+
+@functools.lru_cache(maxsize=256)
+def selector_steps(selector):
+    """Same CSS subset as css_to_xpath, as (tag, ids, classes, attrs) steps from outermost to innermost"""
+    steps = []
+    for simple in selector.split():
+        match = _SIMPLE_SELECTOR_RE.match(simple)
+        if not match:
+            raise ValueError(f"Unsupported selector: {selector}")
+        ids, classes, attrs = [], [], []
+        for id_, cls, attr, value in _PART_RE.findall(match.group('parts')):
+            if id_:
+                ids.append(id_)
+            elif cls:
+                classes.append(cls)
+            else:
+                attrs.append((attr, value or None))
+        steps.append((match.group('tag'), tuple(ids), frozenset(classes), tuple(attrs)))
+    return tuple(steps)
+
+def _step_matches(element, step):
+    tag, ids, classes, attrs = step
+    if tag and element.tag != tag:
+        return False
+    if any(element.get('id') != id_ for id_ in ids):
+        return False
+    if classes and not classes <= set((element.get('class') or '').split()):
+        return False
+    for name, value in attrs:
+        actual = element.get(name)
+        if actual is None or (value is not None and actual != value):
+            return False
+    return True
+
+def selector_matches(element, steps):
+    """True if element matches the selector's last step and its ancestors match the rest (descendant combinator)"""
+    if not _step_matches(element, steps[-1]):
+        return False
+    remaining = len(steps) - 2
+    for ancestor in element.iterancestors():
+        if remaining < 0:
+            break
+        if _step_matches(ancestor, steps[remaining]):
+            remaining -= 1
+    return remaining < 0
+
+def _compile(selectors):
+    return [(selector, etree.XPath(css_to_xpath(selector))) for selector in selectors]
+
+_TITLE_XPATHS = _compile(TITLE_SELECTORS)
+_PRICE_XPATHS = _compile(PRICE_SELECTORS)
+_IMAGE_XPATHS = _compile(IMAGE_SELECTORS)
+_MRP_XPATHS = _compile(MRP_SELECTORS)
+_DEFAULT_XPATHS = {'title': _TITLE_XPATHS, 'price': _PRICE_XPATHS, 'image': _IMAGE_XPATHS, 'mrp': _MRP_XPATHS}
+
+@functools.lru_cache(maxsize=64)
+def _xpaths(field, extra_selectors=()):
+    """Marketplace override selectors (tried first) + the defaults, compiled once per combination"""
+    if not extra_selectors:
+        return _DEFAULT_XPATHS[field]
+    return _compile(extra_selectors) + _DEFAULT_XPATHS[field]
+
+# ---------- Extraction ----------
+def _text(element):
+    # itertext() works for both lxml.html and plain etree elements (the pull parser yields the latter)
+    return ''.join(element.itertext())
+
+def _first(root, compiled, convert):
+    for selector, xpath in compiled:
+        try:
+            found = xpath(root)
+            if found:
+                value = convert(found[0])
+                if value:
+                    return value
+        except Exception:
+            continue
+    return None
+
+def _converter(field, image_host=DEFAULT_IMAGE_HOST, currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+    """Matched element -> cleaned field value (shared by the tree extractor and the streaming scanner)"""
+    if field == 'title':
+        return lambda el: clean_title(_text(el))
+    if field == 'image':
+        return lambda el: normalize_image_src(el.get('src') or el.get('data-src') or el.get('data-a-dynamic-image'), image_host)
+    return lambda el: clean_price(_text(el), currency_symbols)
+
+def extract_title(root, selectors=()):
+    return _first(root, _xpaths('title', tuple(selectors)), _converter('title'))
+
+def extract_price(root, selectors=(), currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+    return _first(root, _xpaths('price', tuple(selectors)), _converter('price', currency_symbols=currency_symbols))
+
+def extract_mrp(root, selectors=(), currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+    return _first(root, _xpaths('mrp', tuple(selectors)), _converter('mrp', currency_symbols=currency_symbols))
+
+def extract_image(root, image_host=DEFAULT_IMAGE_HOST, selectors=()):
+    return _first(root, _xpaths('image', tuple(selectors)), _converter('image', image_host=image_host))
+
+def extract_from_tree(root, image_host=DEFAULT_IMAGE_HOST, selectors=None, currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+    """Run every compiled selector against an already parsed lxml tree.
+
+    selectors: optional {'title'|'price'|'image'|'mrp': (css, ...)} overrides tried before the defaults.
+    """
+    selectors = selectors or {}
+    return {
+        'title': extract_title(root, selectors.get('title', ())) or '',
+        'price': extract_price(root, selectors.get('price', ()), currency_symbols) or 'Price not available',
+        'mrp': extract_mrp(root, selectors.get('mrp', ()), currency_symbols),
+        'image_url': extract_image(root, image_host, selectors.get('image', ())),
+    }
+
+def extract_product_fields(html_content, image_host=DEFAULT_IMAGE_HOST, selectors=None,
+                           currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+    """Parse HTML (str or bytes) with lxml and extract title/price/MRP/image. Module-level so a process pool can pickle it"""
+    if not html_content:
+        return extract_from_tree(lxml_html.fromstring('<html></html>'), image_host, selectors, currency_symbols)
+    return extract_from_tree(lxml_html.fromstring(html_content), image_host, selectors, currency_symbols)
+
+
+class StreamingProductScanner:
+    """Incremental lxml parse of a streamed page; complete once the read prefix decides title, price, MRP and image
+
+    Each field's selectors (marketplace overrides first, then the defaults) are matched against
+    elements as they close, and their first matches are kept. A field is decided when, in priority
+    order, every selector before the winner matched an empty value and the winner matched a real
+    one: extract_from_tree on the whole page would return the same. Pages without a struck-through
+    MRP never decide it that way, so the MRP also counts as done once the block around the price
+    (nearest ancestor with an id) has closed. Overrides outside the CSS subset css_to_xpath handles
+    can't be evaluated while streaming; then the whole page is read.
+    """
+
+    FIELDS = ('title', 'price', 'mrp', 'image')
+
+    def __init__(self, image_host=DEFAULT_IMAGE_HOST, encoding=None, selectors=None,
+                 currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+        self.image_host = image_host
+        self.selectors = selectors
+        self.currency_symbols = currency_symbols
+        self.parser = etree.HTMLPullParser(events=('end',), encoding=encoding)
+        self.bytes_fed = 0
+        self.found = dict.fromkeys(self.FIELDS, False)
+        self._convert = {field: _converter(field, image_host, currency_symbols) for field in self.FIELDS}
+        self._chains = {}   # {field: [steps of each selector, in priority order]}
+        self._index = None
+        self._first = {}    # {(field, position): (value, element) of that selector's first match}
+        self._price_block = None
+        self._closed_ids = set()
+        try:
+            for field in self.FIELDS:
+                overrides = tuple((selectors or {}).get(field, ()))
+                self._chains[field] = [selector_steps(selector) for selector, _ in _xpaths(field, overrides)]
+            self._build_index()
+            self.streamable = True
+        except ValueError as e:
+            logger.warning(f"⚠️ Streaming early stop disabled: {e}")
+            self.streamable = False
+
+    def _build_index(self):
+        """Index the selectors of still undecided fields by their innermost step's id, else a class,
+        else an attribute, else the tag, so most elements are rejected with a few dict lookups"""
+        self._index = {'#': {}, '.': {}, '[': {}, '': {}}
+        for field, chain in self._chains.items():
+            if self.found[field]:
+                continue
+            for position, steps in enumerate(chain):
+                kind, name = self._step_key(steps[-1])
+                self._index[kind].setdefault(name, []).append((field, position))
+
+    @staticmethod
+    def _step_key(step):
+        tag, ids, classes, attrs = step
+        if ids:
+            return ('#', ids[0])
+        if classes:
+            return ('.', min(classes))
+        if attrs:
+            return ('[', attrs[0][0])
+        return ('', tag)
+
+    def _candidates(self, element):
+        """(field, position) of every selector whose innermost step could match this element"""
+        by_id, by_class, by_attr, by_tag = self._index['#'], self._index['.'], self._index['['], self._index['']
+        candidates = list(by_tag.get(element.tag, ()))
+        ident = element.get('id')
+        if ident:
+            self._closed_ids.add(ident)
+            candidates.extend(by_id.get(ident, ()))
+        classes = element.get('class')
+        if classes:
+            for cls in classes.split():
+                candidates.extend(by_class.get(cls, ()))
+        for name, entries in by_attr.items():
+            if element.get(name) is not None:
+                candidates.extend(entries)
+        return candidates
+
+    @property
+    def complete(self):
+        if not (self.streamable and self.found['title'] and self.found['price'] and self.found['image']):
+            return False
+        if self.found['mrp']:
+            return True
+        return self._price_block is None or self._price_block.get('id') in self._closed_ids
+
+    def feed(self, chunk):
+        self.bytes_fed += len(chunk)
+        self.parser.feed(chunk)
+        if not self.streamable or all(self.found.values()):
+            for _ in self.parser.read_events():
+                pass  # drain; the tree is kept for result()
+            return self.complete
+        for _, element in self.parser.read_events():
+            if not isinstance(element.tag, str):
+                continue  # comments / processing instructions
+            for field, position in self._candidates(element):
+                if (field, position) in self._first:
+                    continue
+                if selector_matches(element, self._chains[field][position]):
+                    self._first[(field, position)] = (self._value(field, element), element)
+        decided = [field for field in self.FIELDS if not self.found[field] and self._decide(field)]
+        if decided:
+            self._build_index()
+        return self.complete
+
+    def _value(self, field, element):
+        try:
+            return self._convert[field](element)
+        except Exception:
+            return None
+
+    def _decide(self, field):
+        for position in range(len(self._chains[field])):
+            entry = self._first.get((field, position))
+            if entry is None:
+                return False  # a higher-priority selector may still match further down the page
+            value, element = entry
+            if value:
+                self.found[field] = True
+                if field == 'price':
+                    # Nearest container with an id (e.g. #corePrice_feature_div) also holds the struck-through MRP
+                    self._price_block = next((parent for parent in element.iterancestors() if parent.get('id')), None)
+                return True
+        return False
+
+    def result(self):
+        """Extract from whatever has been parsed so far"""
+        return extract_from_tree(self.parser.close(), self.image_host, self.selectors, self.currency_symbols)
+
+
+class ProductExtractor:
+    """Runs lxml parsing off the event loop, in a process pool (or a thread when processes=0)"""
+
+    def __init__(self, processes=2):
+        self.processes = processes
+        self._executor = None
+        self._scan_executor = None
+
+    def _get_executor(self):
+        if self.processes > 0 and self._executor is None:
+            # spawn: forking a multi-threaded gunicorn worker is not safe. Spawned children re-import the
+            # entry script as '__mp_main__', so it must not build the app then (see the guard in main.py)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"🧩 Parser process pool started ({self.processes} processes)")
+        return self._executor
+
+    async def extract(self, html_content, image_host=DEFAULT_IMAGE_HOST, selectors=None,
+                      currency_symbols=DEFAULT_CURRENCY_SYMBOLS):
+        # partial of a module-level function pickles fine for the process pool
+        task = functools.partial(extract_product_fields, html_content, image_host, selectors, currency_symbols)
+        executor = self._get_executor()
+        if executor is None:
+            return await asyncio.to_thread(task)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, task)
+
+    async def scan(self, func, *args, **kwargs):
+        """Run a StreamingProductScanner step (constructor, feed, result) off the event loop.
+
+        An lxml parser must stay on the thread that created it, so every scanner lives on the
+        same single worker thread; asyncio.to_thread would hop between pool threads and crash.
+        """
+        if self._scan_executor is None:
+            self._scan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-parse")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._scan_executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._scan_executor is not None:
+            self._scan_executor.shutdown(wait=False, cancel_futures=True)
+            self._scan_executor = None
@@ -0,0 +1,148 @@
+# services/rate_limiter.py
+import time
+import random
+import asyncio
+import logging
+from urllib.parse import urlparse
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+class HostRateLimiter:
+    """Token bucket for one host whose rate adapts AIMD-style: +step per success, xfactor per throttle"""
+
+    def __init__(self, host, rate=1.0, burst=3, min_rate=0.1, max_rate=5.0, increase_step=0.05,
+                 decrease_factor=0.5, jitter=0.1):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.jitter = jitter
+
+        self.tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.requests = 0
+        self.throttle_events = 0
+        self.waits = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self):
+        """Wait only as long as the current rate requires; concurrent callers queue up fairly"""
+        async with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens may go negative: that is a reservation for a future slot
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            wait = max(wait, self._paused_until - now)
+            self.requests += 1
+
+        if wait > 0:
+            wait *= 1 + random.uniform(0, self.jitter)
+            self.waits += 1
+            self.total_wait += wait
+            with span('rate_limit.wait', limiter=self.host):
+                await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Additive increase"""
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease, plus a pause if the server told us how long to wait"""
+        self.throttle_events += 1
+        old_rate = self.rate
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        # Drop saved-up burst so the lower rate applies right away
+        self.tokens = min(self.tokens, 0)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(f"🐢 Throttled by {self.host}: rate {old_rate:.2f} -> {self.rate:.2f} req/s")
+
+    def get_stats(self):
+        return {
+            'rate': round(self.rate, 3),
+            'requests': self.requests,
+            'throttle_events': self.throttle_events,
+            'waits': self.waits,
+            'total_wait_seconds': round(self.total_wait, 2),
+        }
+
+
+class AdaptiveRateLimiter:
+    """Per-host limiters shared by every concurrent job"""
+
+    def __init__(self, default_rate=1.0, burst=3, min_rate=0.1, max_rate=5.0, host_overrides=None):
+        self.defaults = {'rate': default_rate, 'burst': burst, 'min_rate': min_rate, 'max_rate': max_rate}
+        self.host_overrides = host_overrides or {}  # {host: {rate:..., max_rate:...}}
+        self._hosts = {}
+
+    @staticmethod
+    def host_key(url):
+        host = (urlparse(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+
+    def for_host(self, host):
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            options = dict(self.defaults, **self.host_overrides.get(host, {}))
+            limiter = self._hosts[host] = HostRateLimiter(host, **options)
+        return limiter
+
+    async def acquire(self, url):
+        await self.for_host(self.host_key(url)).acquire()
+
+    def report(self, url, status, retry_after=None):
+        """Feed the response status back: throttling statuses back off, anything else below 500 speeds up"""
+        limiter = self.for_host(self.host_key(url))
+        if status in THROTTLE_STATUSES:
+            limiter.on_throttle(retry_after)
+        elif status < 500:
+            limiter.on_success()
+
+    def get_stats(self):
+        return {host: limiter.get_stats() for host, limiter in self._hosts.items()}
+
+
+class TelegramScheduler:
+    """Bot API send limits shared by every sender: one global bucket plus one bucket per chat"""
+
+    def __init__(self, global_rate=30.0, chat_rate=20 / 60, chat_burst=3):
+        # Fixed rates (min == max): Telegram publishes its limits, so there is nothing to probe for
+        self.global_limiter = HostRateLimiter('telegram', rate=global_rate, burst=max(1, int(global_rate)),
+                                              min_rate=global_rate, max_rate=global_rate, jitter=0)
+        self.chat_options = {'rate': chat_rate, 'burst': chat_burst, 'min_rate': chat_rate,
+                             'max_rate': chat_rate, 'jitter': 0}
+        self._chats = {}
+
+    def for_chat(self, chat_id):
+        limiter = self._chats.get(chat_id)
+        if limiter is None:
+            limiter = self._chats[chat_id] = HostRateLimiter(f"chat {chat_id}", **self.chat_options)
+        return limiter
+
+    async def acquire(self, chat_id):
+        await self.for_chat(chat_id).acquire()
+        await self.global_limiter.acquire()
+
+    def on_retry_after(self, chat_id, seconds):
+        """429 from Telegram: hold this chat for retry_after seconds"""
+        self.for_chat(chat_id).on_throttle(seconds)
+
+    def get_stats(self):
+        return {
+            'global': self.global_limiter.get_stats(),
+            'chats': {str(chat_id): limiter.get_stats() for chat_id, limiter in self._chats.items()},
+        }
@@ -0,0 +1,158 @@
+# services/retry_policy.py
+import time
+import socket
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+import aiohttp
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Failure classes
+BLOCKED = 'blocked'          # 503 / 429 from Amazon
+TIMEOUT = 'timeout'
+DNS = 'dns'
+NETWORK = 'network'          # connection reset, refused, ...
+SERVER_ERROR = 'server_error'
+CLIENT_ERROR = 'client_error'  # 404 etc., retrying won't help
+PARSE_MISS = 'parse_miss'    # page came back but had no product title (often a captcha page)
+UNKNOWN = 'unknown'
+
+RETRYABLE = frozenset({BLOCKED, TIMEOUT, DNS, NETWORK, SERVER_ERROR, PARSE_MISS})
+
+class FetchError(Exception):
+    """A failed fetch that has already been classified"""
+
+    def __init__(self, kind, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_status(cls, status, url, retry_after=None):
+        if status in (429, 503):
+            kind = BLOCKED
+        elif status >= 500:
+            kind = SERVER_ERROR
+        else:
+            kind = CLIENT_ERROR
+        return cls(kind, f"HTTP {status} for {url}", status=status, retry_after=retry_after)
+
+
+def classify_failure(error):
+    """Map an exception to one of the failure classes above"""
+    if isinstance(error, FetchError):
+        return error.kind
+    if isinstance(error, asyncio.TimeoutError):
+        return TIMEOUT
+    if isinstance(error, aiohttp.ClientConnectorError):
+        # aiohttp 3.8 has no dedicated DNS error; the resolver's gaierror is kept as os_error
+        return DNS if isinstance(getattr(error, 'os_error', None), socket.gaierror) else NETWORK
+    if isinstance(error, aiohttp.ClientResponseError):
+        return FetchError.from_status(error.status, '').kind
+    if isinstance(error, (aiohttp.ClientError, ConnectionError)):
+        return NETWORK
+    return UNKNOWN
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Exponential backoff with equal jitter: somewhere in [d/2, d] for d = base * 2^(attempt-1), capped"""
+    delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+    return random.uniform(delay / 2, delay)
+
+
+class RetryBudget:
+    """Caps retries at a fraction of recent first attempts, so a blocking spell can't multiply the load"""
+
+    def __init__(self, ratio=0.2, min_retries=10, window_seconds=60):
+        self.ratio = ratio
+        self.min_retries = min_retries  # always allowed per window, so a quiet bot can still retry
+        self.window_seconds = window_seconds
+        self._attempts = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+        self.denied = 0
+
+    def _trim(self, now):
+        cutoff = now - self.window_seconds
+        for timestamps in (self._attempts, self._retries):
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+    def record_attempt(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._attempts.append(now)
+
+    def try_spend(self):
+        """Take one retry from the budget; False if it is used up"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._attempts):
+                self.denied += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def get_stats(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            return {'attempts': len(self._attempts), 'retries': len(self._retries), 'denied': self.denied}
+
+
+class RetryPolicy:
+    """Retries one async operation (a single pipeline stage) on retryable failures"""
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, kind_delays=None, retryable=RETRYABLE, budget=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Per-class base delay, e.g. {BLOCKED: 10} so a block backs off harder than a timeout
+        self.kind_delays = kind_delays or {}
+        self.retryable = retryable
+        self.budget = budget
+        self.stats = {'calls': 0, 'retries': 0, 'gave_up': 0, 'budget_exhausted': 0, 'failures': {}}
+
+    def backoff(self, attempt, kind=None, retry_after=None):
+        delay = backoff_delay(attempt, self.kind_delays.get(kind, self.base_delay), self.max_delay)
+        return max(delay, retry_after or 0)
+
+    async def run(self, name, func, *args, **kwargs):
+        """await func(*args, **kwargs), retrying with backoff. The last error is re-raised"""
+        self.stats['calls'] += 1
+        if self.budget is not None:
+            self.budget.record_attempt()
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                kind = classify_failure(e)
+                self.stats['failures'][kind] = self.stats['failures'].get(kind, 0) + 1
+                if kind not in self.retryable or attempt == self.max_attempts:
+                    self.stats['gave_up'] += 1
+                    raise
+                if self.budget is not None and not self.budget.try_spend():
+                    self.stats['budget_exhausted'] += 1
+                    logger.warning(f"⛔ Retry budget exhausted, not retrying {name} ({kind}): {e}")
+                    raise
+
+                delay = self.backoff(attempt, kind, getattr(e, 'retry_after', None))
+                self.stats['retries'] += 1
+                logger.warning(f"🔁 {name} failed ({kind}): {e}. Retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                with span('retry.backoff', operation=name, kind=kind, attempt=attempt):
+                    await asyncio.sleep(delay)
+
+    def get_stats(self):
+        stats = dict(self.stats, failures=dict(self.stats['failures']))
+        if self.budget is not None:
+            stats['budget'] = self.budget.get_stats()
+        return stats
@@ -0,0 +1,224 @@
+# services/tracing.py
+import json
+import time
+import heapq
+import queue
+import asyncio
+import logging
+import itertools
+import threading
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# The active trace/span follow the job through awaits and into tasks it creates (contextvars are copied per task)
+_current_trace = ContextVar('current_trace', default=None)
+_current_span = ContextVar('current_span', default=None)
+
+
+class _NoopSpan:
+    """Returned when nothing is being traced, so instrumented code costs one ContextVar lookup"""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed operation inside a trace, with free-form attributes (asin, channel, status, bytes, ...)"""
+
+    __slots__ = ('trace', 'id', 'parent_id', 'name', 'attributes', 'start', 'duration', 'error', '_token')
+
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.id = next(trace._ids)
+        parent = _current_span.get()
+        self.parent_id = parent.id if parent is not None and parent.trace is trace else None
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.duration = None
+        self.error = None
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self.error = f"{exc_type.__name__}: {exc}"
+        if self.trace.duration is None:
+            self.trace.spans.append(self)
+        return False
+
+    def to_dict(self, origin):
+        data = {
+            'id': self.id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 2),
+            'duration_ms': round(self.duration * 1000, 2),
+        }
+        if self.attributes:
+            data['attributes'] = self.attributes
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class Trace:
+    """All spans of one job attempt; entering it makes it the current trace"""
+
+    __slots__ = ('tracer', 'name', 'attributes', 'started_at', 'start', 'duration', 'error', 'spans', '_ids', '_tokens')
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.start = 0.0
+        self.duration = None
+        self.error = None
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._tokens = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._tokens = (_current_trace.set(self), _current_span.set(None))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_trace.reset(self._tokens[0])
+        _current_span.reset(self._tokens[1])
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self):
+        data = {
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 2),
+            'attributes': self.attributes,
+            'spans': [span.to_dict(self.start) for span in sorted(self.spans, key=lambda s: s.start)],
+        }
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+def span(name, **attributes):
+    """Time a block as a span of the current trace; a no-op outside a trace or after it has finished"""
+    trace = _current_trace.get()
+    if trace is None or trace.duration is not None:
+        # duration set = trace finished, e.g. a background refresh task that inherited the job's context
+        return _NOOP
+    return Span(trace, name, attributes)
+
+def annotate(**attributes):
+    """Add attributes to the innermost open span (no-op when nothing is traced)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+def annotate_trace(**attributes):
+    """Add attributes to the current trace itself, e.g. the ASIN once it is known"""
+    trace = _current_trace.get()
+    if trace is not None and trace.duration is None:
+        trace.set(**attributes)
+
+
+class Tracer:
+    """Starts per-job traces, keeps the slowest N finished ones and optionally appends every trace to a JSONL file"""
+
+    def __init__(self, slow_jobs=50, export_path=None, enabled=True):
+        self.enabled = enabled
+        self.slow_jobs = slow_jobs
+        self.export_path = export_path
+        self._slowest = []  # min-heap of (duration, seq, trace), so the fastest of the kept N is dropped first
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._export_queue = queue.SimpleQueue() if export_path else None
+        self._writer = None
+        self.stats = {'traces': 0, 'exported': 0, 'export_errors': 0}
+
+    def trace(self, name, **attributes):
+        """with tracer.trace('job', job_id=...) as trace: ... (a no-op span when tracing is disabled)"""
+        if not self.enabled:
+            return _NOOP
+        return Trace(self, name, attributes)
+
+    def _finish(self, trace):
+        self.stats['traces'] += 1
+        entry = (trace.duration, next(self._seq), trace)
+        with self._lock:
+            if len(self._slowest) < self.slow_jobs:
+                heapq.heappush(self._slowest, entry)
+            elif self._slowest and entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+        if self._export_queue is not None:
+            # File writes happen on a writer thread, never on the event loop
+            self._ensure_writer()
+            self._export_queue.put(trace)
+
+    def slowest(self, limit=None):
+        """Slowest kept traces, slowest first, as dicts"""
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [trace.to_dict() for _, _, trace in entries[:limit]]
+
+    # ---------- JSONL export ----------
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        with open(self.export_path, 'a', encoding='utf-8') as f:
+            while True:
+                trace = self._export_queue.get()
+                if trace is None:
+                    return
+                try:
+                    f.write(json.dumps(trace.to_dict(), default=str) + '\n')
+                    f.flush()
+                    self.stats['exported'] += 1
+                except Exception as e:
+                    self.stats['export_errors'] += 1
+                    logger.warning(f"⚠️ Could not export trace: {e}")
+
+    def close(self):
+        """Write out queued traces and stop the exporter thread"""
+        if self._writer is not None:
+            self._export_queue.put(None)
+            self._writer.join(5)
+
+    def get_stats(self):
+        with self._lock:
+            kept = len(self._slowest)
+            slowest_ms = round(max(self._slowest)[0] * 1000, 2) if self._slowest else None
+        return dict(self.stats, enabled=self.enabled, kept=kept, slowest_ms=slowest_ms)
@@ -0,0 +1,80 @@
+# services/url_resolver.py
+import asyncio
+import logging
+from services.http_client import HTTPSessionManager
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class ShortURLResolver:
+    """Async short-link expansion with an LRU+TTL cache and in-flight request coalescing"""
+
+    def __init__(self, session_manager=None, cache_size=10000, ttl_seconds=6 * 3600, failure_ttl_seconds=60, timeout=10):
+        self.session_manager = session_manager or HTTPSessionManager()
+        self.cache = TTLCache(max_size=cache_size, ttl_seconds=ttl_seconds)
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.timeout = timeout
+        self._in_flight = {}  # {url: Future}; only touched from the event loop thread
+        self.network_lookups = 0
+        self.coalesced = 0
+
+    def peek(self, url):
+        """Cached final URL or None. Never touches the network, safe from any thread"""
+        return self.cache.get(url)
+
+    async def resolve(self, url, headers=None):
+        """Return the final URL after redirects, sharing one lookup between concurrent callers"""
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+
+        future = self._in_flight.get(url)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[url] = future
+        try:
+            final_url, ok = await self._lookup(url, headers)
+            self.cache.set(url, final_url, ttl_seconds=None if ok else self.failure_ttl_seconds)
+            future.set_result(final_url)
+            return final_url
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a lone future doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(url, None)
+
+    async def _lookup(self, url, headers):
+        """HEAD with redirects, GET fallback. Returns (final_url, succeeded)"""
+        self.network_lookups += 1
+        session = await self.session_manager.get_session()
+        try:
+            async with session.head(url, headers=headers, allow_redirects=True, timeout=self.timeout) as response:
+                final_url = str(response.url)
+                logger.info(f"URL resolved: {url} -> {final_url}")
+                return final_url, True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"HEAD failed for {url}, trying GET: {e}")
+
+        try:
+            async with session.get(url, headers=headers, allow_redirects=True, timeout=self.timeout) as response:
+                # Body is never read; releasing the response closes it early
+                final_url = str(response.url)
+                logger.info(f"URL resolved (GET): {url} -> {final_url}")
+                return final_url, True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Could not expand short URL {url}: {e}")
+            return url, False
+
+    def get_stats(self):
+        stats = self.cache.get_stats()
+        stats.update({'network_lookups': self.network_lookups, 'coalesced': self.coalesced})
+        return stats
@@ -1,30 +1,133 @@
 import aiohttp
 import logging
 import os
+import time
 import asyncio
+from services.http_client import HTTPSessionManager
+from utils.cache import TTLCache
+from utils.sqlite_db import SQLiteDatabase
+from services.tracing import span, annotate
 
 logger = logging.getLogger(__name__)
 
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS short_links (long_url TEXT PRIMARY KEY, short_url TEXT NOT NULL, created_at REAL NOT NULL)",
+]
+
 class URLShortener:
-    def __init__(self):
+    def __init__(self, session_manager=None, cache_db_path=None, max_concurrency=4, requests_per_second=5,
+                 cache_size=20000, api_base='https://api.tinyurl.com', basic_base='https://tinyurl.com'):
+        self.session_manager = session_manager or HTTPSessionManager()
+        # Overridable so benchmarks can point at a local stand-in
+        self.api_base = api_base.rstrip('/')
+        self.basic_base = basic_base.rstrip('/')
         self.tinyurl_api_token = os.getenv('TINYURL_API_TOKEN')
         self.use_api = bool(self.tinyurl_api_token)
+
+        # long -> short mapping: memory LRU in front of an optional SQLite file that survives restarts
+        self.cache = TTLCache(max_size=cache_size, ttl_seconds=30 * 86400)
+        self.db = SQLiteDatabase(cache_db_path, schema=_SCHEMA) if cache_db_path else None
+        self._in_flight = {}  # {long_url: Future}
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0
+        self._next_slot = 0.0
+        self._pace_lock = asyncio.Lock()
+        self.stats = {'api_calls': 0, 'cache_hits': 0, 'coalesced': 0}
     
     async def shorten_url(self, url):
-        """Shorten URL using TinyURL service (async)"""
+        """Shorten URL using TinyURL service (async, cached and coalesced)"""
+        cached = self.cache.get(url)
+        if cached:
+            self.stats['cache_hits'] += 1
+            annotate(short_link_cache='hit')
+            return cached
+
+        future = self._in_flight.get(url)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            annotate(short_link_cache='coalesced')
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[url] = future
         try:
-            if self.use_api:
-                return await self._shorten_with_api(url)
+            # SQLite fallback is looked up inside the coalesced section, so concurrent misses read it once
+            short_url = await self._get_persisted(url)
+            if short_url:
+                self.stats['cache_hits'] += 1
+                annotate(short_link_cache='hit')
             else:
-                return await self._shorten_basic(url)
+                short_url = await self._shorten_uncached(url)
+            future.set_result(short_url)
+            return short_url
+        finally:
+            if not future.done():
+                future.set_result(url)
+            self._in_flight.pop(url, None)
+
+    async def _shorten_uncached(self, url):
+        try:
+            async with self._semaphore:
+                await self._pace()
+                self.stats['api_calls'] += 1
+                with span('tinyurl.shorten', api=self.use_api):
+                    if self.use_api:
+                        short_url = await self._shorten_with_api(url)
+                    else:
+                        short_url = await self._shorten_basic(url)
+            if short_url and short_url != url:
+                await self._set_cached(url, short_url)
+            return short_url
         except Exception as e:
             logger.error(f"Error shortening URL {url}: {e}")
             return url  # Return original URL if shortening fails
 
+    async def _pace(self):
+        """Space TinyURL calls at least min_interval apart across all concurrent callers"""
+        if not self._min_interval:
+            return
+        async with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._min_interval
+        if wait > 0:
+            with span('tinyurl.pace'):
+                await asyncio.sleep(wait)
+
+    async def _get_persisted(self, url):
+        """Short link from the SQLite file (read on a worker thread), promoted into the memory cache"""
+        if self.db is None:
+            return None
+        try:
+            row = await asyncio.to_thread(self._select_persisted, url)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read short link cache: {e}")
+            return None
+        if row:
+            self.cache.set(url, row[0])
+            return row[0]
+        return None
+
+    def _select_persisted(self, url):
+        return self.db.execute("SELECT short_url FROM short_links WHERE long_url = ?", (url,)).fetchone()
+
+    async def _set_cached(self, url, short_url):
+        self.cache.set(url, short_url)
+        if self.db is None:
+            return
+        try:
+            await asyncio.to_thread(
+                self.db.execute,
+                "INSERT OR REPLACE INTO short_links (long_url, short_url, created_at) VALUES (?, ?, ?)",
+                (url, short_url, time.time()),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not persist short link: {e}")
+
     async def _shorten_with_api(self, url):
         """Shorten using TinyURL API (with token, async)"""
         try:
-            api_url = "https://api.tinyurl.com/create"
+            api_url = f"{self.api_base}/create"
             headers = {
                 'Authorization': f'Bearer {self.tinyurl_api_token}',
                 'Content-Type': 'application/json'
@@ -34,18 +137,19 @@ class URLShortener:
                 'domain': 'tinyurl.com'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(api_url, json=data, headers=headers, timeout=10) as response:
-                    response.raise_for_status()
-                    result = await response.json()
-                    short_url = result.get('data', {}).get('tiny_url')
-                    
-                    if short_url:
-                        logger.info(f"✅ URL shortened (API): {url} -> {short_url}")
-                        return short_url
-                    else:
-                        logger.warning(f"API response missing short URL for: {url}")
-                        return url
+            session = await self.session_manager.get_session()
+            async with session.post(api_url, json=data, headers=headers, timeout=10) as response:
+                annotate(status=response.status)
+                response.raise_for_status()
+                result = await response.json()
+                short_url = result.get('data', {}).get('tiny_url')
+
+                if short_url:
+                    logger.info(f"✅ URL shortened (API): {url} -> {short_url}")
+                    return short_url
+                else:
+                    logger.warning(f"API response missing short URL for: {url}")
+                    return url
         except aiohttp.ClientError as e:
             logger.error(f"TinyURL API request failed for {url}: {e}")
             return await self._shorten_basic(url)  # Fallback to basic method
@@ -56,21 +160,23 @@ class URLShortener:
     async def _shorten_basic(self, url):
         """Shorten using basic TinyURL service (no token required, async)"""
         try:
-            api_url = f"https://tinyurl.com/api-create.php?url={url}"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, timeout=10) as response:
-                    response.raise_for_status()
-                    short_url = await response.text()
-                    short_url = short_url.strip()
-                    
-                    # Validate response
-                    if short_url.startswith('https://tinyurl.com/') and len(short_url) > 20:
-                        logger.info(f"✅ URL shortened (basic): {url} -> {short_url}")
-                        return short_url
-                    else:
-                        logger.warning(f"Invalid TinyURL response for {url}: {short_url}")
-                        return url
+            api_url = f"{self.basic_base}/api-create.php"
+
+            # url ko query param ki tarah bhejein, warna affiliate link ka '&tag=' kat jata hai
+            session = await self.session_manager.get_session()
+            async with session.get(api_url, params={'url': url}, timeout=10) as response:
+                annotate(status=response.status)
+                response.raise_for_status()
+                short_url = await response.text()
+                short_url = short_url.strip()
+
+                # Validate response
+                if short_url.startswith('https://tinyurl.com/') and len(short_url) > 20:
+                    logger.info(f"✅ URL shortened (basic): {url} -> {short_url}")
+                    return short_url
+                else:
+                    logger.warning(f"Invalid TinyURL response for {url}: {short_url}")
+                    return url
         except aiohttp.ClientError as e:
             logger.error(f"TinyURL basic request failed for {url}: {e}")
             return url
@@ -92,12 +198,26 @@ class URLShortener:
         return False
     
     async def batch_shorten(self, urls):
-        """Shorten multiple URLs (async)"""
-        tasks = [self.shorten_url(url) for url in urls]
-        shortened_urls = await asyncio.gather(*tasks, return_exceptions=True)
-        
+        """Shorten multiple URLs (async). Duplicates are shortened once; cached ones cost no request"""
+        unique_urls = list(dict.fromkeys(urls))
         results = {}
-        for original, shortened in zip(urls, shortened_urls):
+        pending = []
+        for url in unique_urls:
+            cached = self.cache.get(url)
+            if cached:
+                self.stats['cache_hits'] += 1
+                results[url] = cached
+            else:
+                pending.append(url)
+
+        # Concurrency cap + pacing in shorten_url keep the batch within TinyURL's rate
+        shortened_urls = await asyncio.gather(*(self.shorten_url(url) for url in pending), return_exceptions=True)
+        for original, shortened in zip(pending, shortened_urls):
             results[original] = shortened if not isinstance(shortened, Exception) else original
-            
+
         return results
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['cache_size'] = len(self.cache)
+        return stats
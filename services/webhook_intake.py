@@ -0,0 +1,131 @@
+# services/webhook_intake.py
+import hmac
+import time
+import queue
+import logging
+import threading
+import telebot
+from services.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class HandlerErrorLogger(telebot.ExceptionHandler):
+    """Log a failing bot handler instead of raising, so one bad update doesn't drop the rest of its batch"""
+
+    def handle(self, exception):
+        logger.error(f"❌ Telegram handler failed: {exception}", exc_info=exception)
+        return True
+
+
+class WebhookIntake:
+    """Telegram webhook intake: the request thread only checks the secret and enqueues the raw body.
+
+    A worker thread drains the queue in micro-batches (up to batch_size updates, waiting at
+    most batch_wait seconds after the first one) and hands each batch to bot.process_new_updates,
+    so slow handlers never hold Telegram's webhook connection open.
+    """
+
+    def __init__(self, bot, secret_token=None, max_queue=1000, batch_size=50, batch_wait=0.2, metrics=None):
+        self.bot = bot
+        self.secret_token = secret_token
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self._queue = queue.Queue(maxsize=max_queue)  # (received_at, raw body)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self.metrics = metrics or MetricsRegistry()
+        self._updates = self.metrics.counter(
+            'webhook_updates_total', 'Telegram webhook updates by result', ['status'])
+        self._batch_sizes = self.metrics.histogram(
+            'webhook_batch_size', 'Updates handled per micro-batch', buckets=(1, 2, 5, 10, 20, 50, 100))
+        self._lag = self.metrics.histogram(
+            'webhook_update_lag_seconds', 'Time from webhook receipt until the update was handled',
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+        if not secret_token:
+            logger.warning("⚠️ TELEGRAM_SECRET_TOKEN not set - webhook requests are not authenticated")
+
+    def verify(self, header_value):
+        """True if the X-Telegram-Bot-Api-Secret-Token header matches (or no secret is configured)"""
+        if not self.secret_token:
+            return True
+        if header_value and hmac.compare_digest(header_value.encode('utf-8'), self.secret_token.encode('utf-8')):
+            return True
+        self._updates.inc(status='rejected')
+        return False
+
+    def submit(self, body):
+        """Queue a raw update body. False when the buffer is full (answer non-2xx so Telegram redelivers)"""
+        try:
+            self._queue.put_nowait((time.time(), body))
+        except queue.Full:
+            self._updates.inc(status='overflow')
+            return False
+        self._updates.inc(status='accepted')
+        return True
+
+    # ---------- Worker ----------
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="webhook-intake", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """Handle what is already queued (up to timeout), then stop the worker"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        logger.info("📨 Webhook intake worker started")
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._process(batch)
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        # Burst ho to thoda ruk kar ek saath uthao; akela update batch_wait se zyada nahi rukta
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _process(self, batch):
+        updates = []
+        for received_at, body in batch:
+            try:
+                updates.append(telebot.types.Update.de_json(body.decode('utf-8')))
+            except Exception as e:
+                self._updates.inc(status='invalid')
+                logger.warning(f"⚠️ Could not decode webhook update: {e}")
+        if updates:
+            try:
+                self.bot.process_new_updates(updates)
+                self._updates.inc(len(updates), status='processed')
+            except Exception as e:
+                self._updates.inc(len(updates), status='failed')
+                logger.error(f"❌ Error processing {len(updates)} webhook updates: {e}", exc_info=True)
+        now = time.time()
+        self._batch_sizes.observe(len(batch))
+        for received_at, _ in batch:
+            self._lag.observe(now - received_at)
+
+    def get_stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'running': self._thread is not None and self._thread.is_alive(),
+            'authenticated': bool(self.secret_token),
+            **{status: self._updates.value(status=status)
+               for status in ('accepted', 'processed', 'rejected', 'overflow', 'invalid', 'failed')},
+        }
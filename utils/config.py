@@ -10,9 +10,23 @@ class Config:
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     AFFILIATE_TAG = os.getenv('AFFILIATE_TAG', 'budgetlooks08-21')
     
+    # Marketplaces: tag per storefront ("amazon.com=mytag-20,amazon.co.uk=mytag-21"); unlisted ones use AFFILIATE_TAG
+    DEFAULT_MARKETPLACE = os.getenv('DEFAULT_MARKETPLACE', 'amazon.in')
+    marketplace_tags_str = os.getenv('MARKETPLACE_TAGS', '')
+    # "amazon.in=tag-21, amazon.de = tag2-21" -> {'amazon.in': 'tag-21', 'amazon.de': 'tag2-21'}
+    MARKETPLACE_TAGS = {
+        domain.strip(): tag.strip()
+        for domain, _, tag in (item.partition('=') for item in marketplace_tags_str.split(','))
+        if domain.strip() and tag.strip()
+    }
+
     # Naye variables
     WEBHOOK_URL = os.getenv('WEBHOOK_URL') # Aapke Render app ka URL
     TELEGRAM_SECRET_TOKEN = os.getenv('TELEGRAM_SECRET_TOKEN') # Security ke liye ek secret password
+    # Webhook updates are acked at once and handled on a worker thread in micro-batches
+    WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+    WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', '50'))
+    WEBHOOK_BATCH_WAIT_SECONDS = float(os.getenv('WEBHOOK_BATCH_WAIT_SECONDS', '0.2'))
 
     # Output Channel configuration
     output_channels_str = os.getenv('OUTPUT_CHANNELS', '')
@@ -21,9 +35,117 @@ class Config:
     # Error notification chat
     ERROR_CHAT_ID = os.getenv('ERROR_CHAT_ID')
     
+    # Error chat digests: flush every NOTIFY_FLUSH_SECONDS or once NOTIFY_MAX_BATCH alerts are queued
+    NOTIFY_FLUSH_SECONDS = float(os.getenv('NOTIFY_FLUSH_SECONDS', '30'))
+    NOTIFY_MAX_BATCH = int(os.getenv('NOTIFY_MAX_BATCH', '20'))
+    NOTIFY_OUTBOX_SIZE = int(os.getenv('NOTIFY_OUTBOX_SIZE', '500'))
+
     # TinyURL API (if needed)
     TINYURL_API_TOKEN = os.getenv('TINYURL_API_TOKEN')
 
+    # External API base URLs (override only to point at local stand-ins, e.g. benchmarks)
+    TELEGRAM_API_BASE = os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org')
+    TINYURL_API_BASE = os.getenv('TINYURL_API_BASE', 'https://api.tinyurl.com')
+    TINYURL_BASIC_BASE = os.getenv('TINYURL_BASIC_BASE', 'https://tinyurl.com')
+
+    # Processing engine (per worker process)
+    WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '4'))
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '16'))
+
+    # Durable job queue (SQLite, shared by all workers on the instance)
+    JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'data/jobs.db')
+    JOB_QUEUE_MAX_PENDING = int(os.getenv('JOB_QUEUE_MAX_PENDING', '10000'))
+    JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', '20'))
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '600'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    JOB_RETRY_DELAY_SECONDS = int(os.getenv('JOB_RETRY_DELAY_SECONDS', '30'))
+    JOB_RETRY_MAX_DELAY_SECONDS = int(os.getenv('JOB_RETRY_MAX_DELAY_SECONDS', '600'))
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1'))
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '500'))
+    # Lease order: waiting QUEUE_AGING_SECONDS moves a job up one priority class; each running/earlier job of the
+    # same source costs QUEUE_FAIRNESS_WEIGHT classes; discounts >= PRIORITY_DISCOUNT_PERCENT are leased first
+    QUEUE_AGING_SECONDS = float(os.getenv('QUEUE_AGING_SECONDS', '60'))
+    QUEUE_FAIRNESS_WEIGHT = float(os.getenv('QUEUE_FAIRNESS_WEIGHT', '0.25'))
+    PRIORITY_DISCOUNT_PERCENT = float(os.getenv('PRIORITY_DISCOUNT_PERCENT', '50'))
+
+    # Duplicate detector storage: memory | sqlite | redis
+    DEDUP_BACKEND = os.getenv('DEDUP_BACKEND', 'sqlite')
+    DEDUP_DB_PATH = os.getenv('DEDUP_DB_PATH', 'data/dedup.db')
+    REDIS_URL = os.getenv('REDIS_URL')
+
+    # Short link expansion cache
+    RESOLVER_CACHE_SIZE = int(os.getenv('RESOLVER_CACHE_SIZE', '10000'))
+    RESOLVER_CACHE_TTL_SECONDS = int(os.getenv('RESOLVER_CACHE_TTL_SECONDS', str(6 * 3600)))
+
+    # Product page parsing: lxml (compiled selectors, process pool) | bs4 (legacy)
+    HTML_PARSER = os.getenv('HTML_PARSER', 'lxml')
+    PARSER_PROCESSES = int(os.getenv('PARSER_PROCESSES', '2'))
+    STREAMING_FETCH = os.getenv('STREAMING_FETCH', 'true').lower() == 'true'
+
+    # ASIN product info cache (PRODUCT_CACHE_DB_PATH empty = memory only)
+    PRODUCT_CACHE_SIZE = int(os.getenv('PRODUCT_CACHE_SIZE', '5000'))
+    PRODUCT_CACHE_STATIC_TTL = int(os.getenv('PRODUCT_CACHE_STATIC_TTL', str(7 * 86400)))
+    PRODUCT_CACHE_PRICE_TTL = int(os.getenv('PRODUCT_CACHE_PRICE_TTL', '1800'))
+    PRODUCT_CACHE_STALE_SECONDS = int(os.getenv('PRODUCT_CACHE_STALE_SECONDS', str(6 * 3600)))
+    PRODUCT_CACHE_DB_PATH = os.getenv('PRODUCT_CACHE_DB_PATH', '')
+
+    # Price history per ASIN (PRICE_HISTORY_DB_PATH empty = off); a point is stored only when the price changes
+    PRICE_HISTORY_DB_PATH = os.getenv('PRICE_HISTORY_DB_PATH', 'data/price_history.db')
+    PRICE_HISTORY_WINDOW_DAYS = int(os.getenv('PRICE_HISTORY_WINDOW_DAYS', '30'))
+    PRICE_HISTORY_RETENTION_DAYS = int(os.getenv('PRICE_HISTORY_RETENTION_DAYS', '180'))
+    PRICE_HISTORY_HEARTBEAT_SECONDS = int(os.getenv('PRICE_HISTORY_HEARTBEAT_SECONDS', str(6 * 3600)))
+    # Skip reposts whose price didn't drop by PRICE_DROP_MIN_PERCENT (first sightings and new lows always post)
+    PRICE_SKIP_UNCHANGED = os.getenv('PRICE_SKIP_UNCHANGED', 'false').lower() == 'true'
+    PRICE_DROP_MIN_PERCENT = float(os.getenv('PRICE_DROP_MIN_PERCENT', '5'))
+
+    # URL shortener: persistent long->short cache + TinyURL pacing (SHORTENER_DB_PATH empty = memory only)
+    SHORTENER_DB_PATH = os.getenv('SHORTENER_DB_PATH', 'data/short_links.db')
+    SHORTENER_CONCURRENCY = int(os.getenv('SHORTENER_CONCURRENCY', '4'))
+    SHORTENER_REQUESTS_PER_SECOND = float(os.getenv('SHORTENER_REQUESTS_PER_SECOND', '5'))
+
+    # Adaptive per-host rate limit for Amazon requests (requests/second, AIMD between min and max)
+    RATE_LIMIT_RPS = float(os.getenv('RATE_LIMIT_RPS', '1'))
+    RATE_LIMIT_MIN_RPS = float(os.getenv('RATE_LIMIT_MIN_RPS', '0.1'))
+    RATE_LIMIT_MAX_RPS = float(os.getenv('RATE_LIMIT_MAX_RPS', '5'))
+    RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '3'))
+    # Starting rate per marketplace ("amazon.com=2,amazon.co.uk=0.5"); others start at RATE_LIMIT_RPS
+    marketplace_rates_str = os.getenv('MARKETPLACE_RATE_LIMITS', '')
+    MARKETPLACE_RATE_LIMITS = {
+        domain.strip(): float(rate) for domain, rate in
+        (item.split('=', 1) for item in marketplace_rates_str.split(',') if '=' in item)
+    }
+
+    # Telegram Bot API send limits (whole bot / per channel)
+    TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))
+    TELEGRAM_CHAT_MESSAGES_PER_MINUTE = float(os.getenv('TELEGRAM_CHAT_MESSAGES_PER_MINUTE', '20'))
+    TELEGRAM_FILE_ID_CACHE_SIZE = int(os.getenv('TELEGRAM_FILE_ID_CACHE_SIZE', '5000'))
+
+    # Stage retries: exponential backoff with jitter, blocks back off harder, shared retry budget
+    RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '3'))
+    RETRY_BASE_DELAY_SECONDS = float(os.getenv('RETRY_BASE_DELAY_SECONDS', '1'))
+    RETRY_BLOCKED_DELAY_SECONDS = float(os.getenv('RETRY_BLOCKED_DELAY_SECONDS', '10'))
+    RETRY_MAX_DELAY_SECONDS = float(os.getenv('RETRY_MAX_DELAY_SECONDS', '60'))
+    RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.2'))
+    RETRY_BUDGET_MIN_PER_MINUTE = int(os.getenv('RETRY_BUDGET_MIN_PER_MINUTE', '10'))
+
+    # Per-job tracing: slowest TRACE_SLOW_JOBS traces kept for /api/traces/slow, optional JSONL export of every trace
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+    TRACE_SLOW_JOBS = int(os.getenv('TRACE_SLOW_JOBS', '50'))
+    TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', '')
+
+    # Per-stage concurrency limits (scrape: concurrent product page requests per marketplace)
+    STAGE_LIMIT_SCRAPE = int(os.getenv('STAGE_LIMIT_SCRAPE', '4'))
+    STAGE_LIMIT_SHORTEN = int(os.getenv('STAGE_LIMIT_SHORTEN', '4'))
+    STAGE_LIMIT_POST = int(os.getenv('STAGE_LIMIT_POST', '2'))
+
+    # Shared HTTP connection pool
+    HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+    HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', '10'))
+    HTTP_KEEPALIVE_SECONDS = int(os.getenv('HTTP_KEEPALIVE_SECONDS', '60'))
+    HTTP_DNS_CACHE_SECONDS = int(os.getenv('HTTP_DNS_CACHE_SECONDS', '300'))
+    # Product pages use one pool per marketplace, each with this connection limit
+    MARKETPLACE_POOL_LIMIT = int(os.getenv('MARKETPLACE_POOL_LIMIT', '20'))
+
 # Validation
 required_vars = ["TELEGRAM_BOT_TOKEN", "WEBHOOK_URL", "OUTPUT_CHANNELS"]
 missing_vars = [var for var in required_vars if not getattr(Config, var)]
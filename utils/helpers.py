@@ -34,19 +34,18 @@ def is_amazon_url(url):
             return True
     return False
 
+# Common ASIN patterns in Amazon URLs, compiled once (most specific first)
+ASIN_PATTERNS = [
+    re.compile(r'/(?:dp|gp/product|gp/aw/d|exec/obidos/ASIN|o/ASIN)/([A-Z0-9]{10})'),
+    re.compile(r'[?&]asin=([A-Z0-9]{10})'),
+    re.compile(r'/([A-Z0-9]{10})(?:[/?]|$)'),
+]
+
 def extract_asin_from_url(url):
     """Extract ASIN from Amazon URL for duplicate detection"""
     try:
-        # Common ASIN patterns in Amazon URLs
-        asin_patterns = [
-            r'/dp/([A-Z0-9]{10})',
-            r'/gp/product/([A-Z0-9]{10})',
-            r'[?&]asin=([A-Z0-9]{10})',
-            r'/([A-Z0-9]{10})(?:[/?]|$)'
-        ]
-        
-        for pattern in asin_patterns:
-            match = re.search(pattern, url)
+        for pattern in ASIN_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         
@@ -0,0 +1,74 @@
+# utils/price_parser.py
+import re
+
+# Longest markers first so 'Rs.' / 'US$' win over their shorter prefixes
+CURRENCY_MARKERS = (
+    ('US$', 'USD'), ('Rs.', 'INR'), ('INR', 'INR'), ('USD', 'USD'), ('GBP', 'GBP'), ('EUR', 'EUR'),
+    ('Rs', 'INR'), ('₹', 'INR'), ('$', 'USD'), ('£', 'GBP'), ('€', 'EUR'),
+)
+# First number of the text; a range like "₹499 - ₹999" yields its lower end
+_NUMBER_RE = re.compile(r'\d[\d,.]*')
+# "1,299.00" / "1.299,00" / "19.99": the last separator is a decimal point only when 1-2 digits follow it
+_DECIMAL_TAIL_RE = re.compile(r'[.,](\d{1,2})$')
+
+
+class ParsedPrice:
+    """Numeric price: amount (and MRP when the page shows one) in major units, plus the ISO currency"""
+
+    __slots__ = ('amount', 'currency', 'mrp')
+
+    def __init__(self, amount, currency=None, mrp=None):
+        self.amount = amount
+        self.currency = currency
+        # A "list price" at or below the selling price is page noise, not a discount
+        self.mrp = mrp if mrp and mrp > amount else None
+
+    @property
+    def discount_percent(self):
+        if not self.mrp:
+            return None
+        return round((self.mrp - self.amount) / self.mrp * 100, 1)
+
+    def to_dict(self):
+        return {
+            'amount': self.amount,
+            'currency': self.currency,
+            'mrp': self.mrp,
+            'discount_percent': self.discount_percent,
+        }
+
+    def __repr__(self):
+        return f"ParsedPrice({self.amount!r}, currency={self.currency!r}, mrp={self.mrp!r})"
+
+
+def detect_currency(text):
+    """ISO code of the first currency marker in the text, or None"""
+    for marker, code in CURRENCY_MARKERS:
+        if marker in text:
+            return code
+    return None
+
+def parse_amount(text):
+    """'₹1,29,999.00' -> 129999.0, '£1.234,50' -> 1234.5, '1,299.' -> 1299.0; None if there is no number"""
+    match = _NUMBER_RE.search(text or '')
+    if not match:
+        return None
+    number = match.group(0).rstrip('.,')
+    decimals = ''
+    tail = _DECIMAL_TAIL_RE.search(number)
+    # A lone separator followed by three digits ("1,299", "1.299") is a thousands separator
+    if tail and (number.count(',') + number.count('.') == 1 or number[tail.start()] not in number[:tail.start()]):
+        decimals = tail.group(1)
+        number = number[:tail.start()]
+    digits = number.replace(',', '').replace('.', '')
+    if not digits:
+        return None
+    return float(f"{digits}.{decimals}" if decimals else digits)
+
+def parse_price(text, currency=None, mrp_text=None):
+    """Structured price from the scraped strings; currency falls back to the marketplace's. None if unparseable"""
+    amount = parse_amount(text)
+    if amount is None or amount <= 0:
+        return None
+    mrp = parse_amount(mrp_text) if mrp_text else None
+    return ParsedPrice(amount, detect_currency(text) or currency, mrp)
@@ -0,0 +1,77 @@
+# utils/sqlite_db.py
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class SQLiteDatabase:
+    """Thread-local, fork-safe SQLite connections in WAL mode"""
+
+    def __init__(self, path, schema=None, busy_timeout_ms=5000, migrations=None):
+        self.path = path
+        self.schema = schema or []
+        # Run after schema: ALTER TABLE ... ADD COLUMN for databases created by older versions
+        self.migrations = migrations or []
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready_pid = None
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connection(self):
+        """Return this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._schema_lock:
+            if self._schema_ready_pid == os.getpid():
+                return
+            for statement in self.schema:
+                conn.execute(statement)
+            for statement in self.migrations:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError as e:
+                    # Column already there (new database, or another process migrated first)
+                    if 'duplicate column' not in str(e):
+                        raise
+            self._schema_ready_pid = os.getpid()
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, rolling back on error"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
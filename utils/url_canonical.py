@@ -0,0 +1,73 @@
+# utils/url_canonical.py
+import re
+from urllib.parse import parse_qsl, urlencode
+from utils.helpers import extract_asin_from_url
+
+# amazon.in, www.amazon.co.uk, m.amazon.com, smile.amazon.de ...; group 1 is the marketplace domain
+_AMAZON_HOST_RE = re.compile(r'^(?:(?:www|m|smile)\.)?(amazon\.(?:co\.[a-z]{2}|com\.[a-z]{2}|[a-z]{2,3}))$')
+# scheme (optional) / host / path / query, without the cost of urlsplit
+_URL_PARTS_RE = re.compile(r'^(?:[a-z][a-z0-9+.-]*://)?([^/?#]*)([^?#]*)(?:\?([^#]*))?', re.IGNORECASE)
+# /ref=sr_1_3 style path segments only carry click tracking
+_REF_SEGMENT_RE = re.compile(r'/ref=[^/]*')
+_SMID_RE = re.compile(r'(?:^|&)smid=([A-Za-z0-9]+)')
+
+# Query params that only identify the click, never the product
+TRACKING_PARAMS = frozenset({
+    'ref', 'ref_', 'tag', 'linkCode', 'linkId', 'camp', 'creative', 'creativeASIN', 'ascsubtag', 'asc_source',
+    'asc_refurl', 'asc_campaign', 'qid', 'sr', 'sprefix', 'crid', 'dib', 'dib_tag', 'th', 'psc', 'social_share',
+    'starsLeft', 'srs', 'spIA', 'sp_csd', 'spLa', 'sbo', 'gclid', 'fbclid', '_encoding', 'content-id', 'cv_ct_cx',
+})
+_TRACKING_PREFIXES = ('pf_rd_', 'pd_rd_', 'utm_', 'hv')
+
+
+class CanonicalURL:
+    """canonicalize() result. needs_resolution=True means the link is opaque and has to be followed over the network"""
+
+    __slots__ = ('url', 'asin', 'marketplace', 'needs_resolution')
+
+    def __init__(self, url, asin=None, marketplace=None, needs_resolution=False):
+        self.url = url
+        self.asin = asin
+        self.marketplace = marketplace
+        self.needs_resolution = needs_resolution
+
+    def __repr__(self):
+        return (f"CanonicalURL({self.url!r}, asin={self.asin!r}, marketplace={self.marketplace!r}, "
+                f"needs_resolution={self.needs_resolution})")
+
+
+def amazon_marketplace(host):
+    """'www.amazon.co.uk' -> 'amazon.co.uk'; None for anything that is not an Amazon storefront"""
+    match = _AMAZON_HOST_RE.match(host or '')
+    return match.group(1) if match else None
+
+def strip_tracking(query):
+    """Drop click-tracking params from a query string"""
+    if not query:
+        return ''
+    pairs = [(name, value) for name, value in parse_qsl(query, keep_blank_values=True)
+             if name not in TRACKING_PARAMS and not name.startswith(_TRACKING_PREFIXES)]
+    return urlencode(pairs)
+
+def canonicalize(url):
+    """Parse an Amazon link offline: ASIN, marketplace and a tracking-free URL.
+
+    Full storefront links become https://www.<marketplace>/dp/<ASIN>. Short links (amzn.to, a.co,
+    wishlink, ...) and unknown hosts come back unchanged with needs_resolution=True.
+    """
+    match = _URL_PARTS_RE.match(url.strip())
+    marketplace = amazon_marketplace(match.group(1).lower().rsplit(':', 1)[0]) if match else None
+    if marketplace is None:
+        return CanonicalURL(url, needs_resolution=True)
+
+    path, query = _REF_SEGMENT_RE.sub('', match.group(2)), match.group(3)
+    asin = extract_asin_from_url(f"{path}?{query}" if query else path)
+    if asin:
+        # Product pages keep only the seller id; a regex is much cheaper than a full query parse here
+        smid = _SMID_RE.search(query) if query else None
+        canonical = f"https://www.{marketplace}/dp/{asin}" + (f"?smid={smid.group(1)}" if smid else '')
+    else:
+        # Search / deal / store pages: same page, minus the tracking
+        query = strip_tracking(query)
+        canonical = f"https://www.{marketplace}{path.rstrip('/') or '/'}" + (f"?{query}" if query else '')
+    return CanonicalURL(canonical, asin=asin, marketplace=marketplace)